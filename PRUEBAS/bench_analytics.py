@@ -0,0 +1,99 @@
+# PRUEBAS/bench_analytics.py
+#
+# Benchmark del análisis de tiempos de fase: genera una grabación sintética de
+# una semana a 10 Hz (unos 6 millones de reportes) de un plan conocido y mide
+# analytics.analyze sobre el bloque completo. El objetivo es menos de 1 s.
+#
+# Uso: python PRUEBAS/bench_analytics.py [--days 7] [--hz 10] [--rounds 3]
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import analytics
+from lights import LIGHT_MAP
+
+TARGET_SECONDS = 1.0
+CONTROLLER_ID = 7
+
+# Fases del plan sintético: (luces encendidas, duración en s). G1 y G2 se alternan con ámbar de 3 s.
+PHASES = ((('V1', 'R2'), 30), (('A1', 'R2'), 3), (('R1', 'V2'), 20), (('R1', 'A2'), 3))
+CYCLE = sum(duration for _, duration in PHASES)
+
+
+def phase_ports(lights):
+    """Bytes D/E/F con las luces indicadas encendidas."""
+    ports = {'portD': 0, 'portE': 0, 'portF': 0}
+    for light in lights:
+        port, bit = LIGHT_MAP[light]
+        ports[port] |= 1 << bit
+    return ports['portD'], ports['portE'], ports['portF']
+
+
+def hardware_config(green_times=None):
+    """Proyecto con el plan sintético, vigente todos los días desde las 00:00."""
+    movements = []
+    for i, (lights, duration) in enumerate(PHASES):
+        port_d, port_e, port_f = phase_ports(lights)
+        if green_times and i in green_times:
+            duration = green_times[i]
+        movements.append({'id': i, 'portD': f'{port_d:02X}', 'portE': f'{port_e:02X}', 'portF': f'{port_f:02X}',
+                          'portH': '00', 'portJ': '00', 'times': [duration, 0, 0, 0, 0]})
+    return {'info': {'controller_id': f'{CONTROLLER_ID:02X}'}, 'movements': movements,
+            'sequences': [{'id': 0, 'type': 0, 'anchor_pos': 0, 'movements': list(range(len(PHASES)))}],
+            'plans': [{'id': 0, 'day_type_id': 7, 'sequence_id': 0, 'time_sel': 0, 'hour': 0, 'minute': 0}],
+            'intermittences': [], 'holidays': [], 'flow_rules': []}
+
+
+def synthetic_recording(days=7.0, hz=10.0, start=None, jitter=0.01, seed=1234):
+    """Bytes crudos de una grabación (formato de recorder.RECORD) con el plan sintético en marcha."""
+    if start is None:
+        start = datetime.datetime(2025, 8, 4).timestamp()
+    rng = np.random.default_rng(seed)
+    count = int(days * 86400 * hz)
+    timestamps = start + np.arange(count) / hz + rng.uniform(0, jitter, count)
+    boundaries = np.cumsum([duration for _, duration in PHASES])
+    phase = np.searchsorted(boundaries, (timestamps - start) % CYCLE, side='right')
+    table = np.array([phase_ports(lights) for lights, _ in PHASES], dtype=np.uint8)
+    records = np.zeros(count, dtype=analytics.RECORD_DTYPE)
+    records['timestamp'] = timestamps
+    records['payload'][:, 0] = CONTROLLER_ID
+    records['payload'][:, 1:4] = table[phase]
+    return records.tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de analytics.analyze sobre una grabación sintética")
+    parser.add_argument('--days', type=float, default=7.0)
+    parser.add_argument('--hz', type=float, default=10.0)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    raw = synthetic_recording(args.days, args.hz)
+    config = hardware_config()
+    frames = len(raw) // analytics.RECORD_DTYPE.itemsize
+    print(f"{frames} reportes ({len(raw) / 1e6:.0f} MB), {args.days} días a {args.hz} Hz")
+    times = []
+    result = None
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        result = analytics.analyze(raw, config, CONTROLLER_ID)
+        times.append(time.perf_counter() - start)
+    print(f"analyze: mediana {statistics.median(times) * 1000:.0f} ms  min {min(times) * 1000:.0f} ms  "
+          f"({frames / min(times) / 1e6:.1f} M reportes/s)")
+    print(f"ciclos {result['cycles']['count']} de {result['cycles']['mean_s']} s, "
+          f"{result.get('deviation_count', 0)} desviaciones")
+    ok = min(times) < TARGET_SECONDS
+    print(f"{'OK' if ok else 'LENTO'}: objetivo {TARGET_SECONDS:.1f} s")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+# PRUEBAS/bench_frame_decoder.py
+#
+# Benchmark del decodificador de tramas: genera varios MB de tramas sintéticas
+# mezcladas con ruido y compara la lectura en bloque de FrameDecoder contra la
+# búsqueda byte a byte del STX que usaba la versión anterior.
+#
+# Uso: python PRUEBAS/bench_frame_decoder.py [MB] [--noise 0.2]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from communicator import Communicator, FrameDecoder, STX, ETX
+
+
+class MemorySerial:
+    """Imita la parte de serial.Serial que usan los lectores (read / in_waiting)."""
+    def __init__(self, data, max_chunk=512):
+        self._data = data
+        self._pos = 0
+        self._max_chunk = max_chunk
+
+    @property
+    def in_waiting(self):
+        # El driver USB entrega los datos en bloques de tamaño variable
+        return min(self._max_chunk, len(self._data) - self._pos)
+
+    def read(self, size=1):
+        chunk = self._data[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+    @property
+    def exhausted(self):
+        return self._pos >= len(self._data)
+
+
+def build_stream(target_bytes, noise_ratio, seed=1234):
+    """Construye un flujo de tramas válidas (sobre todo 0x82 de monitoreo) con ruido intercalado."""
+    rng = random.Random(seed)
+    builder = Communicator()
+    parts = []
+    size = 0
+    frames = 0
+    while size < target_bytes:
+        if rng.random() < noise_ratio:
+            noise = bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 24)))
+            parts.append(noise)
+            size += len(noise)
+            continue
+        if rng.random() < 0.8:
+            frame = builder._build_frame(0x82, bytes(rng.getrandbits(8) for _ in range(5)))
+        else:
+            cmd = rng.choice((0xA4, 0xB1, 0xC1, 0xD1, 0xF1))
+            frame = builder._build_frame(cmd, bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 16))))
+        parts.append(frame)
+        size += len(frame)
+        frames += 1
+    return b''.join(parts), frames
+
+
+def legacy_read_frame(ser):
+    """Copia del algoritmo anterior: búsqueda del STX con ser.read(1)."""
+    while not ser.exhausted:
+        if ser.read(1) == STX[0:1]:
+            if ser.read(2) == STX[1:3]:
+                header = ser.read(2)
+                if len(header) < 2: continue
+                cmd_byte, len_byte = header[0], header[1]
+                full_payload = ser.read(len_byte + 3)
+                if len(full_payload) < len_byte + 3: continue
+                payload = full_payload[:len_byte]
+                if full_payload[len_byte + 1:] != ETX: continue
+                if full_payload[len_byte] != (cmd_byte + len_byte + sum(payload)) % 256: continue
+                return cmd_byte, payload
+    return None, None
+
+
+def run_legacy(data):
+    ser = MemorySerial(data)
+    count = 0
+    while True:
+        cmd, _ = legacy_read_frame(ser)
+        if cmd is None:
+            return count
+        count += 1
+
+
+def run_decoder(data):
+    ser = MemorySerial(data)
+    decoder = FrameDecoder()
+    count = 0
+    while not ser.exhausted:
+        decoder.read_from(ser)
+        for _ in decoder:
+            count += 1
+    return count, decoder
+
+
+def measure(label, func, data, frames_sent):
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = func(data)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    decoded = result[0] if isinstance(result, tuple) else result
+    print(f"{label:<14} tramas={decoded:>8}/{frames_sent:<8} "
+          f"{decoded / wall:>12,.0f} tramas/s  "
+          f"{cpu / max(decoded, 1) * 1e6:>7.2f} us CPU/trama  ({wall:.2f} s)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de FrameDecoder")
+    parser.add_argument('megabytes', nargs='?', type=float, default=4.0)
+    parser.add_argument('--noise', type=float, default=0.2, help="Proporción de bloques de ruido")
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    data, frames_sent = build_stream(int(args.megabytes * 1024 * 1024), args.noise)
+    print(f"Flujo sintético: {len(data) / 1024 / 1024:.1f} MB, {frames_sent} tramas, ruido={args.noise:.0%}")
+
+    _, decoder = measure("FrameDecoder", run_decoder, data, frames_sent)
+    print(f"{'':<14} errores checksum={decoder.checksum_errors} ETX={decoder.etx_errors} "
+          f"bytes descartados={decoder.discarded_bytes}")
+    if not args.skip_legacy:
+        measure("byte a byte", run_legacy, data, frames_sent)
+
+
+if __name__ == '__main__':
+    main()
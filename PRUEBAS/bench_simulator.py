@@ -0,0 +1,148 @@
+# PRUEBAS/bench_simulator.py
+#
+# Benchmarks de la pila serie completa (Communicator + Controller) contra el
+# LC4 simulado de simulator.py: captura, subida completa, subida sin cambios
+# y caudal de reportes de monitoreo. Corre en cualquier Linux sin hardware.
+#
+# Uso: python PRUEBAS/bench_simulator.py [--socket] [--latency-ms 2] [--eeprom-ms 5]
+#                                        [--baudrate 9600] [--ber 1e-5] [--rounds 3] [--no-table-dump] [--no-table-write]
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Los perfiles de ritmo de escritura del benchmark no deben mezclarse con los del usuario
+os.environ.setdefault('LC4_DATA_DIR', tempfile.mkdtemp(prefix='lc4bench-'))
+
+from communicator import Communicator
+from controller import Controller
+from project_model import MAX_MOVEMENTS, MAX_SEQUENCES, MAX_PLANS, MAX_HOLIDAYS
+from simulator import LC4Simulator
+
+
+def sample_hardware_config(controller_id=7):
+    """Proyecto con todas las tablas ocupadas, para medir el peor caso."""
+    movements = [{'id': i, 'portD': f'{(i * 37) & 0xFF:02X}', 'portE': f'{(i * 11) & 0xFF:02X}',
+                  'portF': f'{(i * 5) & 0xFF:02X}', 'portH': '00', 'portJ': '00',
+                  'times': [10 + i % 20, 5, 3, 2, 1]} for i in range(MAX_MOVEMENTS)]
+    sequences = [{'id': i, 'type': 0, 'anchor_pos': 0,
+                  'movements': [(i * 12 + k) % MAX_MOVEMENTS for k in range(12)]} for i in range(MAX_SEQUENCES)]
+    plans = [{'id': i, 'day_type_id': i % 14, 'sequence_id': i % MAX_SEQUENCES, 'time_sel': i % 5,
+              'hour': i % 24, 'minute': (i * 7) % 60} for i in range(MAX_PLANS)]
+    holidays = [{'id': i, 'day': 1 + i, 'month': 1 + i % 12} for i in range(MAX_HOLIDAYS)]
+    return {'info': {'controller_id': f'{controller_id:02X}'}, 'movements': movements, 'sequences': sequences,
+            'plans': plans, 'intermittences': [], 'holidays': holidays, 'flow_rules': []}
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.simulator = LC4Simulator(latency=args.latency_ms / 1000, eeprom_write_delay=args.eeprom_ms / 1000,
+                                      baudrate=args.baudrate, bit_error_rate=args.ber,
+                                      report_interval=1 / args.report_hz, seed=1234,
+                                      table_dump=not args.no_table_dump, table_write=not args.no_table_write)
+        port = self.simulator.start_socket() if args.socket else self.simulator.start_pty()
+        self.communicator = Communicator()
+        result = self.communicator.connect(port, args.baudrate or 115200)
+        if result['status'] != 'success':
+            raise SystemExit(f"No se pudo conectar al simulador en {port}: {result['message']}")
+        self.controller = Controller(self.communicator)
+        self.port = port
+
+    def close(self):
+        self.communicator.disconnect()
+        self.simulator.stop()
+
+    def capture(self):
+        self.simulator.load_hardware_config(sample_hardware_config())
+        start = time.perf_counter()
+        self.controller.capture_full_configuration()
+        elapsed = time.perf_counter() - start
+        return elapsed, None
+
+    def upload_full(self):
+        self.simulator.factory_reset()
+        start = time.perf_counter()
+        result = self.controller.upload_full_configuration(sample_hardware_config(), force_full=True)
+        elapsed = time.perf_counter() - start
+        return elapsed, result.get('message')
+
+    def upload_unchanged(self):
+        hardware_config = sample_hardware_config()
+        self.controller.upload_full_configuration(hardware_config, force_full=True)
+        start = time.perf_counter()
+        result = self.controller.upload_full_configuration(hardware_config)
+        elapsed = time.perf_counter() - start
+        return elapsed, result.get('message')
+
+    def monitoring(self):
+        """Reportes 0x82 recibidos y decodificados durante `--monitor-s` segundos."""
+        self.simulator.load_hardware_config(sample_hardware_config())
+        reports = []
+
+        def on_report(cmd, payload):
+            if self.controller.parse_monitoring_report(payload):
+                reports.append(payload)
+
+        self.communicator.subscribe(0x82, on_report)
+        self.communicator.send_command(0x80)
+        start = time.perf_counter()
+        time.sleep(self.args.monitor_s)
+        elapsed = time.perf_counter() - start
+        self.communicator.send_command(0x81)
+        self.communicator.unsubscribe(0x82, on_report)
+        return elapsed, f'{len(reports) / elapsed:.1f} reportes/s'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la pila serie contra el LC4 simulado")
+    parser.add_argument('--socket', action='store_true', help="Usa socket:// en lugar de un pty")
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--eeprom-ms', type=float, default=5.0)
+    parser.add_argument('--baudrate', type=int, default=None, help="Simula el tiempo en la línea (ej. 9600)")
+    parser.add_argument('--ber', type=float, default=0.0, help="Tasa de error de bit en ambos sentidos")
+    parser.add_argument('--report-hz', type=float, default=10.0)
+    parser.add_argument('--monitor-s', type=float, default=2.0)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--no-table-dump', action='store_true', help="Captura leyendo índice por índice")
+    parser.add_argument('--no-table-write', action='store_true', help="Sube registro por registro")
+    parser.add_argument('--only', choices=('capture', 'upload_full', 'upload_unchanged', 'monitoring'))
+    parser.add_argument('--verbose', action='store_true', help="Muestra el log de cada trama (afecta las mediciones)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    bench = Bench(args)
+    print(f"Simulador en {bench.port} | latencia {args.latency_ms} ms | EEPROM {args.eeprom_ms} ms | "
+          f"baudrate {args.baudrate or 'sin límite'} | BER {args.ber}")
+    names = [args.only] if args.only else ['capture', 'upload_full', 'upload_unchanged', 'monitoring']
+    try:
+        for name in names:
+            rounds = 1 if name == 'monitoring' else args.rounds
+            times, detail = [], None
+            for _ in range(rounds):
+                elapsed, detail = getattr(bench, name)()
+                times.append(elapsed)
+            print(f"{name:18s} mediana {statistics.median(times) * 1000:9.1f} ms  "
+                  f"min {min(times) * 1000:9.1f} ms  {detail or ''}")
+    finally:
+        bench.close()
+    print(f"Simulador: {bench.simulator.stats}")
+    stats = bench.communicator.link_stats.snapshot()
+    print(f"Enlace: {stats['frames_out']} tramas enviadas, {stats['frames_in']} recibidas, "
+          f"{stats['timeouts']} timeouts, {stats['lost']} perdidas, {stats['nacks']} NACK, "
+          f"{stats['checksum_errors']} errores de checksum")
+    for cmd, counters in stats['commands'].items():
+        print(f"  {cmd}: {counters['requests']:5d} peticiones  primer byte p50 {counters['first_byte']['p50_ms']} ms  "
+              f"trama completa p50 {counters['full_frame']['p50_ms']} ms  p95 {counters['full_frame']['p95_ms']} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
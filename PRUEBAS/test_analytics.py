@@ -0,0 +1,68 @@
+# PRUEBAS/test_analytics.py
+#
+# Pruebas del análisis de tiempos de fase sobre la grabación sintética de
+# bench_analytics.py: detección de ciclos y verdes, comparación con el plan
+# programado y cortes de grabación.
+#
+# Uso: python -m pytest PRUEBAS/test_analytics.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+np = pytest.importorskip('numpy')
+
+import analytics
+from bench_analytics import CONTROLLER_ID, CYCLE, hardware_config, synthetic_recording
+
+HOURS = 2
+
+
+def test_cycles_and_greens():
+    result = analytics.analyze(synthetic_recording(days=HOURS / 24), hardware_config(), CONTROLLER_ID)
+    assert result['status'] == 'success'
+    assert result['frames'] == HOURS * 3600 * 10
+    assert result['recording_gaps'] == 0
+    cycles = result['cycles']
+    assert cycles['reference_group'] == 1
+    assert cycles['count'] == HOURS * 3600 // CYCLE # Un ciclo entre cada par de inicios de verde
+    assert abs(cycles['mean_s'] - CYCLE) < 0.05
+    g1, g2 = result['groups'][0], result['groups'][1]
+    assert abs(g1['mean_green_s'] - 30) < 0.1 and abs(g2['mean_green_s'] - 20) < 0.1
+    assert abs(g1['amber_s'] / g1['green_phases'] - 3) < 0.1
+    assert all(group['green_phases'] == 0 for group in result['groups'][2:])
+
+    [plan] = result['plans']
+    assert plan['plan_id'] == 0 and plan['programmed_cycle_s'] == CYCLE
+    assert plan['programmed_green_s'][:2] == [30.0, 20.0]
+    assert plan['cycle_deviations'] == 0 and result['deviation_count'] == 0
+
+
+def test_deviation_from_programmed_green():
+    # Programado 25 s de verde para G1 cuando en la calle dura 30 s: cada ciclo se desvía
+    result = analytics.analyze(synthetic_recording(days=HOURS / 24), hardware_config({0: 25}), CONTROLLER_ID)
+    [plan] = result['plans']
+    assert plan['programmed_cycle_s'] == CYCLE - 5
+    assert plan['cycle_deviations'] == plan['cycles']
+    assert plan['green_deviations'][0] == plan['cycles'] and plan['green_deviations'][1] == 0
+    assert {d['kind'] for d in result['deviations']} == {'cycle', 'green'}
+
+
+def test_recording_gap_drops_cycle():
+    records = np.frombuffer(synthetic_recording(days=HOURS / 24), dtype=analytics.RECORD_DTYPE).copy()
+    complete = analytics.analyze(records.tobytes(), hardware_config(), CONTROLLER_ID)
+    records['timestamp'][20000:] += 60 # Corte de un minuto en medio de un ciclo
+    cut = analytics.analyze(records.tobytes(), hardware_config(), CONTROLLER_ID)
+    assert cut['recording_gaps'] == 1
+    assert cut['cycles']['count'] == complete['cycles']['count'] - 1
+    assert abs(cut['cycles']['max_s'] - CYCLE) < 0.05
+
+
+def test_other_controller_is_filtered():
+    raw = synthetic_recording(days=HOURS / 24)
+    result = analytics.analyze(raw, hardware_config(), CONTROLLER_ID + 1)
+    assert result['status'] == 'error'
@@ -0,0 +1,101 @@
+# PRUEBAS/test_capabilities.py
+#
+# Pruebas de la detección de los comandos en bloque del firmware: una trama
+# perdida en la prueba no los desactiva para toda la conexión; sólo un NACK
+# explícito del firmware lo hace.
+#
+# Uso: python -m pytest PRUEBAS/test_capabilities.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('LC4_DATA_DIR', tempfile.mkdtemp(prefix='lc4test-'))
+
+from test_project_model import partial_hardware_config
+
+from communicator import Communicator, CMD_TABLE_CRC, CMD_TABLE_DUMP, CMD_TABLE_WRITE
+from controller import Controller
+from simulator import LC4Simulator
+
+
+def drop_first(simulator, cmd):
+    """El simulador ignora la primera trama `cmd` que recibe, como si se hubiera perdido en la línea."""
+    handle = simulator._handle
+    dropped = []
+
+    def lossy(frame_cmd, payload):
+        if frame_cmd == cmd and not dropped:
+            dropped.append(payload)
+            return
+        handle(frame_cmd, payload)
+    simulator._handle = lossy
+    return dropped
+
+
+@pytest.fixture
+def connect():
+    opened = []
+
+    def connect(**options):
+        simulator = LC4Simulator(controller_id=3, latency=0, eeprom_write_delay=0, **options)
+        simulator.load_hardware_config(partial_hardware_config())
+        communicator = Communicator()
+        assert communicator.connect(simulator.start_pty(), 115200)['status'] == 'success'
+        opened.append((communicator, simulator))
+        return simulator, communicator, Controller(communicator)
+    yield connect
+    for communicator, simulator in opened:
+        communicator.disconnect()
+        simulator.stop()
+
+
+def test_lost_dump_probe_is_probed_again(connect):
+    simulator, communicator, controller = connect()
+    dropped = drop_first(simulator, CMD_TABLE_DUMP)
+    assert controller.capture_full_configuration()['status'] == 'success'
+    assert dropped
+    assert communicator.capabilities['table_dump'] is True
+
+
+def test_dump_nack_disables_dump(connect):
+    simulator, communicator, controller = connect(table_dump=False)
+    assert controller.capture_full_configuration()['status'] == 'success'
+    assert communicator.capabilities['table_dump'] is False
+
+
+def test_lost_bulk_write_frame_is_retried(connect):
+    simulator, communicator, controller = connect()
+    dropped = drop_first(simulator, CMD_TABLE_WRITE)
+    result = controller.upload_full_configuration(partial_hardware_config(), force_full=True)
+    assert result['status'] == 'success', result
+    assert dropped
+    assert communicator.capabilities['table_write'] is True
+
+
+def test_bulk_write_nack_disables_bulk_write(connect):
+    simulator, communicator, controller = connect(table_write=False)
+    result = controller.upload_full_configuration(partial_hardware_config(), force_full=True)
+    assert result['status'] == 'success', result
+    assert communicator.capabilities['table_write'] is False
+
+
+def test_lost_crc_probe_is_probed_again(connect):
+    simulator, communicator, controller = connect()
+    dropped = drop_first(simulator, CMD_TABLE_CRC)
+    result = controller.verify_configuration(partial_hardware_config(), repair=False)
+    assert result['status'] == 'success', result
+    assert dropped
+    assert communicator.capabilities['table_crc'] is True
+
+
+def test_crc_nack_disables_crc(connect):
+    simulator, communicator, controller = connect(table_crc=False)
+    result = controller.verify_configuration(partial_hardware_config(), repair=False)
+    assert result['status'] == 'success', result
+    assert communicator.capabilities['table_crc'] is False
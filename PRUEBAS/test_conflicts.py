@@ -0,0 +1,94 @@
+# PRUEBAS/test_conflicts.py
+#
+# Pruebas de la validación de conflictos: una configuración sin conflictos
+# sigue sin conflictos después de capturarla del LC4 simulado (los slots
+# vacíos de la EEPROM no cuentan) y los conflictos reales se detectan.
+#
+# Uso: python -m pytest PRUEBAS/test_conflicts.py
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('LC4_DATA_DIR', tempfile.mkdtemp(prefix='lc4test-'))
+
+import conflicts
+import lc4tool
+from lights import LIGHT_MAP
+from communicator import Communicator
+from controller import Controller
+from project_model import ProjectModel
+from simulator import LC4Simulator
+
+# G1 y G2 se alternan con ámbar de 3 s; tienen conflicto entre sí
+PHASES = (('V1', 'R2'), ('A1', 'R2'), ('R1', 'V2'), ('R1', 'A2'))
+MATRIX = [[(i, j) in ((0, 1), (1, 0)) for j in range(8)] for i in range(8)]
+
+
+def _ports(lights):
+    ports = {'portD': 0, 'portE': 0, 'portF': 0}
+    for light in lights:
+        port, bit = LIGHT_MAP[light]
+        ports[port] |= 1 << bit
+    return ports
+
+
+def project(phases=PHASES, controller_id=5):
+    movements = [{'id': i, **{port: f'{value:02X}' for port, value in _ports(lights).items()},
+                  'portH': '00', 'portJ': '00', 'times': [20, 5, 3, 2, 1]} for i, lights in enumerate(phases)]
+    amber_g1 = _ports(('A1',))
+    hardware_config = {
+        'info': {'controller_id': f'{controller_id:02X}'}, 'movements': movements,
+        'sequences': [{'id': 0, 'type': 0, 'anchor_pos': 0, 'movements': list(range(len(phases)))}],
+        'plans': [{'id': 0, 'day_type_id': 7, 'sequence_id': 0, 'time_sel': 0, 'hour': 6, 'minute': 0}],
+        'intermittences': [{'id': 0, 'id_plan': 0, 'indice_mov': 1, 'maskD': f"{amber_g1['portD']:02X}",
+                            'maskE': '00', 'maskF': '00'}],
+        'holidays': [], 'flow_rules': []}
+    return {'hardware_config': hardware_config, 'software_config': {'intersection': {'conflict_matrix': MATRIX}}}
+
+
+def test_source_project_has_no_conflicts():
+    assert conflicts.check_project(project())['conflicts'] == []
+
+
+def test_real_conflicts_are_found():
+    clashing = project(phases=(('V1', 'V2'), ('A1', 'A2'), ('R1', 'R2')))
+    kinds = {issue['kind'] for issue in conflicts.check_project(clashing)['conflicts']}
+    assert conflicts.KIND_MOVEMENT in kinds
+
+
+def test_empty_intermittence_slots_are_ignored():
+    # Proyectos guardados de capturas anteriores traen los slots vacíos como registros con plan 255
+    data = project()
+    data['hardware_config']['intermittences'] += [
+        {'id': i, 'id_plan': 255, 'indice_mov': 255, 'maskD': 'FF', 'maskE': 'FF', 'maskF': 'FF'}
+        for i in range(1, 10)]
+    assert conflicts.check_project(data)['conflicts'] == []
+
+
+def test_captured_project_has_no_conflicts(tmp_path):
+    source = project()
+    simulator = LC4Simulator(controller_id=5, latency=0, eeprom_write_delay=0)
+    simulator.load_hardware_config(source['hardware_config'])
+    communicator = Communicator()
+    assert communicator.connect(simulator.start_pty(), 115200)['status'] == 'success'
+    try:
+        controller = Controller(communicator)
+        assert controller.capture_full_configuration()['status'] == 'success'
+        captured = {'hardware_config': controller.project_data['hardware_config'],
+                    'software_config': source['software_config']}
+    finally:
+        communicator.disconnect()
+        simulator.stop()
+
+    assert conflicts.check_project(captured)['conflicts'] == []
+    model = ProjectModel.from_hardware_config(captured['hardware_config'])
+    assert model.encode_all() == ProjectModel.from_hardware_config(source['hardware_config']).encode_all()
+
+    path = tmp_path / 'capturado.lc4'
+    path.write_text(json.dumps(captured), encoding='utf-8')
+    assert lc4tool.main(['validate', str(path), '--workers', '1', '--quiet']) == 0
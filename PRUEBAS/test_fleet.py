@@ -0,0 +1,58 @@
+# PRUEBAS/test_fleet.py
+#
+# Pruebas de la flota contra LC4 simulados: un puerto con un trabajo en cola o
+# en curso no se puede reconectar ni desconectar, y un trabajo cuyo puerto ya
+# no está deja su estado de error.
+#
+# Uso: python -m pytest PRUEBAS/test_fleet.py
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('LC4_DATA_DIR', tempfile.mkdtemp(prefix='lc4test-'))
+
+from test_project_model import partial_hardware_config
+
+from fleet import FleetManager, JOB_CAPTURE
+from simulator import LC4Simulator
+
+
+def wait_idle(fleet, timeout=30):
+    deadline = time.monotonic() + timeout
+    while fleet.get_status()['busy'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return fleet.get_status()
+
+
+def test_busy_port_is_not_reconnected_or_disconnected():
+    # Sin volcado de tablas la captura lee registro por registro y dura lo suficiente
+    simulator = LC4Simulator(controller_id=3, latency=0.002, eeprom_write_delay=0, table_dump=False)
+    simulator.load_hardware_config(partial_hardware_config())
+    port = simulator.start_pty()
+    fleet = FleetManager()
+    try:
+        assert fleet.connect([port], 115200)[port]['status'] == 'success'
+        assert fleet.start_job(JOB_CAPTURE, {port: None})['accepted'] == [port]
+        assert fleet.connect([port], 115200)[port]['status'] == 'error'
+        result = fleet.disconnect([port])
+        assert list(result['rejected']) == [port] and result['disconnected'] == []
+
+        [device] = wait_idle(fleet)['devices']
+        assert device['state'] == 'done' and device['is_connected']
+        assert fleet.get_result(port)['status'] == 'success'
+        assert fleet.disconnect([port])['disconnected'] == [port]
+    finally:
+        fleet.disconnect()
+        simulator.stop()
+
+
+def test_job_on_removed_port_records_error():
+    fleet = FleetManager()
+    fleet._run_job('/dev/no-existe', JOB_CAPTURE, None)
+    assert fleet._status['/dev/no-existe']['state'] == 'error'
+    assert fleet._results['/dev/no-existe']['status'] == 'error'
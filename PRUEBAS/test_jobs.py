@@ -0,0 +1,49 @@
+# PRUEBAS/test_jobs.py
+#
+# Pruebas de los trabajos de captura contra el LC4 simulado: los eventos de
+# avance cuentan los registros reales y no los slots vacíos de la EEPROM.
+#
+# Uso: python -m pytest PRUEBAS/test_jobs.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_project_model import partial_hardware_config
+
+from communicator import Communicator
+from controller import Controller
+from jobs import Job
+from simulator import LC4Simulator
+
+
+def test_job_is_abstract():
+    with pytest.raises(TypeError):
+        Job(None)
+
+
+def test_capture_counts_decoded_records():
+    simulator = LC4Simulator(controller_id=3, latency=0, eeprom_write_delay=0)
+    simulator.load_hardware_config(partial_hardware_config())
+    communicator = Communicator()
+    assert communicator.connect(simulator.start_pty(), 115200)['status'] == 'success'
+    try:
+        controller = Controller(communicator)
+        events = []
+        controller.capture_callback = events.append
+        assert controller.capture_full_configuration()['status'] == 'success'
+        captured = {e['table']: e['captured'] for e in events if e['type'] == 'table_done'}
+        assert captured == {'movements': 4, 'sequences': 1, 'plans': 1, 'intermittences': 0, 'holidays': 0,
+                            'flow_rules': 0}
+        streamed = {}
+        for event in events:
+            if event['type'] == 'records':
+                streamed[event['table']] = streamed.get(event['table'], 0) + len(event['records'])
+        assert streamed == {'movements': 4, 'sequences': 1, 'plans': 1}
+    finally:
+        communicator.disconnect()
+        simulator.stop()
@@ -0,0 +1,38 @@
+# PRUEBAS/test_project_file.py
+#
+# Pruebas del formato binario de proyecto: la conversión ida y vuelta no
+# pierde nada y una escritura que falla deja intacto el archivo anterior.
+#
+# Uso: python -m pytest PRUEBAS/test_project_file.py
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_conflicts import project
+
+import project_file
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'proyecto.lc4')
+    project_file.save_project(path, project())
+    with project_file.BinaryProject(path) as binary:
+        assert json.dumps(binary.project_data(), sort_keys=True) == json.dumps(project(), sort_keys=True)
+
+
+def test_failed_save_keeps_previous_file(tmp_path):
+    path = tmp_path / 'proyecto.lc4'
+    project_file.save_project(str(path), project())
+    saved = path.read_bytes()
+    broken = project()
+    broken['software_config']['extra'] = object() # No se puede serializar
+    with pytest.raises(TypeError):
+        project_file.save_project(str(path), broken)
+    assert path.read_bytes() == saved
+    assert os.listdir(tmp_path) == ['proyecto.lc4']
@@ -0,0 +1,98 @@
+# PRUEBAS/test_project_model.py
+#
+# Pruebas del modelo de proyecto: los slots vacíos de la EEPROM se decodifican
+# como slots vacíos y vuelven a codificarse con los mismos bytes, de modo que
+# una captura reproduce exactamente lo que guarda el controlador.
+#
+# Uso: python -m pytest PRUEBAS/test_project_model.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La caché por controlador y los trabajos de la prueba no deben mezclarse con los del usuario
+os.environ.setdefault('LC4_DATA_DIR', tempfile.mkdtemp(prefix='lc4test-'))
+
+from communicator import Communicator
+from controller import Controller
+from project_model import Holiday, ProjectModel, Sequence, TABLES, MAX_SEQUENCES
+from simulator import LC4Simulator
+
+
+def partial_hardware_config(controller_id=3):
+    """Proyecto con la mayoría de los slots de cada tabla vacíos, como un equipo recién configurado."""
+    movements = [{'id': i, 'portD': '49', 'portE': '92', 'portF': '24', 'portH': '00', 'portJ': '00',
+                  'times': [20, 5, 3, 2, 1]} for i in range(4)]
+    return {'info': {'controller_id': f'{controller_id:02X}'}, 'movements': movements,
+            'sequences': [{'id': 0, 'type': 0, 'anchor_pos': 0, 'movements': [0, 1, 2, 3]}],
+            'plans': [{'id': 0, 'day_type_id': 7, 'sequence_id': 0, 'time_sel': 0, 'hour': 6, 'minute': 0}],
+            'intermittences': [], 'holidays': [], 'flow_rules': []}
+
+
+def test_empty_sequence_slot_round_trip():
+    empty = Sequence.empty_payload(5)
+    assert Sequence.from_payload(empty) is None
+    model = ProjectModel()
+    assert model.encode_table('sequences')[5] == empty
+
+
+def test_empty_slots_of_every_table_round_trip():
+    model = ProjectModel()
+    for spec in TABLES:
+        for payload in model.encode_table(spec.name):
+            if spec.record_cls is not Holiday:
+                assert spec.record_cls.from_payload(payload) is None, spec.name
+
+
+def test_sequence_round_trip():
+    payload = bytes([2, 1, 3, 4, 7, 8, 9, 10]) + b'\xFF' * 8
+    sequence = Sequence.from_payload(payload)
+    assert list(sequence.movements) == [7, 8, 9, 10]
+    assert sequence.to_payload() == payload
+
+
+def test_capture_reproduces_eeprom_and_uses_cache():
+    simulator = LC4Simulator(controller_id=3, latency=0, eeprom_write_delay=0)
+    simulator.load_hardware_config(partial_hardware_config())
+    communicator = Communicator()
+    assert communicator.connect(simulator.start_pty(), 115200)['status'] == 'success'
+    try:
+        controller = Controller(communicator)
+        assert controller.capture_full_configuration()['status'] == 'success'
+        model = ProjectModel.from_hardware_config(controller.project_data['hardware_config'])
+        assert {table: len(records) for table, records in model.tables.items()} == {
+            'movements': 4, 'sequences': 1, 'plans': 1, 'intermittences': 0, 'holidays': 0, 'flow_rules': 0}
+        for spec in TABLES:
+            assert model.encode_table(spec.name) == simulator.eeprom[spec.name], spec.name
+        assert len(simulator.eeprom['sequences']) == MAX_SEQUENCES
+
+        # Con la EEPROM sin cambios, la siguiente carga sale de la caché sin recapturar
+        result = Controller(communicator).load_configuration()
+        assert result.get('source') == 'cache', result
+    finally:
+        communicator.disconnect()
+        simulator.stop()
+
+
+@pytest.mark.parametrize('controller_id', [10, 16, 255])
+def test_controller_id_round_trip(controller_id):
+    # La captura guarda el ID en hexadecimal: 10 -> "0A", 16 -> "10"
+    simulator = LC4Simulator(controller_id=controller_id, latency=0, eeprom_write_delay=0)
+    simulator.load_hardware_config(partial_hardware_config(controller_id))
+    communicator = Communicator()
+    assert communicator.connect(simulator.start_pty(), 115200)['status'] == 'success'
+    try:
+        controller = Controller(communicator)
+        assert controller.capture_full_configuration()['status'] == 'success'
+        hardware_config = controller.project_data['hardware_config']
+        assert hardware_config['info']['controller_id'] == f'{controller_id:02X}'
+        assert ProjectModel.from_hardware_config(hardware_config).controller_id_payload() == bytes([controller_id])
+        check = controller.verify_configuration(hardware_config, repair=False)
+        assert check['status'] == 'success', check
+    finally:
+        communicator.disconnect()
+        simulator.stop()
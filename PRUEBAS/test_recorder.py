@@ -0,0 +1,73 @@
+# PRUEBAS/test_recorder.py
+#
+# Pruebas del grabador circular de monitoreo: orden de los timestamps aunque
+# el reloj del sistema retroceda, detección de rangos ya sobrescritos y
+# crecimiento de un archivo existente sin perder lo grabado.
+#
+# Uso: python -m pytest PRUEBAS/test_recorder.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recorder
+from recorder import MonitoringRecorder
+
+PAYLOAD = bytes([1, 0x49, 0x92, 0x24, 0])
+
+
+def test_wall_clock_step_back_keeps_order(tmp_path, monkeypatch):
+    ring = MonitoringRecorder(str(tmp_path / 'r.ring'), capacity=100)
+    wall = [1_700_000_000.0]
+    monkeypatch.setattr(recorder.time, 'time', lambda: wall[0])
+    for _ in range(5):
+        ring.append(PAYLOAD)
+        wall[0] += 0.1
+    wall[0] -= 3600 # Ajuste del reloj hacia atrás
+    for _ in range(5):
+        ring.append(PAYLOAD)
+    ring.append(PAYLOAD, timestamp=1.0)
+    timestamps = [t for t, _ in ring.read_range()]
+    assert timestamps == sorted(timestamps)
+    assert len(ring.read_range(timestamps[3], timestamps[-1])) == len(timestamps) - 3
+    ring.close()
+
+
+def test_overwritten_range_is_reported(tmp_path):
+    ring = MonitoringRecorder(str(tmp_path / 'r.ring'), capacity=10)
+    for i in range(15):
+        ring.append(PAYLOAD, timestamp=100.0 + i)
+    assert ring.info()['start'] == 105.0
+    assert ring.is_complete(None) # Desde el más antiguo que se conserva
+    assert not ring.is_complete(103.0)
+    assert ring.is_complete(105.0)
+    ring.close()
+
+
+def test_grow_keeps_records(tmp_path):
+    path = str(tmp_path / 'r.ring')
+    ring = MonitoringRecorder(path, capacity=10)
+    for i in range(15):
+        ring.append(PAYLOAD, timestamp=100.0 + i)
+    ring.close()
+
+    ring = MonitoringRecorder(path, capacity=40)
+    assert ring.capacity == 40
+    assert [t for t, _ in ring.read_range()] == [100.0 + i for i in range(5, 15)]
+    assert not ring.is_complete(104.0)
+    for i in range(15, 45):
+        ring.append(PAYLOAD, timestamp=100.0 + i)
+    assert [t for t, _ in ring.read_range()] == [100.0 + i for i in range(5, 45)]
+    ring.close()
+
+
+def test_week_capacity_only_when_asked(tmp_path):
+    assert recorder.DEFAULT_CAPACITY * recorder.RECORD.size == 4 * 1024 * 1024
+    assert recorder.capacity_for_days(7) == 7 * 86400 * 10
+    path = str(tmp_path / 'r.ring')
+    MonitoringRecorder(path, capacity=40).close()
+    # Abrir con la capacidad por defecto no achica un archivo que se agrandó a pedido
+    ring = MonitoringRecorder(path, capacity=10)
+    assert ring.capacity == 40
+    ring.close()
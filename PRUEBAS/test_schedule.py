@@ -0,0 +1,50 @@
+# PRUEBAS/test_schedule.py
+#
+# Pruebas del programa de planes: las consultas por rango sobre los índices
+# anuales dan lo mismo que compilar el rango día por día, también cuando el
+# rango cruza el cambio de año.
+#
+# Uso: python -m pytest PRUEBAS/test_schedule.py
+
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule import PlanSchedule
+
+_ONE_DAY = datetime.timedelta(days=1)
+
+
+def compiled_transitions(schedule, start, end):
+    first = datetime.date.fromtimestamp(start)
+    last = datetime.date.fromtimestamp(end) + _ONE_DAY
+    return schedule.compile(first, last).transitions(start, end)
+
+
+def random_schedule(rng):
+    programs = {day: [(rng.randrange(1440), rng.randrange(4)) for _ in range(rng.randrange(5))]
+                for day in range(8)}
+    holidays = {(rng.randint(1, 12), rng.randint(1, 28)) for _ in range(5)} | {(1, 1), (12, 31)}
+    return PlanSchedule(programs, holidays)
+
+
+def test_range_queries_match_compiled_ranges():
+    rng = random.Random(1)
+    for _ in range(20):
+        schedule = random_schedule(rng)
+        for _ in range(10):
+            start = datetime.datetime(2024, rng.randint(1, 12), rng.randint(1, 28)).timestamp() + rng.random() * 86400 * 400
+            end = start + rng.random() * 86400 * rng.choice([1, 30, 800])
+            assert schedule.transitions(start, end) == compiled_transitions(schedule, start, end)
+
+
+def test_year_boundary():
+    schedule = PlanSchedule({day: [(360, 1), (1200, 2)] for day in range(8)}, {(1, 1)})
+    new_year = datetime.datetime(2025, 1, 1).timestamp()
+    for start, end in ((new_year - 3600, new_year), (new_year, new_year), (new_year - 3 * 86400, new_year + 3 * 86400)):
+        assert schedule.transitions(start, end) == compiled_transitions(schedule, start, end)
+    # El plan nocturno sigue en curso al cambiar de año: no aparece un cambio a medianoche
+    assert [plan for _, plan in schedule.transitions(new_year - 3600, new_year + 3600)] == [2]
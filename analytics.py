@@ -0,0 +1,255 @@
+# analytics.py
+#
+# Análisis de tiempos de fase sobre los reportes de monitoreo grabados.
+# Todo el procesamiento se hace con operaciones vectorizadas de NumPy sobre
+# el bloque de registros: no hay trabajo en Python por cada trama. Como las
+# luces sólo cambian en los cambios de fase, las tramas se agrupan primero en
+# tramos de puertos constantes y los estados se decodifican una vez por tramo.
+
+import datetime
+
+import numpy as np
+
+from lights import GROUP_BITS, NUM_GROUPS, PORT_TABLES
+from project_model import ProjectModel
+from recorder import RECORD
+from schedule import PlanSchedule
+
+# Mismo formato que recorder.RECORD: [timestamp float64][payload 5 bytes][3 de relleno]
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('payload', 'u1', (5,)), ('pad', 'V3')])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+STATE_OFF, STATE_RED, STATE_AMBER, STATE_GREEN, STATE_CONFLICT = range(5)
+STATE_NAMES = ('off', 'red', 'amber', 'green', 'conflict')
+
+MAX_FRAME_GAP = 5.0         # Un hueco mayor entre tramas es un corte de la grabación
+DEVIATION_TOLERANCE = 2.0   # Segundos de diferencia con lo programado antes de marcar una desviación
+MAX_DEVIATIONS = 200        # Desviaciones detalladas que se devuelven a la UI
+
+
+def load_frames(raw, controller_id=None):
+    """
+    Convierte los bytes crudos de la grabación en (timestamps, puertos), donde
+    puertos es una matriz (n, 3) con los bytes D/E/F. Opcionalmente filtra por
+    ID de controlador.
+    """
+    records = np.frombuffer(raw, dtype=RECORD_DTYPE)
+    timestamps = records['timestamp']
+    payloads = records['payload']
+    if controller_id is not None:
+        mask = payloads[:, 0] == controller_id
+        if not mask.all():
+            timestamps = timestamps[mask]
+            payloads = payloads[mask]
+    return timestamps, payloads[:, 1:4]
+
+
+# Estado según las luces encendidas del grupo (LIT_RED | LIT_AMBER | LIT_GREEN)
+_STATE_BY_LIGHTS = np.array([STATE_OFF, STATE_RED, STATE_AMBER, STATE_CONFLICT,
+                             STATE_GREEN, STATE_CONFLICT, STATE_CONFLICT, STATE_CONFLICT], dtype=np.uint8)
+_PORT_TABLES = np.array(PORT_TABLES, dtype=np.uint32)
+
+
+def group_states(ports):
+    """
+    Estado de cada grupo en cada trama: matriz (8, n) con STATE_OFF/RED/AMBER/GREEN,
+    o STATE_CONFLICT si hay más de una luz del grupo encendida.
+    """
+    packed = _PORT_TABLES[0][ports[:, 0]] | _PORT_TABLES[1][ports[:, 1]] | _PORT_TABLES[2][ports[:, 2]]
+    states = np.empty((NUM_GROUPS, len(ports)), dtype=np.uint8)
+    for row in range(NUM_GROUPS):
+        states[row] = _STATE_BY_LIGHTS[(packed >> (GROUP_BITS * row)) & 7]
+    return states
+
+
+def port_words(ports):
+    """Bytes D/E/F de cada trama combinados en una palabra de 24 bits, para comparar tramas de una vez."""
+    return (ports[:, 0].astype(np.uint32) << 16) | (ports[:, 1].astype(np.uint32) << 8) | ports[:, 2]
+
+
+def frame_durations(timestamps):
+    """Tiempo que representa cada trama (hasta la siguiente); los cortes de grabación valen 0."""
+    dt = np.zeros(len(timestamps))
+    np.subtract(timestamps[1:], timestamps[:-1], out=dt[:-1])
+    gaps = (dt > MAX_FRAME_GAP) | (dt < 0)
+    dt[gaps] = 0.0
+    return dt, gaps
+
+
+def _runs(state_row):
+    """Índices de inicio de cada tramo de valor constante."""
+    return np.concatenate(([0], np.flatnonzero(state_row[1:] != state_row[:-1]) + 1))
+
+
+def _programmed_plans(model):
+    """
+    Para cada plan: ciclo programado y verde programado por grupo (segundos),
+    calculados desde los tiempos de los movimientos de su secuencia.
+    """
+    programmed = {}
+    for plan in model.tables['plans'].values():
+        sequence = model.get('sequences', plan.sequence_id)
+        if sequence is None or plan.time_sel >= 5:
+            continue
+        cycle = 0
+        greens = np.zeros(NUM_GROUPS)
+        for movement_id in sequence.movements:
+            movement = model.get('movements', movement_id)
+            if movement is None:
+                continue
+            duration = movement.times[plan.time_sel]
+            cycle += duration
+            ports = np.array([[movement.port_d, movement.port_e, movement.port_f]], dtype=np.uint8)
+            greens += duration * (group_states(ports)[:, 0] == STATE_GREEN)
+        if cycle:
+            programmed[plan.id] = (cycle, greens)
+    return programmed
+
+
+def _active_plans(timestamps, model, programmed):
+    """Plan programado vigente en cada instante (-1 si no hay ninguno), feriados incluidos."""
+    if not len(timestamps):
+        return np.full(0, -1, dtype=np.int64)
+    schedule = PlanSchedule.from_model(model, plan_ids=programmed)
+    first = datetime.date.fromtimestamp(float(timestamps.min()))
+    last = datetime.date.fromtimestamp(float(timestamps.max())) + datetime.timedelta(days=1)
+    index = schedule.compile(first, last)
+    if not len(index):
+        return np.full(len(timestamps), -1, dtype=np.int64)
+    starts = np.asarray(index.starts)
+    plan_ids = np.asarray(index.plan_ids, dtype=np.int64)
+    position = np.searchsorted(starts, timestamps, side='right') - 1
+    return np.where(position >= 0, plan_ids[np.maximum(position, 0)], -1)
+
+
+def _round(values, digits=2):
+    return [round(float(v), digits) for v in values]
+
+
+def analyze(raw, hardware_config, controller_id=None):
+    """
+    Calcula las tablas de resumen para la UI: tiempos por color de cada grupo,
+    longitud de ciclo, comparación con el plan programado y desviaciones.
+    """
+    timestamps, ports = load_frames(raw, controller_id)
+    if len(timestamps) < 2:
+        return {'status': 'error', 'message': 'No hay suficientes reportes grabados en ese rango.'}
+
+    dt, gaps = frame_durations(timestamps)
+    gap_index = np.flatnonzero(gaps)
+
+    # --- Tramos de puertos constantes: se decodifica una trama por tramo ---
+    port_runs = _runs(port_words(ports))
+    port_run_durations = np.add.reduceat(dt, port_runs)
+    states = group_states(ports[port_runs])
+
+    # --- Tiempo total en cada estado y tramos por grupo ---
+    groups = []
+    green_starts = {}
+    green_durations = {}
+    for row in range(NUM_GROUPS):
+        totals = np.bincount(states[row], weights=port_run_durations, minlength=len(STATE_NAMES))
+        # Un tramo del grupo junta los tramos de puertos seguidos en que el grupo no cambia
+        run_starts = _runs(states[row])
+        is_green = states[row][run_starts] == STATE_GREEN
+        green_runs = np.add.reduceat(port_run_durations, run_starts)[is_green]
+        green_starts[row] = port_runs[run_starts[is_green]]
+        green_durations[row] = green_runs
+        groups.append({
+            'group': row + 1,
+            **{f'{name}_s': round(float(totals[i]), 1) for i, name in enumerate(STATE_NAMES)},
+            'green_phases': int(len(green_runs)),
+            'mean_green_s': round(float(green_runs.mean()), 2) if len(green_runs) else 0,
+            'min_green_s': round(float(green_runs.min()), 2) if len(green_runs) else 0,
+            'max_green_s': round(float(green_runs.max()), 2) if len(green_runs) else 0,
+        })
+
+    result = {
+        'status': 'success',
+        'frames': int(len(timestamps)),
+        'start': float(timestamps[0]),
+        'end': float(timestamps[-1]),
+        'recording_gaps': int(len(gap_index)),
+        'groups': groups,
+        'cycles': None,
+        'plans': [],
+        'deviations': [],
+    }
+
+    # --- Ciclos: entre inicios consecutivos del verde del grupo de referencia ---
+    reference = next((row for row in range(NUM_GROUPS) if len(green_starts[row]) >= 2), None)
+    if reference is None:
+        return result
+    cycle_idx = green_starts[reference]
+    lengths = np.diff(timestamps[cycle_idx])
+    # Ciclos sin cortes de grabación: igual cantidad de cortes antes de su inicio y antes de su fin
+    valid = (np.searchsorted(gap_index, cycle_idx[1:] - 1, side='right')
+             == np.searchsorted(gap_index, cycle_idx[:-1], side='right'))
+    cycle_idx, lengths = cycle_idx[:-1][valid], lengths[valid]
+    if not len(lengths):
+        return result
+    result['cycles'] = {
+        'reference_group': reference + 1,
+        'count': int(len(lengths)),
+        'mean_s': round(float(lengths.mean()), 2),
+        'min_s': round(float(lengths.min()), 2),
+        'max_s': round(float(lengths.max()), 2),
+    }
+
+    # --- Comparación con lo programado ---
+    try:
+        model = ProjectModel.from_hardware_config(hardware_config or {})
+    except (ValueError, TypeError, AttributeError):
+        return result
+    programmed = _programmed_plans(model)
+    if not programmed:
+        return result
+
+    cycle_plans = _active_plans(timestamps[cycle_idx], model, programmed)
+    # Verde medido por grupo en cada ciclo: suma de los verdes que empiezan dentro del ciclo
+    next_starts = np.searchsorted(timestamps, timestamps[cycle_idx] + lengths)
+    measured_greens = np.empty((NUM_GROUPS, len(cycle_idx)))
+    for row in range(NUM_GROUPS):
+        cumulative = np.concatenate(([0.0], np.cumsum(green_durations[row])))
+        measured_greens[row] = (cumulative[np.searchsorted(green_starts[row], next_starts)]
+                                - cumulative[np.searchsorted(green_starts[row], cycle_idx)])
+
+    deviations = []
+    for plan_id in np.unique(cycle_plans):
+        if plan_id < 0:
+            continue
+        mask = cycle_plans == plan_id
+        programmed_cycle, programmed_greens = programmed[int(plan_id)]
+        offsets = lengths[mask] - programmed_cycle
+        green_offsets = measured_greens[:, mask] - programmed_greens[:, None]
+        cycle_flags = np.abs(offsets) > DEVIATION_TOLERANCE
+        green_flags = np.abs(green_offsets) > DEVIATION_TOLERANCE
+        result['plans'].append({
+            'plan_id': int(plan_id),
+            'cycles': int(mask.sum()),
+            'programmed_cycle_s': int(programmed_cycle),
+            'measured_cycle_s': round(float(lengths[mask].mean()), 2),
+            'mean_offset_s': round(float(offsets.mean()), 2),
+            'max_abs_offset_s': round(float(np.abs(offsets).max()), 2),
+            'cycle_deviations': int(cycle_flags.sum()),
+            'programmed_green_s': _round(programmed_greens, 1),
+            'measured_green_s': _round(measured_greens[:, mask].mean(axis=1)),
+            'green_deviations': green_flags.sum(axis=1).astype(int).tolist(),
+        })
+
+        starts = timestamps[cycle_idx[mask]]
+        for i in np.flatnonzero(cycle_flags)[:MAX_DEVIATIONS]:
+            deviations.append({'start': float(starts[i]), 'plan_id': int(plan_id), 'kind': 'cycle', 'group': None,
+                               'measured_s': round(float(lengths[mask][i]), 2), 'programmed_s': int(programmed_cycle),
+                               'offset_s': round(float(offsets[i]), 2)})
+        rows, cols = np.nonzero(green_flags)
+        for row, i in list(zip(rows, cols))[:MAX_DEVIATIONS]:
+            deviations.append({'start': float(starts[i]), 'plan_id': int(plan_id), 'kind': 'green', 'group': int(row) + 1,
+                               'measured_s': round(float(measured_greens[row, mask][i]), 2),
+                               'programmed_s': round(float(programmed_greens[row]), 1),
+                               'offset_s': round(float(green_offsets[row, i]), 2)})
+
+    deviations.sort(key=lambda d: d['start'])
+    result['deviations'] = deviations[:MAX_DEVIATIONS]
+    result['deviation_count'] = len(deviations)
+    return result
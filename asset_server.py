@@ -0,0 +1,149 @@
+# asset_server.py
+#
+# Servidor HTTP local para la interfaz (web/ y assets/). Al iniciar carga todos
+# los archivos en memoria junto con su copia comprimida en gzip y su ETag, así
+# cada navegación o vista parcial se responde sin tocar el disco; el webview
+# revalida con If-None-Match y recibe 304 cuando nada cambió. Atiende varias
+# peticiones a la vez y sólo escucha en la interfaz local.
+
+import gzip
+import hashlib
+import http.server
+import logging
+import mimetypes
+import os
+import threading
+from urllib.parse import unquote, urlsplit
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_ROOTS = ('web', 'assets')
+SERVER_HOST = '127.0.0.1'
+
+# Tipos que vale la pena comprimir (las imágenes ya vienen comprimidas)
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Archivos más chicos que esto no se comprimen: el encabezado gzip no se compensa
+GZIP_MIN_SIZE = 512
+# HTML/JS/CSS siempre se revalidan (ETag); el resto se puede reutilizar un rato sin preguntar
+CACHE_REVALIDATE = 'no-cache'
+CACHE_STATIC = 'max-age=3600'
+
+mimetypes.add_type('application/javascript', '.js')
+
+
+class Asset:
+    """Un archivo servido desde memoria con su versión gzip (si conviene) y su ETag."""
+    __slots__ = ('body', 'gzip_body', 'content_type', 'etag', 'cache_control')
+
+    def __init__(self, rel_path, body):
+        content_type = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        self.gzip_body = None
+        if len(body) >= GZIP_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+        revalidate = rel_path.endswith(('.html', '.js', '.css'))
+        self.cache_control = CACHE_REVALIDATE if revalidate else CACHE_STATIC
+
+
+class AssetCache:
+    """Archivos de la interfaz indexados por su ruta URL (ej. '/web/html/app.html')."""
+    def __init__(self, base_dir=BASE_DIR, roots=ASSET_ROOTS):
+        self._base_dir = base_dir
+        self._roots = roots
+        self._lock = threading.Lock()
+        self._assets = {}
+
+    def preload(self):
+        total = 0
+        for root in self._roots:
+            for dirpath, _dirs, files in os.walk(os.path.join(self._base_dir, root)):
+                for name in files:
+                    rel_path = os.path.relpath(os.path.join(dirpath, name), self._base_dir)
+                    asset = self._load('/' + rel_path.replace(os.sep, '/'))
+                    total += len(asset.body) if asset else 0
+        log.info("Interfaz cargada en memoria: %d archivos (%d KB).", len(self._assets), total // 1024)
+
+    def _load(self, url_path):
+        rel_path = os.path.normpath(url_path.lstrip('/'))
+        # Sólo se sirve lo que está dentro de las carpetas de la interfaz
+        if rel_path.startswith('..') or rel_path.split(os.sep)[0] not in self._roots:
+            return None
+        try:
+            with open(os.path.join(self._base_dir, rel_path), 'rb') as f:
+                asset = Asset(rel_path, f.read())
+        except OSError:
+            return None
+        with self._lock:
+            self._assets[url_path] = asset
+        return asset
+
+    def get(self, url_path):
+        """Asset de una ruta; lo que no se precargó (ej. un archivo agregado después) se lee una vez del disco."""
+        asset = self._assets.get(url_path)
+        return asset if asset is not None else self._load(url_path)
+
+
+class AssetHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    assets = None
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        path = unquote(urlsplit(self.path).path)
+        if path == '/favicon.ico':
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        asset = self.assets.get(path)
+        if asset is None:
+            self.send_error(404, "Archivo no encontrado")
+            return
+
+        headers = {'ETag': asset.etag, 'Cache-Control': asset.cache_control}
+        if asset.gzip_body is not None:
+            headers['Vary'] = 'Accept-Encoding'
+        if asset.etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        body = asset.body
+        if asset.gzip_body is not None and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = asset.gzip_body
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(port, host=SERVER_HOST, base_dir=BASE_DIR):
+    """Crea el servidor (un hilo por conexión) con la interfaz ya cargada en memoria."""
+    cache = AssetCache(base_dir)
+    cache.preload()
+    handler = type('BoundAssetHandler', (AssetHandler,), {'assets': cache})
+    httpd = http.server.ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
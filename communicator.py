@@ -1,122 +1,585 @@
 # communicator.py
 
+import asyncio
+import collections
+import concurrent.futures
+import logging
 import serial
 import time
 import threading
 
+from link_stats import LinkStats
+
+log = logging.getLogger(__name__)
+
+# Delimitadores de trama del protocolo LC4: 'CSO' ... [checksum] 0x03 0xFF
+STX = b'\x43\x53\x4F'
+ETX = b'\x03\xFF'
+HEADER_SIZE = len(STX) + 2      # STX + CMD + LEN
+TRAILER_SIZE = 1 + len(ETX)     # Checksum + ETX
+
+WRITE_COMMANDS = {0x10, 0x22, 0x23, 0x30, 0x40, 0x50, 0x60, 0x70, 0xF0, 0x80, 0x81, 0x0C}
+CMD_ACK = 0x06
+CMD_NACK = 0x15
+# Volcado de una tabla completa: 0x0A [cmd de lectura de la tabla] ->
+# varias tramas 0x8A [cmd de lectura, nº de trama, total de tramas, registros...]
+CMD_TABLE_DUMP = 0x0A
+TABLE_DUMP_HEADER = 3
+# Escritura en bloque: tramas 0x0B [nº de trama, total, cmd de escritura, registros...]
+# que el firmware guarda en RAM y confirma con 0x8B [nº de trama]; luego
+# 0x0C [cmd de escritura, total] graba todo en la EEPROM y responde ACK (o NACK si falta alguna)
+CMD_TABLE_WRITE = 0x0B
+CMD_TABLE_COMMIT = 0x0C
+TABLE_WRITE_HEADER = 3
+# CRC-32 de una tabla: 0x0D [cmd de lectura] -> 0x8D [cmd de lectura, CRC (4 bytes, big endian)]
+CMD_TABLE_CRC = 0x0D
+
+# Timeout de lectura del puerto: sólo limita cuánto tarda el lector en notar que debe cerrar
+READ_POLL_TIMEOUT = 0.1
+DEFAULT_TIMEOUT = 1.5
+
+
+def build_frame(cmd_byte, data_payload=b''):
+    """Arma una trama completa: STX, CMD, LEN, payload, checksum y ETX."""
+    len_byte = len(data_payload)
+    checksum = (cmd_byte + len_byte + sum(data_payload)) % 256
+    return STX + bytes([cmd_byte, len_byte]) + data_payload + bytes([checksum]) + ETX
+
+
+class FrameDecoder:
+    """
+    Decodificador incremental de tramas del protocolo LC4.
+
+    Acumula en un buffer los bytes recibidos en bloque (todo lo que haya en
+    `in_waiting`) y extrae tramas completas ya validadas (longitud, checksum
+    y ETX), en lugar de buscar el STX leyendo el puerto byte a byte.
+    """
+    def __init__(self, max_buffer=8192):
+        self._buf = bytearray()
+        self._pos = 0
+        self._max_buffer = max_buffer
+        # Contadores de errores de trama para diagnóstico
+        self.checksum_errors = 0
+        self.etx_errors = 0
+        self.discarded_bytes = 0
+
+    @property
+    def pending(self):
+        """Bytes recibidos que todavía no forman una trama completa."""
+        return len(self._buf) - self._pos
+
+    def clear(self):
+        """Descarta todo lo pendiente en el buffer (equivale a reset_input_buffer)."""
+        self._buf.clear()
+        self._pos = 0
+
+    def feed(self, data):
+        """Agrega bytes recibidos al buffer."""
+        # Compactamos lo ya consumido antes de crecer
+        if self._pos:
+            del self._buf[:self._pos]
+            self._pos = 0
+        self._buf += data
+        # Si el buffer se desborda (línea con ruido constante) descartamos lo más antiguo
+        overflow = len(self._buf) - self._max_buffer
+        if overflow > 0:
+            del self._buf[:overflow]
+            self.discarded_bytes += overflow
+
+    def read_from(self, ser):
+        """
+        Lee de una sola vez todo lo disponible en el puerto. Si no hay nada
+        pendiente espera al menos un byte (respetando el timeout del puerto).
+        Retorna la cantidad de bytes leídos.
+        """
+        waiting = ser.in_waiting
+        data = ser.read(waiting if waiting else 1)
+        if data:
+            self.feed(data)
+        return len(data)
+
+    def next_frame(self):
+        """
+        Extrae la siguiente trama válida del buffer.
+        Retorna (cmd, payload) o None si todavía no hay una trama completa.
+        """
+        buf = self._buf
+        while True:
+            start = buf.find(STX, self._pos)
+            if start < 0:
+                # Conservamos la cola por si contiene un STX partido entre lecturas
+                keep_from = max(self._pos, len(buf) - (len(STX) - 1))
+                self.discarded_bytes += keep_from - self._pos
+                self._pos = keep_from
+                return None
+
+            self.discarded_bytes += start - self._pos
+            self._pos = start
+            if len(buf) - start < HEADER_SIZE:
+                return None
+
+            cmd_byte = buf[start + 3]
+            len_byte = buf[start + 4]
+            payload_start = start + HEADER_SIZE
+            end = payload_start + len_byte + TRAILER_SIZE
+            if len(buf) < end:
+                return None
+
+            payload = bytes(buf[payload_start:payload_start + len_byte])
+            if buf[end - len(ETX):end] != ETX:
+                # Falso STX o trama corrupta: seguimos buscando desde el byte siguiente
+                self.etx_errors += 1
+                self._pos = start + 1
+                continue
+
+            checksum_calculated = (cmd_byte + len_byte + sum(payload)) % 256
+            if buf[payload_start + len_byte] != checksum_calculated:
+                self.checksum_errors += 1
+                self._pos = start + 1
+                continue
+
+            self._pos = end
+            return cmd_byte, payload
+
+    def __iter__(self):
+        """Itera sobre todas las tramas completas disponibles en el buffer."""
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+
+class _PendingRequest:
+    __slots__ = ('cmd', 'payload', 'future', 'sent_at', 'frames', 'is_complete', 'progress', 'first_byte_at', 'bytes_in')
+
+    def __init__(self, cmd, payload, future):
+        self.cmd = cmd
+        self.payload = payload
+        self.future = future
+        self.sent_at = None
+        # Sólo para respuestas de varias tramas (ver AsyncTransport.request_frames)
+        self.frames = None
+        self.is_complete = None
+        self.progress = None
+        self.first_byte_at = None
+        self.bytes_in = 0
+
+    def matches(self, resp_cmd, resp_payload):
+        """
+        ¿Esta respuesta es para esta petición? Las lecturas se emparejan por byte
+        de comando e índice (primer byte del payload). ACK sólo responde a
+        escrituras y NACK a cualquier petición; como no traen índice se asignan a
+        la petición compatible más antigua, ya que el firmware responde en orden.
+        """
+        if resp_cmd == CMD_ACK:
+            return self.cmd in WRITE_COMMANDS
+        if resp_cmd == CMD_NACK:
+            return True
+        if resp_cmd != (self.cmd | 0x80):
+            return False
+        return not self.payload or resp_payload[:1] == self.payload[:1]
+
+
+class AsyncTransport:
+    """
+    Transporte asíncrono sobre un puerto serie abierto. Corre su propio event
+    loop de asyncio en un hilo, con una única tarea lectora que decodifica todo
+    lo que llega y lo reparte:
+
+    - las respuestas resuelven el futuro de la petición que las espera;
+    - las tramas no solicitadas (ej. reportes 0x82) se entregan a los
+      suscriptores de ese comando.
+
+    Varias peticiones (de distintos hilos) pueden estar en vuelo a la vez y el
+    monitoreo sigue recibiendo reportes mientras tanto. Los callbacks de los
+    suscriptores corren en el hilo del loop: deben ser rápidos y no pueden
+    llamar a los métodos síncronos del transporte.
+    """
+    def __init__(self, ser, stats=None):
+        self.ser = ser
+        self.decoder = FrameDecoder()
+        self.stats = stats if stats is not None else LinkStats()
+        self.stats.attach_decoder(self.decoder)
+        self._pending = collections.deque() # _PendingRequest en orden de envío
+        self._subscribers = {} # cmd -> [callback(cmd, payload)]
+        self._subscribers_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        # Las lecturas bloqueantes de pyserial corren en un hilo propio
+        self._io = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='lc4-serial')
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self.error = None
+
+    @property
+    def is_running(self):
+        return self._thread.is_alive() and self.error is None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._read_loop(), self._loop)
+
+    async def _shutdown(self):
+        self._fail_pending('Conexión cerrada')
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """Detiene el lector y el loop; las peticiones en vuelo fallan. No cierra el puerto serie."""
+        if not self._thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=1.0)
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1.0)
+        self._io.shutdown(wait=True)
+        self._loop.close()
+
+    # --- Suscripciones a tramas no solicitadas ---
+
+    def subscribe(self, cmd, callback):
+        """Entrega a `callback(cmd, payload)` cada trama `cmd` que no sea respuesta a una petición."""
+        with self._subscribers_lock:
+            self._subscribers.setdefault(cmd, []).append(callback)
+
+    def unsubscribe(self, cmd, callback):
+        with self._subscribers_lock:
+            callbacks = self._subscribers.get(cmd, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    # --- Lectura y despacho ---
+
+    def _read_chunk(self):
+        waiting = self.ser.in_waiting
+        return self.ser.read(waiting if waiting else 1)
+
+    async def _read_loop(self):
+        first_byte_at = None # Llegada del primer byte de la trama que se está armando
+        try:
+            while True:
+                data = await self._loop.run_in_executor(self._io, self._read_chunk)
+                if not data:
+                    continue
+                received_at = time.monotonic()
+                self.stats.record_bytes_in(len(data))
+                if not self.decoder.pending:
+                    first_byte_at = received_at
+                self.decoder.feed(data)
+                for cmd, payload in self.decoder:
+                    self._dispatch(cmd, payload, first_byte_at, received_at)
+                    # Las tramas siguientes empezaron dentro de este mismo bloque
+                    first_byte_at = received_at
+        except (serial.SerialException, OSError, TypeError) as e:
+            # Puerto cerrado o desconectado: las peticiones en vuelo fallan de inmediato
+            self.error = e
+            self._fail_pending(e)
+
+    def _dispatch(self, cmd, payload, first_byte_at, received_at):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Recibido: CMD 0x%02X payload %s", cmd, payload.hex().upper())
+        with self._subscribers_lock:
+            callbacks = list(self._subscribers.get(cmd, ()))
+        if callbacks:
+            self.stats.record_unsolicited(cmd)
+            for callback in callbacks:
+                try:
+                    callback(cmd, payload)
+                except Exception:
+                    log.exception("Error en el suscriptor de 0x%02X", cmd)
+            return
+
+        request = next((r for r in self._pending if r.matches(cmd, payload)), None)
+        if request is None:
+            # Trama no solicitada sin suscriptores, o respuesta tardía a una petición expirada
+            self.stats.record_unsolicited(cmd)
+            return
+        # El firmware responde en orden: lo enviado antes que esta petición y que
+        # sigue sin respuesta se perdió en la línea.
+        while self._pending[0] is not request:
+            older = self._pending.popleft()
+            if not older.future.done():
+                self.stats.record_timeout(older.cmd, lost=True)
+                older.future.set_result((None, None))
+            if older.progress is not None:
+                older.progress.set()
+
+        if request.first_byte_at is None:
+            request.first_byte_at = first_byte_at
+        request.bytes_in += HEADER_SIZE + len(payload) + TRAILER_SIZE
+        if request.frames is not None and cmd != CMD_NACK:
+            # Respuesta en varias tramas: la petición sigue pendiente hasta completarse
+            request.frames.append(payload)
+            request.progress.set()
+            if not request.is_complete(request.frames):
+                return
+            result = (cmd, list(request.frames))
+        else:
+            result = (cmd, payload)
+        self._pending.popleft()
+        self.stats.record_response(request.cmd, cmd == CMD_NACK, request.bytes_in,
+                                   request.first_byte_at - request.sent_at, received_at - request.sent_at)
+        if request.progress is not None:
+            request.progress.set()
+        if not request.future.done():
+            request.future.set_result(result)
+
+    def _fail_pending(self, error):
+        while self._pending:
+            request = self._pending.popleft()
+            if not request.future.done():
+                request.future.set_exception(serial.SerialException(str(error)))
+            if request.progress is not None:
+                request.progress.set()
+
+    # --- Peticiones ---
+
+    async def request(self, cmd_byte, data_payload=b'', timeout=DEFAULT_TIMEOUT):
+        """
+        Envía una trama y espera su respuesta. Retorna (resp_cmd, resp_payload),
+        o (None, None) si expiró o la respuesta se perdió.
+        """
+        if self.error is not None:
+            raise serial.SerialException(str(self.error))
+        request = _PendingRequest(cmd_byte, bytes(data_payload), self._loop.create_future())
+        self._pending.append(request)
+        frame = build_frame(cmd_byte, request.payload)
+        request.sent_at = time.monotonic()
+        self.ser.write(frame)
+        self.stats.record_request(cmd_byte, len(frame))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Enviado: %s", frame.hex().upper())
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except asyncio.TimeoutError:
+            self.stats.record_timeout(cmd_byte)
+            log.warning("Timeout para el comando 0x%02X", cmd_byte)
+            return None, None
+        finally:
+            if request in self._pending:
+                self._pending.remove(request)
+
+    async def request_frames(self, cmd_byte, data_payload, is_complete, timeout=DEFAULT_TIMEOUT):
+        """
+        Envía una petición cuya respuesta llega en varias tramas (ej. el volcado
+        de una tabla). Las tramas se acumulan hasta que `is_complete(frames)` es
+        verdadero; `timeout` es el silencio máximo entre dos tramas.
+        Retorna (resp_cmd, [payloads]); si expiró, resp_cmd es None y la lista
+        tiene lo recibido hasta ese momento. Un NACK retorna (CMD_NACK, []).
+        """
+        if self.error is not None:
+            raise serial.SerialException(str(self.error))
+        request = _PendingRequest(cmd_byte, bytes(data_payload), self._loop.create_future())
+        request.frames = []
+        request.is_complete = is_complete
+        request.progress = asyncio.Event()
+        self._pending.append(request)
+        frame = build_frame(cmd_byte, request.payload)
+        request.sent_at = time.monotonic()
+        self.ser.write(frame)
+        self.stats.record_request(cmd_byte, len(frame))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Enviado: %s", frame.hex().upper())
+        try:
+            while not request.future.done():
+                request.progress.clear()
+                try:
+                    await asyncio.wait_for(request.progress.wait(), timeout)
+                except asyncio.TimeoutError:
+                    self.stats.record_timeout(cmd_byte)
+                    log.warning("Timeout para el comando 0x%02X (%d tramas recibidas)", cmd_byte, len(request.frames))
+                    return None, list(request.frames)
+            resp_cmd, frames = request.future.result()
+            if resp_cmd is None or resp_cmd == CMD_NACK:
+                return resp_cmd, list(request.frames)
+            return resp_cmd, frames
+        finally:
+            if request in self._pending:
+                self._pending.remove(request)
+
+    async def request_many(self, commands, window=4, timeout=DEFAULT_TIMEOUT, on_response=None):
+        """
+        Envía varias peticiones manteniendo hasta `window` en vuelo. Retorna las
+        respuestas en el mismo orden que `commands`. Si se indica,
+        `on_response(posición, respuesta)` se llama (en el hilo del loop) a
+        medida que llega cada una.
+        """
+        # El semáforo es FIFO, así que las tramas salen en el orden de `commands`
+        slots = asyncio.Semaphore(window)
+
+        async def one(position, cmd_byte, data_payload):
+            async with slots:
+                response = await self.request(cmd_byte, data_payload, timeout)
+            if on_response is not None:
+                try:
+                    on_response(position, response)
+                except Exception:
+                    log.exception("Error en el callback de respuesta del lote")
+            return response
+
+        return await asyncio.gather(*(one(i, cmd, payload) for i, (cmd, payload) in enumerate(commands)))
+
+    def run(self, coroutine):
+        """Ejecuta una corrutina en el loop del transporte y espera su resultado (desde otro hilo)."""
+        try:
+            return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+        except (concurrent.futures.CancelledError, RuntimeError) as e:
+            # El transporte se cerró mientras esperábamos
+            coroutine.close()
+            raise serial.SerialException(f'Conexión cerrada: {e}')
+
+
 class Communicator:
     """
-    Gestiona la comunicación persistente con el puerto serie.
+    Gestiona la comunicación persistente con el puerto serie. Es una fachada
+    síncrona sobre AsyncTransport: cualquier hilo puede enviar comandos aunque
+    haya otros en vuelo o el monitoreo esté activo.
     """
     def __init__(self):
         self.ser = None
-        self.lock = threading.Lock()
+        self.lock = threading.Lock() # Sólo protege abrir/cerrar el puerto
+        self._transport = None
+        # Estadísticas del enlace, conservadas entre reconexiones
+        self.link_stats = LinkStats()
+        # Funciones opcionales del firmware detectadas en esta conexión (ej. 'table_dump')
+        self.capabilities = {}
 
     def connect(self, port, baudrate):
         with self.lock:
             try:
-                if self.ser and self.ser.is_open:
-                    self.ser.close()
-                self.ser = serial.Serial(port, int(baudrate), timeout=1.5) # Aumentamos un poco el timeout por seguridad
+                self._close()
+                self.capabilities = {}
+                # serial_for_url acepta tanto puertos (COM3, /dev/ttyUSB0) como URLs socket://host:puerto
+                self.ser = serial.serial_for_url(port, int(baudrate), timeout=READ_POLL_TIMEOUT)
                 time.sleep(0.1)
+                self.ser.reset_input_buffer()
+                self._transport = AsyncTransport(self.ser, self.link_stats)
+                self._transport.start()
                 return {'status': 'success'}
             except serial.SerialException as e:
                 self.ser = None
+                self._transport = None
                 return {'status': 'error', 'message': str(e)}
 
+    def _close(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+        self.ser = None
+
     def disconnect(self):
         with self.lock:
-            if self.ser and self.ser.is_open:
-                self.ser.close()
-                self.ser = None
+            self._close()
             return {'status': 'success'}
 
     @property
     def is_connected(self):
-        return self.ser is not None and self.ser.is_open
+        return self.ser is not None and self.ser.is_open and self._transport is not None and self._transport.is_running
+
+    def subscribe(self, cmd_byte, callback):
+        """
+        Recibe en `callback(cmd, payload)` las tramas `cmd_byte` no solicitadas
+        (ej. 0x82). El callback corre en el hilo del lector y debe ser rápido.
+        """
+        if not self._transport:
+            return False
+        self._transport.subscribe(cmd_byte, callback)
+        return True
+
+    def unsubscribe(self, cmd_byte, callback):
+        if self._transport:
+            self._transport.unsubscribe(cmd_byte, callback)
 
     def _build_frame(self, cmd_byte, data_payload=b''):
-        STX = bytes([0x43, 0x53, 0x4F])
-        ETX = bytes([0x03, 0xFF])
-        len_byte = len(data_payload)
-        checksum = (cmd_byte + len_byte + sum(data_payload)) % 256
-        return STX + bytes([cmd_byte, len_byte]) + data_payload + bytes([checksum]) + ETX
-
-    def _read_full_frame(self, timeout=1.5):
-        """
-        Lee una trama de datos binaria completa y validada desde el puerto serie.
-        Retorna (cmd, payload) si es válida, o (None, None) si hay error/timeout.
-        """
-        STX = b'\x43\x53\x4F'
-        ETX = b'\x03\xFF'
-        start_time = time.time()
-
-        while time.time() - start_time < timeout:
-            if self.ser.read(1) == STX[0:1]:
-                if self.ser.read(2) == STX[1:3]:
-                    # STX encontrado, leemos encabezado (CMD + LEN)
-                    header = self.ser.read(2)
-                    if len(header) < 2: continue
-
-                    cmd_byte, len_byte = header[0], header[1]
-                    
-                    # Leemos el resto (payload + checksum + ETX)
-                    full_payload = self.ser.read(len_byte + 3)
-                    if len(full_payload) < len_byte + 3: continue
-                    
-                    payload = full_payload[:len_byte]
-                    checksum_received = full_payload[len_byte]
-                    etx_received = full_payload[len_byte+1:]
-
-                    if etx_received != ETX:
-                        print("Error de Trama: ETX incorrecto.")
-                        continue
-
-                    checksum_calculated = (cmd_byte + len_byte + sum(payload)) % 256
-                    if checksum_received != checksum_calculated:
-                        print("Error de Trama: Checksum incorrecto.")
-                        continue
-                    
-                    return cmd_byte, payload
-
-        return None, None # Timeout
-
-    def send_command(self, cmd_byte, data_payload=b''):
+        return build_frame(cmd_byte, data_payload)
+
+    def _interpret_response(self, cmd_byte, resp_cmd, resp_payload):
+        """Convierte la trama de respuesta a un comando en el diccionario de resultado."""
+        if cmd_byte in WRITE_COMMANDS:
+            if resp_cmd == CMD_ACK:
+                return {'status': 'success', 'data': resp_payload}
+            elif resp_cmd == CMD_NACK:
+                return {'status': 'error', 'message': 'El controlador respondió con NACK.', 'nack': True}
+            else:
+                return {'status': 'error', 'message': f'Se esperaba ACK pero se recibió CMD 0x{resp_cmd:02X}.'}
+        else: # Comandos de Lectura
+            expected_resp_cmd = cmd_byte | 0x80
+            if resp_cmd == expected_resp_cmd:
+                return {'status': 'success', 'data': resp_payload}
+            elif resp_cmd == CMD_NACK:
+                log.info("NACK para el comando 0x%02X", cmd_byte)
+                return {'status': 'error', 'message': 'El controlador respondió con NACK (Dato no existe o es inválido).', 'nack': True}
+            else:
+                return {'status': 'error', 'message': f'Respuesta inesperada. Se esperaba 0x{expected_resp_cmd:02X} o NACK, pero se recibió 0x{resp_cmd:02X}.'}
+
+    def send_command(self, cmd_byte, data_payload=b'', timeout=DEFAULT_TIMEOUT):
         if not self.is_connected:
             return {'status': 'error', 'message': 'No hay una conexión activa.'}
+        try:
+            resp_cmd, resp_payload = self._transport.run(self._transport.request(cmd_byte, data_payload, timeout))
+        except serial.SerialException as e:
+            return {'status': 'error', 'message': f'Error de comunicación: {e}'}
+        if resp_cmd is None:
+            return {'status': 'error', 'message': f'Timeout para el comando 0x{cmd_byte:02X}.', 'timeout': True}
+        return self._interpret_response(cmd_byte, resp_cmd, resp_payload)
 
-        WRITE_COMMANDS = {0x10, 0x22, 0x23, 0x30, 0x40, 0x50, 0x60, 0x70, 0xF0, 0x80, 0x81}
-        CMD_ACK = 0x06
-        CMD_NACK = 0x15
+    @staticmethod
+    def _table_dump_complete(frames):
+        valid = [f for f in frames if len(f) >= TABLE_DUMP_HEADER]
+        return bool(valid) and len({f[1] for f in valid}) >= valid[0][2]
 
-        with self.lock:
-            frame = self._build_frame(cmd_byte, data_payload)
-            try:
-                self.ser.reset_input_buffer()
-                self.ser.write(frame)
-                print(f"Enviado: {frame.hex().upper()}")
-
-                resp_cmd, resp_payload = self._read_full_frame()
-
-                if resp_cmd is None:
-                    return {'status': 'error', 'message': f'Timeout para el comando 0x{cmd_byte:02X}.'}
-
-                if cmd_byte in WRITE_COMMANDS:
-                    if resp_cmd == CMD_ACK:
-                        print(f"Respuesta Recibida: ACK para comando 0x{cmd_byte:02X}")
-                        return {'status': 'success', 'data': resp_payload}
-                    else:
-                        return {'status': 'error', 'message': f'Se esperaba ACK pero se recibió CMD 0x{resp_cmd:02X}.'}
-                else: # Comandos de Lectura
-                    expected_resp_cmd = cmd_byte | 0x80
-                    if resp_cmd == expected_resp_cmd:
-                        print(f"Respuesta Recibida: CMD 0x{resp_cmd:02X} con payload: {resp_payload.hex().upper()}")
-                        return {'status': 'success', 'data': resp_payload}
-                    elif resp_cmd == CMD_NACK:
-                        print(f"Respuesta Recibida: NACK para el comando 0x{cmd_byte:02X}.")
-                        return {'status': 'error', 'message': 'El controlador respondió con NACK (Dato no existe o es inválido).'}
-                    else:
-                        return {'status': 'error', 'message': f'Respuesta inesperada. Se esperaba 0x{expected_resp_cmd:02X} o NACK, pero se recibió 0x{resp_cmd:02X}.'}
+    def read_table_dump(self, table_cmd, timeout=DEFAULT_TIMEOUT):
+        """
+        Pide el volcado completo de una tabla en una sola petición (CMD 0x0A).
+        Retorna {'status': 'success', 'data': registros concatenados} si llegaron
+        todas las tramas. Si expira a mitad de camino, 'status' es 'error' con
+        'timeout': True y 'data' tiene los registros de las tramas recibidas.
+        """
+        if not self.is_connected:
+            return {'status': 'error', 'message': 'No hay una conexión activa.', 'data': b''}
+        try:
+            resp_cmd, frames = self._transport.run(self._transport.request_frames(
+                CMD_TABLE_DUMP, bytes([table_cmd]), self._table_dump_complete, timeout))
+        except serial.SerialException as e:
+            return {'status': 'error', 'message': f'Error de comunicación: {e}', 'data': b''}
 
-            except serial.SerialException as e:
-                return {'status': 'error', 'message': f'Error de comunicación: {e}'}
\ No newline at end of file
+        by_seq = {f[1]: f[TABLE_DUMP_HEADER:] for f in frames if len(f) >= TABLE_DUMP_HEADER}
+        data = b''.join(by_seq[seq] for seq in sorted(by_seq))
+        if resp_cmd == CMD_NACK:
+            return {'status': 'error', 'message': 'El controlador no soporta el volcado de tablas (NACK).', 'nack': True, 'data': b''}
+        if resp_cmd is None:
+            return {'status': 'error', 'message': f'Timeout en el volcado de la tabla 0x{table_cmd:02X}.', 'timeout': True, 'data': data}
+        return {'status': 'success', 'data': data}
+
+    def _batch_result(self, cmd_byte, resp_cmd, resp_payload):
+        if resp_cmd is None:
+            return {'status': 'error', 'message': f'Timeout para el comando 0x{cmd_byte:02X}.', 'timeout': True}
+        return self._interpret_response(cmd_byte, resp_cmd, resp_payload)
+
+    def send_batch(self, commands, window=4, timeout=DEFAULT_TIMEOUT, on_result=None):
+        """
+        Envía una lista de comandos manteniendo hasta `window` peticiones en vuelo,
+        en lugar de esperar la respuesta de cada una antes de enviar la siguiente.
+        `commands` es una lista de tuplas (cmd_byte, data_payload).
+        Retorna una lista de resultados (mismo formato que send_command) en el
+        mismo orden que `commands`. `on_result(posición, resultado)` permite
+        procesar cada resultado apenas llega; corre en el hilo del transporte,
+        así que debe ser rápido.
+        """
+        if not self.is_connected:
+            return [{'status': 'error', 'message': 'No hay una conexión activa.'} for _ in commands]
+        def on_response(position, response):
+            on_result(position, self._batch_result(commands[position][0], *response))
+        callback = on_response if on_result is not None else None
+        try:
+            responses = self._transport.run(self._transport.request_many(commands, window, timeout, callback))
+        except serial.SerialException as e:
+            return [{'status': 'error', 'message': f'Error de comunicación: {e}'} for _ in commands]
+
+        return [self._batch_result(cmd_byte, resp_cmd, resp_payload)
+                for (cmd_byte, _), (resp_cmd, resp_payload) in zip(commands, responses)]
@@ -0,0 +1,44 @@
+# config_cache.py
+#
+# Caché en disco de la última configuración conocida de cada controlador,
+# indexada por el ID que reporta el equipo (CMD 0x11). Se actualiza después de
+# cada captura o subida completa; al volver a conectar, una comprobación barata
+# (CRC por tabla o unos pocos registros, ver verify.py) decide si se puede usar
+# en lugar de capturar todo de nuevo.
+
+import logging
+import os
+import time
+
+from storage import app_data_path, load_json, save_json
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = 'config_cache'
+
+
+def _cache_path(controller_number):
+    return app_data_path(CACHE_DIR, f'{int(controller_number):03d}.json')
+
+
+def load(controller_number):
+    """Entrada de la caché de un controlador ({'hardware_config', 'saved'}) o None."""
+    entry = load_json(_cache_path(controller_number))
+    if not entry or 'hardware_config' not in entry:
+        return None
+    return entry
+
+
+def save(controller_number, hardware_config):
+    try:
+        save_json(_cache_path(controller_number), {'controller_number': int(controller_number), 'saved': time.time(),
+                                                   'hardware_config': hardware_config})
+    except OSError as e:
+        log.warning("No se pudo guardar la caché del controlador %s: %s", controller_number, e)
+
+
+def invalidate(controller_number):
+    try:
+        os.remove(_cache_path(controller_number))
+    except OSError:
+        pass
@@ -0,0 +1,151 @@
+# conflicts.py
+#
+# Validación de conflictos de la configuración completa antes de subirla. Cada
+# movimiento se reduce a tres máscaras de 8 bits (grupos en rojo, en ámbar y en
+# verde) con tablas por puerto, igual que lights.py, y la matriz de conflictos
+# a una tabla de 256 entradas que lleva un conjunto de grupos en verde a los
+# grupos que chocan con alguno de ellos. Así cada comprobación (verdes en
+# conflicto, rojo y verde a la vez, transiciones de una secuencia, luces de
+# una intermitencia) es una búsqueda en tabla y un AND.
+
+from lights import LIGHT_MAP, NUM_GROUPS
+from project_model import ProjectModel
+
+# Posición de cada color en la palabra de máscaras: rojo en los bits 0-7, ámbar 8-15 y verde 16-23
+RED_SHIFT, AMBER_SHIFT, GREEN_SHIFT = 0, 8, 16
+_SHIFT_BY_COLOR = {'R': RED_SHIFT, 'A': AMBER_SHIFT, 'V': GREEN_SHIFT}
+ALL_GROUPS = (1 << NUM_GROUPS) - 1
+
+KIND_MOVEMENT = 'movement'
+KIND_TRANSITION = 'transition'
+KIND_INTERMITTENCE = 'intermittence'
+
+# Valor de un slot vacío de la EEPROM; los proyectos capturados antes pueden traer estos registros
+EMPTY_SLOT = 0xFF
+
+
+def _build_plane_table(port):
+    lights = [(bit, 1 << (_SHIFT_BY_COLOR[name[0]] + int(name[1:]) - 1))
+              for name, (light_port, bit) in LIGHT_MAP.items() if light_port == port]
+    return tuple(sum(mask for bit, mask in lights if value & (1 << bit)) for value in range(256))
+
+
+# Tablas precalculadas: byte de cada puerto -> su aporte a las máscaras rojo/ámbar/verde
+_TABLE_D, _TABLE_E, _TABLE_F = (_build_plane_table(port) for port in ('portD', 'portE', 'portF'))
+
+
+def color_masks(port_d, port_e, port_f):
+    """Máscaras de grupos (bit 0 = G1) en rojo, en ámbar y en verde."""
+    word = _TABLE_D[port_d] | _TABLE_E[port_e] | _TABLE_F[port_f]
+    return (word >> RED_SHIFT) & ALL_GROUPS, (word >> AMBER_SHIFT) & ALL_GROUPS, (word >> GREEN_SHIFT) & ALL_GROUPS
+
+
+def _groups(mask):
+    return [group + 1 for group in range(NUM_GROUPS) if mask & (1 << group)]
+
+
+def _group_names(mask):
+    return ', '.join(f'G{group}' for group in _groups(mask))
+
+
+def conflict_table(matrix):
+    """
+    Tabla de 256 entradas: para cada conjunto de grupos en verde, los grupos que
+    tienen conflicto con alguno de ellos. La matriz se toma como simétrica.
+    """
+    rows = [0] * NUM_GROUPS
+    for i in range(NUM_GROUPS):
+        for j in range(NUM_GROUPS):
+            try:
+                conflict = i != j and bool(matrix[i][j])
+            except (IndexError, KeyError, TypeError):
+                conflict = False
+            if conflict:
+                rows[i] |= 1 << j
+                rows[j] |= 1 << i
+    table = [0] * (1 << NUM_GROUPS)
+    for greens in range(1, 1 << NUM_GROUPS):
+        lowest = greens & -greens
+        table[greens] = table[greens ^ lowest] | rows[lowest.bit_length() - 1]
+    return tuple(table)
+
+
+def _issue(kind, table, record_id, groups, message):
+    return {'kind': kind, 'table': table, 'id': record_id, 'groups': _groups(groups), 'message': message}
+
+
+def check_model(model, matrix):
+    """Lista de conflictos del `ProjectModel` según la matriz 8x8 de conflictos verde/verde."""
+    conflicts = conflict_table(matrix or ())
+    issues = []
+
+    masks = {}
+    for movement_id in sorted(model.tables['movements']):
+        movement = model.tables['movements'][movement_id]
+        reds, ambers, greens = masks[movement_id] = color_masks(movement.port_d, movement.port_e, movement.port_f)
+        clashing = conflicts[greens] & greens
+        if clashing:
+            issues.append(_issue(KIND_MOVEMENT, 'movements', movement_id, clashing,
+                                 f'Movimiento {movement_id}: verdes en conflicto en {_group_names(clashing)}.'))
+        both = reds & greens
+        if both:
+            issues.append(_issue(KIND_MOVEMENT, 'movements', movement_id, both,
+                                 f'Movimiento {movement_id}: {_group_names(both)} con rojo y verde a la vez.'))
+
+    for sequence_id in sorted(model.tables['sequences']):
+        steps = [m for m in model.tables['sequences'][sequence_id].movements if m in masks]
+        # El ciclo se repite: también se revisa el paso del último movimiento al primero
+        for current, following in zip(steps, steps[1:] + steps[:1]):
+            if current == following:
+                continue
+            _, _, greens = masks[current]
+            next_reds, next_ambers, next_greens = masks[following]
+            where = f'Secuencia {sequence_id}, de Mov. {current} a Mov. {following}'
+            no_amber = greens & next_reds & ~next_ambers
+            if no_amber:
+                issues.append(_issue(KIND_TRANSITION, 'sequences', sequence_id, no_amber,
+                                     f'{where}: {_group_names(no_amber)} pasa de verde a rojo sin ámbar.'))
+            no_clearance = conflicts[greens] & next_greens & ~greens
+            if no_clearance:
+                issues.append(_issue(KIND_TRANSITION, 'sequences', sequence_id, no_clearance,
+                                     f'{where}: {_group_names(no_clearance)} recibe verde sin despeje de un '
+                                     f'grupo en conflicto.'))
+
+    for rule_id in sorted(model.tables['intermittences']):
+        rule = model.tables['intermittences'][rule_id]
+        if rule.plan_id == EMPTY_SLOT or rule.movement_id == EMPTY_SLOT:
+            continue
+        plan = model.get('plans', rule.plan_id)
+        sequence = model.get('sequences', plan.sequence_id) if plan else None
+        where = f'Intermitencia {rule_id}'
+        if plan is None:
+            issues.append(_issue(KIND_INTERMITTENCE, 'intermittences', rule_id, 0,
+                                 f'{where}: el plan {rule.plan_id} no existe.'))
+        elif sequence is None or rule.movement_id not in sequence.movements or rule.movement_id not in masks:
+            issues.append(_issue(KIND_INTERMITTENCE, 'intermittences', rule_id, 0,
+                                 f'{where}: el movimiento {rule.movement_id} no está en la secuencia del plan {plan.id}.'))
+        else:
+            flashing = color_masks(rule.mask_d, rule.mask_e, rule.mask_f)
+            lit = masks[rule.movement_id]
+            dark = 0
+            for flashing_color, lit_color in zip(flashing, lit):
+                dark |= flashing_color & ~lit_color
+            if dark:
+                issues.append(_issue(KIND_INTERMITTENCE, 'intermittences', rule_id, dark,
+                                     f'{where}: {_group_names(dark)} intermitente pero apagado en el movimiento '
+                                     f'{rule.movement_id}.'))
+    return issues
+
+
+def check_project(project_data) -> dict:
+    """Valida los datos de un proyecto (.lc4): configuración de hardware y matriz de conflictos."""
+    try:
+        model = ProjectModel.from_hardware_config(project_data.get('hardware_config', {}))
+    except (ValueError, TypeError, AttributeError) as e:
+        return {'status': 'error', 'message': f'Configuración inválida: {e}', 'conflicts': []}
+    intersection = (project_data.get('software_config') or {}).get('intersection') or {}
+    issues = check_model(model, intersection.get('conflict_matrix'))
+    if issues:
+        return {'status': 'error', 'message': f'Se encontraron {len(issues)} conflictos en la configuración.',
+                'conflicts': issues}
+    return {'status': 'success', 'message': 'No se encontraron conflictos.', 'conflicts': []}
@@ -1,17 +1,30 @@
 # controller.py
 
-import re
 import json
-from communicator import Communicator
+import logging
+from communicator import (Communicator, DEFAULT_TIMEOUT, CMD_TABLE_WRITE, CMD_TABLE_COMMIT,
+                          TABLE_WRITE_HEADER, CMD_TABLE_CRC)
+from pacing import WritePacer
+from lights import group_states
+from project_model import ProjectModel, TABLES, CMD_WRITE_CONTROLLER_ID, format_controller_id
+from jobs import CaptureJob, UploadJob, load_job, list_jobs
+import verify
+import config_cache
+import project_file
 import time
-# --- Constantes actualizadas ---
-MAX_MOVEMENTS = 60
-MAX_SEQUENCES = 8
-MAX_PLANS = 20
-MAX_INTERMITENCES = 10
-MAX_HOLIDAYS = 20
-# Nueva constante extraída del firmware
-MAX_FLOW_CONTROL_RULES = 10
+
+log = logging.getLogger(__name__)
+
+# Peticiones de lectura que se mantienen en vuelo durante la captura
+BATCH_WINDOW = 4
+# Reintentos de una escritura que recibe NACK o timeout
+WRITE_RETRIES = 2
+# Espera de la primera prueba del volcado de tablas: un firmware que no lo soporta puede no responder
+TABLE_DUMP_PROBE_TIMEOUT = 0.5
+# Reenvíos de las tramas de una escritura en bloque que no fueron confirmadas
+TABLE_WRITE_RETRIES = 2
+# La confirmación graba toda la tabla en la EEPROM: su espera crece con los registros
+COMMIT_TIMEOUT_PER_RECORD = 0.02
 
 
 class Controller:
@@ -25,6 +38,22 @@ class Controller:
             },
             'software_config': {}
         }
+        # Payloads que sabemos que están escritos en el controlador (para la subida diferencial)
+        self._synced_payloads = None
+        # Ritmo de escritura en EEPROM aprendido por comando
+        self._pacer = WritePacer()
+        # Función opcional (etapa, hechos, total) para informar el avance de captura/subida
+        self.progress_callback = None
+        # Función opcional que recibe los eventos de la captura (tablas y registros a medida que llegan)
+        self.capture_callback = None
+
+    def _report_progress(self, stage, done, total):
+        if self.progress_callback:
+            self.progress_callback(stage, done, total)
+
+    def _emit_capture_event(self, event):
+        if self.capture_callback:
+            self.capture_callback(event)
 
     def parse_monitoring_report(self, payload: bytes) -> dict | None:
         """
@@ -34,29 +63,34 @@ class Controller:
         if len(payload) != 5:
             return None
         
-        # Extraemos los valores de los puertos como cadenas hexadecimales
-        port_d_hex = f"{payload[1]:02X}"
-        port_e_hex = f"{payload[2]:02X}"
-        port_f_hex = f"{payload[3]:02X}"
-        
-        # Devolvemos un diccionario con el mismo formato que un 'movimiento'
-        # para poder reutilizar la lógica de visualización del frontend.
+        # Decodificamos los puertos con las tablas precalculadas: la UI recibe
+        # directamente las luces encendidas de cada grupo, sin re-decodificar.
         return {
-            'portD': port_d_hex,
-            'portE': port_e_hex,
-            'portF': port_f_hex,
-            'portH': "00", # No vienen en el reporte, asumimos 0
-            'portJ': "00"  # No vienen en el reporte, asumimos 0
+            'controller_id': payload[0],
+            'groups': group_states(payload[1], payload[2], payload[3]),
+            'pedestrian': payload[4]
         }
         
-    def load_project_from_file(self, filepath: str) -> dict:
+    def load_project_from_file(self, filepath: str, load_software=True) -> dict:
         """
-        MODIFICADO: Lee un archivo .lc4 y maneja tanto el formato nuevo como el antiguo.
+        MODIFICADO: Lee un archivo .lc4 y maneja tanto el formato nuevo como el antiguo,
+        y también el binario (ver project_file.py), que se detecta por su encabezado.
+        En un binario, sin `load_software` no se lee el mapa (sólo la matriz de conflictos).
         """
-        print(f"CONTROLLER: Cargando proyecto desde {filepath}")
+        log.info("Cargando proyecto desde %s", filepath)
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                head = f.read(len(project_file.MAGIC))
+                if project_file.is_binary_project(head):
+                    data = None
+                else:
+                    data = json.loads(head + f.read())
+
+            if data is None:
+                with project_file.BinaryProject(filepath) as binary:
+                    self.project_data = binary.project_data(load_software)
+                self.project_data.setdefault('software_config', {})
+                return {'status': 'success', 'format': 'binary'}
             
             # NUEVO: Lógica de compatibilidad hacia atrás
             if 'hardware_config' in data and 'software_config' in data:
@@ -64,7 +98,7 @@ class Controller:
                 self.project_data = data
             else:
                 # Es el formato antiguo, lo adaptamos a la nueva estructura
-                print("Detectado formato de archivo antiguo. Adaptando a la nueva estructura.")
+                log.info("Detectado formato de archivo antiguo. Adaptando a la nueva estructura.")
                 self.project_data['hardware_config'] = {
                     'info': data.get('info', {}),
                     'movements': data.get('movements', []),
@@ -82,7 +116,7 @@ class Controller:
                 else:
                     self.project_data['software_config'] = {}
 
-            return {'status': 'success'}
+            return {'status': 'success', 'format': 'current' if self.project_data is data else 'legacy'}
         except Exception as e:
             # ... (manejo de errores sin cambios) ...
             return {'status': 'error', 'message': str(e)}
@@ -91,7 +125,7 @@ class Controller:
         """
         MODIFICADO: Reinicia el proyecto a la nueva estructura vacía.
         """
-        print("CONTROLLER: Reseteando datos del proyecto a estado inicial.")
+        log.info("Reseteando datos del proyecto a estado inicial.")
         self.project_data = {
             'hardware_config': {
                 'info': {}, 'movements': [], 'sequences': [], 'plans': [],
@@ -103,9 +137,8 @@ class Controller:
     def _parse_id_response(self, response_payload: bytes | None) -> str:
         # Payload: [ID] (1 byte)
         if response_payload:
-            # response_payload[0] es el valor numérico del byte.
-            # f"{...:02X}" lo formatea como un string hexadecimal de dos caracteres.
-            return f"{response_payload[0]:02X}"
+            # response_payload[0] es el valor numérico del byte; el proyecto lo guarda en hexadecimal
+            return format_controller_id(response_payload[0])
         return "N/A"
 
 
@@ -118,161 +151,160 @@ class Controller:
             return date_str, time_str
         return "Formato Inválido", "Formato Inválido"
 
-    def _parse_movement_response(self, response_payload: bytes) -> dict | None:
-        # Payload: [Index, D, E, F, H, J, T0, T1, T2, T3, T4] (11 bytes)
-        if len(response_payload) == 11:
-            
-            # --- INICIO DE LA SOLUCIÓN ---
-            # Un slot de movimiento vacío en la EEPROM usualmente se lee como 0xFF.
-            # Si el primer byte de los puertos es 0xFF, consideramos que es un
-            # movimiento inválido o "fantasma" y lo descartamos devolviendo None.
-            portD_value = response_payload[1]
-            if portD_value == 0xFF:
-                return None # Descartar este movimiento
-            # --- FIN DE LA SOLUCIÓN ---
-
-            return {
-                'id': response_payload[0],
-                'portD': f"{response_payload[1]:02X}",
-                'portE': f"{response_payload[2]:02X}",
-                'portF': f"{response_payload[3]:02X}",
-                'portH': f"{response_payload[4]:02X}",
-                'portJ': f"{response_payload[5]:02X}",
-                'times': list(response_payload[6:])
-            }
-        return None
-
-    def _parse_sequence_response(self, response_payload: bytes) -> dict | None:
-        # Payload: [Index, Tipo, Ancla_Pos, Num_Mov, Mov_0, ..., Mov_11] (16 bytes)
-        if len(response_payload) == 16:
-            num_movements = response_payload[3]
-            movements = list(response_payload[4:4+num_movements])
-            return {
-                'id': response_payload[0],
-                'type': response_payload[1],
-                'anchor_pos': response_payload[2],
-                'movements': movements
-            }
-        return None
-
-    def _parse_plan_response(self, response_payload: bytes) -> dict | None:
-        # Payload: [Index, TipoDia, Sec, Tsel, Hora, Min] (6 bytes)
-        if len(response_payload) == 6:
-            return {
-                'id': response_payload[0],
-                'day_type_id': response_payload[1],
-                'sequence_id': response_payload[2],
-                'time_sel': response_payload[3],
-                'hour': response_payload[4],
-                'minute': response_payload[5]
-            }
-        return None
-
-    def _parse_intermittence_response(self, response_payload: bytes) -> dict | None:
-        # Payload: [Index, PlanID, MovID, MaskD, MaskE, MaskF] (6 bytes)
-        if len(response_payload) == 6:
-            return {
-                'id': response_payload[0],
-                'id_plan': response_payload[1], # Corregido para que coincida con el frontend
-                'indice_mov': response_payload[2], # Corregido para que coincida con el frontend
-                'maskD': f"{response_payload[3]:02X}",
-                'maskE': f"{response_payload[4]:02X}",
-                'maskF': f"{response_payload[5]:02X}"
-            }
-        return None
-
-
-    def _parse_flow_rule_response(self, response_payload: bytes) -> dict | None:
-        # Payload: [Index, Sec, MovOrig, Tipo, Mascara, MovDest] (6 bytes)
-        if len(response_payload) == 6:
-            return {
-                'id': response_payload[0],
-                'sequence_id': response_payload[1],
-                'origin_mov_id': response_payload[2],
-                'rule_type': response_payload[3],
-                'demand_mask': response_payload[4],
-                'destination_mov_id': response_payload[5]
-            }
-        return None
-        
-    def _parse_all_holidays_response(self, response_payload: bytes) -> list:
-        # Payload: [ID, Dia, Mes, ID, Dia, Mes, ...] (N * 3 bytes)
-        holidays = []
-        chunk_size = 3
-        for i in range(0, len(response_payload), chunk_size):
-            chunk = response_payload[i:i+chunk_size]
-            if len(chunk) == chunk_size:
-                holidays.append({
-                    'id': chunk[0],
-                    'day': chunk[1],
-                    'month': chunk[2]
-                })
-        return holidays
-
-    # --- FIN DE NUEVOS MÉTODOS DE PARSEO ---
-
-    def _fetch_all_items(self, item_name: str, max_items: int, read_cmd: int, parser_func) -> list:
-        """Función genérica para leer una lista de items uno por uno."""
-        print(f"CONTROLLER: Capturando {item_name}...")
-        items = []
-        for i in range(max_items):
-            payload = bytes([i])
-            response = self._comm.send_command(read_cmd, data_payload=payload)
-            # Si el comando fue exitoso (no NACK), procesamos el payload.
+    def _fetch_table_dump(self, spec) -> dict | None:
+        """
+        Lee una tabla completa con el volcado en bloque (una petición, pocas tramas).
+        Retorna {índice: payload} con los slots que llegaron, o None si el volcado no está disponible. Sólo un NACK
+        marca el volcado como no soportado para toda la conexión; si la prueba expira sin datos (una trama
+        perdida en una línea ruidosa) esta tabla se lee registro por registro y la siguiente vuelve a probar.
+        """
+        supported = self._comm.capabilities.get('table_dump')
+        if supported is False:
+            return None
+        timeout = TABLE_DUMP_PROBE_TIMEOUT if supported is None else DEFAULT_TIMEOUT
+        response = self._comm.read_table_dump(spec.read_cmd, timeout=timeout)
+        if supported is None:
+            if response.get('nack'):
+                self._comm.capabilities['table_dump'] = False
+                log.info("Volcado de tablas no soportado por el firmware.")
+                return None
+            if response['status'] != 'success' and not response.get('data'):
+                log.info("La prueba del volcado de %s no tuvo respuesta; se probará de nuevo.", spec.label_plural)
+                return None
+            self._comm.capabilities['table_dump'] = True
+            log.info("Volcado de tablas soportado por el firmware.")
+
+        data = response.get('data', b'')
+        size = spec.record_cls.SIZE
+        slots = {}
+        for offset in range(0, len(data) - size + 1, size):
+            payload = data[offset:offset + size]
+            if payload[0] < spec.max_items:
+                slots[payload[0]] = payload
+        return slots
+
+    def _fetch_table_crc(self, spec) -> int | None:
+        """
+        CRC-32 de una tabla calculado por el firmware (CMD 0x0D), o None si no lo
+        soporta o no respondió. Sólo un NACK marca el CRC como no soportado para
+        toda la conexión; tras un timeout la próxima tabla vuelve a probar.
+        """
+        supported = self._comm.capabilities.get('table_crc')
+        if supported is False:
+            return None
+        timeout = TABLE_DUMP_PROBE_TIMEOUT if supported is None else DEFAULT_TIMEOUT
+        response = self._comm.send_command(CMD_TABLE_CRC, bytes([spec.read_cmd]), timeout=timeout)
+        ok = response.get('status') == 'success' and len(response['data']) == 5
+        if supported is None and (ok or response.get('nack')):
+            self._comm.capabilities['table_crc'] = ok
+            log.info("CRC de tablas %s por el firmware.", "soportado" if ok else "no soportado")
+        return int.from_bytes(response['data'][1:5], 'big') if ok else None
+
+    def _fetch_items(self, spec, indexes, on_record=None) -> tuple[dict, list]:
+        """
+        Lee registros de una tabla índice por índice, en lote (varias peticiones en
+        vuelo). Retorna ({índice: payload, o None si el controlador respondió NACK},
+        [índices que expiraron]). `on_record(índice, payload)` recibe cada registro
+        leído apenas llega.
+        """
+        commands = [(spec.read_cmd, bytes([i])) for i in indexes]
+        def on_result(position, response):
             if response.get('status') == 'success':
-                parsed_item = parser_func(response['data'])
-                if parsed_item:
-                    items.append(parsed_item)
-        print(f"CONTROLLER: Capturados {len(items)} {item_name}.")
-        return items
+                on_record(indexes[position], response['data'])
+        callback = on_result if on_record is not None else None
+        responses = self._comm.send_batch(commands, window=BATCH_WINDOW, on_result=callback) if commands else []
+
+        slots, failed = {}, []
+        for index, response in zip(indexes, responses):
+            if response.get('status') == 'success':
+                slots[index] = response['data']
+            elif response.get('timeout') or not self._comm.is_connected:
+                failed.append(index)
+            else:
+                # NACK: el controlador no tiene ese registro
+                slots[index] = None
+        return slots, failed
         
     # --- NUEVA FUNCIÓN DE CAPTURA PARA FERIADOS ---
-    def _fetch_all_holidays(self) -> list:
-        """Función específica para capturar todos los feriados con un solo comando."""
-        print("CONTROLLER: Capturando feriados...")
-        response = self._comm.send_command(0x61)
-        items = []
+    def _fetch_all_holidays(self, spec) -> bytes | None:
+        """Función específica para capturar todos los feriados con un solo comando (None si falló)."""
+        log.info("Capturando feriados...")
+        response = self._comm.send_command(spec.read_cmd)
         if response.get('status') == 'success':
-            items = self._parse_all_holidays_response(response['data'])
-        print(f"CONTROLLER: Capturados {len(items)} feriados.")
-        return items
+            return response['data']
+        if response.get('timeout') or not self._comm.is_connected:
+            return None
+        return b''
 
     # --- MÉTODO DE CAPTURA PRINCIPAL ACTUALIZADO ---
-    def capture_full_configuration(self):
+    def capture_full_configuration(self) -> dict:
         """
         Orquesta la captura de TODA la configuración del controlador
-        y la almacena en self.project_data.
+        y la almacena en self.project_data. Si quedan registros sin leer, el
+        resultado trae el 'job_id' con el que se puede reanudar (ver jobs.py).
         """
-        print("CONTROLLER: Iniciando captura de configuración completa...")
-        # Información básica
+        return CaptureJob(self).run()
+
+    def load_configuration(self) -> dict:
+        """
+        Trae la configuración del controlador conectado. Si hay una copia en la
+        caché para su ID y la comprobación rápida (CRC por tabla o una muestra
+        de registros) coincide, se usa sin capturar; si no, captura completa.
+        """
+        start = time.monotonic()
         id_response = self._comm.send_command(0x11)
-        time_response = self._comm.send_command(0x21)
-        
-        # --- INICIO DE LA CORRECCIÓN ---
-        # Extraemos el campo 'data' del diccionario de respuesta ANTES de pasarlo al parser.
-        controller_id = self._parse_id_response(id_response.get('data'))
-        date_str, time_str = self._parse_time_response(time_response.get('data'))
-        # --- FIN DE LA CORRECCIÓN ---
-
-        # Captura de todas las tablas de datos (esta parte ya estaba bien)
-        movements = self._fetch_all_items("movimientos", MAX_MOVEMENTS, 0x24, self._parse_movement_response)
-        sequences = self._fetch_all_items("secuencias", MAX_SEQUENCES, 0x31, self._parse_sequence_response)
-        plans = self._fetch_all_items("planes", MAX_PLANS, 0x41, self._parse_plan_response)
-        intermittences = self._fetch_all_items("intermitencias", MAX_INTERMITENCES, 0x51, self._parse_intermittence_response)
-        holidays = self._fetch_all_holidays()
-        flow_rules = self._fetch_all_items("reglas de flujo", MAX_FLOW_CONTROL_RULES, 0x71, self._parse_flow_rule_response)
-        
-        # Almacenamiento en el diccionario del proyecto
-        self.project_data['hardware_config'] = {
-            'info': {'controller_id': controller_id, 'date': date_str, 'time': time_str},
-            'movements': movements,
-            'sequences': sequences,
-            'plans': plans,
-            'intermittences': intermittences,
-            'holidays': holidays,
-            'flow_rules': flow_rules
-        }
-        print("CONTROLLER: Captura completa finalizada.")
+        if id_response.get('status') == 'success' and id_response['data']:
+            number = id_response['data'][0]
+            entry = config_cache.load(number)
+            if entry:
+                result = self._load_cached(number, entry['hardware_config'], id_response['data'])
+                if result:
+                    log.info("Configuración tomada de la caché en %.0f ms.", (time.monotonic() - start) * 1000)
+                    return result
+        return self.capture_full_configuration()
+
+    def _load_cached(self, number, hardware_config, id_payload):
+        try:
+            model = ProjectModel.from_hardware_config(hardware_config)
+            tables = {spec.name: model.encode_table(spec.name) for spec in TABLES}
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            log.warning("Caché del controlador %s inválida: %s", number, e)
+            config_cache.invalidate(number)
+            return None
+        check = verify.verify_configuration(self, tables, repair=False)
+        if check['status'] != 'success':
+            log.info("La caché del controlador %s está desactualizada: %s", number, check['message'])
+            return None
+
+        # La fecha y hora sí se leen en vivo
+        date_str, time_str = self._parse_time_response(self._comm.send_command(0x21).get('data'))
+        model.info.update({'controller_id': self._parse_id_response(id_payload), 'date': date_str, 'time': time_str})
+        self.project_data['hardware_config'] = model.to_hardware_config()
+        self._remember_synced_model(model)
+        return {'status': 'success', 'message': 'Configuración cargada de la caché (verificada con el controlador).',
+                'source': 'cache'}
+
+    def resume_job(self, job_id) -> dict:
+        """Reanuda un trabajo de captura o subida interrumpido desde su punto de control."""
+        job = load_job(self, job_id)
+        if job is None:
+            return {'status': 'error', 'message': f'No hay un trabajo pendiente con id {job_id}.'}
+        log.info("Reanudando trabajo %s", job_id)
+        if job.kind != UploadJob.kind:
+            return job.run()
+        self._pacer.load_profile(job.controller_id)
+        try:
+            return job.run()
+        finally:
+            self._pacer.save_profile()
+
+    def list_jobs(self) -> list:
+        """Trabajos interrumpidos que se pueden reanudar."""
+        return list_jobs()
+
+    def get_project_model(self) -> ProjectModel:
+        """Modelo indexado de la configuración de hardware en memoria (lanza ValueError si es inválida)."""
+        return ProjectModel.from_hardware_config(self.project_data.get('hardware_config', {}))
 
     def get_dashboard_data(self) -> dict:
         """MODIFICADO: Devuelve datos desde la sub-estructura correcta."""
@@ -283,230 +315,172 @@ class Controller:
             'time': info.get('time', 'N/A')
         }
 
-    def save_project_to_file(self, filepath: str) -> dict:
+    def save_project_to_file(self, filepath: str, binary=False) -> dict:
         """
         MODIFICADO: Guarda el diccionario completo que ya tiene la nueva estructura.
-        No se necesitan cambios aquí porque ahora self.project_data ya tiene el formato correcto.
+        Con `binary` se usa el formato binario (más chico y rápido de leer).
         """
-        print(f"CONTROLLER: Guardando proyecto en {filepath}")
+        log.info("Guardando proyecto en %s", filepath)
         try:
+            if binary:
+                project_file.save_project(filepath, self.project_data)
+                return {'status': 'success', 'message': f'Proyecto guardado en {filepath}'}
             with open(filepath, 'w', encoding='utf-8') as f:
                 # Simplemente guardamos el objeto principal, que ya está estructurado
                 json.dump(self.project_data, f, indent=2, ensure_ascii=False)
             return {'status': 'success', 'message': f'Proyecto guardado en {filepath}'}
         except Exception as e:
-            print(f"CONTROLLER: Error al guardar archivo: {e}")
+            log.error("Error al guardar archivo: %s", e)
             return {'status': 'error', 'message': str(e)}
 
     # =================================================================================
     # --- INICIO: NUEVAS FUNCIONES PARA SUBIR LA CONFIGURACIÓN ---
     # =================================================================================
     def _send_write_command(self, command, payload):
-        """Función auxiliar para enviar un comando de escritura y verificar el ACK."""
-        response = self._comm.send_command(command, data_payload=payload)
-        
-        if response.get('status') == 'success':
-            # --- INICIO DE LA CORRECCIÓN ---
-            # Agregamos una pequeña pausa DESPUÉS de recibir el ACK.
-            # Esto le da al firmware tiempo para completar la escritura en la EEPROM
-            # antes de que le enviemos el siguiente comando en el bucle.
-            time.sleep(0.05) # Pausa de 50 milisegundos, ajustable si es necesario.
-            # --- FIN DE LA CORRECCIÓN ---
-            return True
-        
-        print(f"Error: No se recibió ACK para el comando 0x{command:02X}. Respuesta: {response.get('data')}")
+        """
+        Función auxiliar para enviar un comando de escritura y verificar el ACK.
+        La pausa entre escrituras la decide el WritePacer (aprendida por comando)
+        y ante un NACK o timeout se reintenta con una pausa mayor.
+        """
+        for attempt in range(WRITE_RETRIES + 1):
+            self._pacer.wait(command)
+            start = time.monotonic()
+            response = self._comm.send_command(command, data_payload=payload)
+            latency = time.monotonic() - start
+
+            if response.get('status') == 'success':
+                self._pacer.record_success(command, latency)
+                return True
+
+            self._pacer.record_failure(command, latency)
+            log.warning("No se recibió ACK para el comando 0x%02X (intento %d). Respuesta: %s", command, attempt + 1, response.get('message'))
         return False
 
-    def _upload_movements(self, movements):
-        """Sube todos los movimientos al controlador."""
-        print("CONTROLLER: Escribiendo movimientos...")
-        for i in range(MAX_MOVEMENTS):
-            mov = next((m for m in movements if m['id'] == i), None)
-            payload = bytearray(11)
-            payload[0] = i
-            if mov:
-                payload[1] = int(mov['portD'], 16)
-                payload[2] = int(mov['portE'], 16)
-                payload[3] = int(mov['portF'], 16)
-                payload[4] = int(mov['portH'], 16)
-                payload[5] = int(mov['portJ'], 16)
-                for j in range(5):
-                    payload[6 + j] = mov['times'][j]
-            else:
-                # Si el movimiento no existe, lo llenamos con 0xFF (vacío)
-                for j in range(1, 11):
-                    payload[j] = 0xFF
-            
-            if not self._send_write_command(0x23, payload):
-                return {'status': 'error', 'message': f'Falló al escribir el movimiento {i}'}
-        return {'status': 'success'}
-
-    def _upload_sequences(self, sequences):
-        """Sube todas las secuencias al controlador."""
-        print("CONTROLLER: Escribiendo secuencias...")
-        for i in range(MAX_SEQUENCES):
-            seq = next((s for s in sequences if s['id'] == i), None)
-            payload = bytearray(16)
-            payload[0] = i
-            if seq:
-                payload[1] = seq['type']
-                payload[2] = seq['anchor_pos']
-                payload[3] = len(seq['movements'])
-                for j in range(12):
-                    if j < len(seq['movements']):
-                        payload[4 + j] = seq['movements'][j]
-                    else:
-                        payload[4 + j] = 0xFF # Rellenar con 0xFF
-            else:
-                for j in range(1, 16):
-                    payload[j] = 0xFF
-            
-            if not self._send_write_command(0x30, payload):
-                return {'status': 'error', 'message': f'Falló al escribir la secuencia {i}'}
-        return {'status': 'success'}
-
-    def _upload_plans(self, plans):
-        """Sube todos los planes al controlador."""
-        print("CONTROLLER: Escribiendo planes...")
-        for i in range(MAX_PLANS):
-            plan = next((p for p in plans if p['id'] == i), None)
-            payload = bytearray(6)
-            payload[0] = i
-            if plan:
-                payload[1] = plan['day_type_id']
-                payload[2] = plan['sequence_id']
-                payload[3] = plan['time_sel']
-                payload[4] = plan['hour']
-                payload[5] = plan['minute']
-            else:
-                # Un plan vacío tiene un tipo de día inválido (255)
-                for j in range(1, 6):
-                    payload[j] = 0xFF
-
-            if not self._send_write_command(0x40, payload):
-                return {'status': 'error', 'message': f'Falló al escribir el plan {i}'}
-        return {'status': 'success'}
-
-    def _upload_intermittences(self, intermittences):
-        """Sube todas las reglas de intermitencia."""
-        print("CONTROLLER: Escribiendo intermitencias...")
-        for i in range(MAX_INTERMITENCES):
-            rule = next((r for r in intermittences if r['id'] == i), None)
-            payload = bytearray(6)
-            payload[0] = i
-            if rule:
-                payload[1] = rule['id_plan']
-                payload[2] = rule['indice_mov']
-                payload[3] = int(rule['maskD'], 16)
-                payload[4] = int(rule['maskE'], 16)
-                payload[5] = int(rule['maskF'], 16)
-            else:
-                for j in range(1, 6):
-                    payload[j] = 0xFF
-            
-            if not self._send_write_command(0x50, payload):
-                return {'status': 'error', 'message': f'Falló al escribir la intermitencia {i}'}
-        return {'status': 'success'}
-
-    def _upload_holidays(self, holidays):
-        """Sube todos los feriados."""
-        print("CONTROLLER: Escribiendo feriados...")
-        for i in range(MAX_HOLIDAYS):
-            holiday = next((h for h in holidays if h['id'] == i), None)
-            payload = bytearray(3)
-            payload[0] = i
-            if holiday:
-                payload[1] = holiday['day']
-                payload[2] = holiday['month']
-            else:
-                # Un feriado inválido puede tener día 0
-                payload[1] = 0
-                payload[2] = 0
-
-            if not self._send_write_command(0x60, payload):
-                return {'status': 'error', 'message': f'Falló al escribir el feriado {i}'}
-        return {'status': 'success'}
-
-    def _upload_flow_rules(self, flow_rules):
-        """Sube todas las reglas de flujo."""
-        print("CONTROLLER: Escribiendo reglas de flujo...")
-        for i in range(MAX_FLOW_CONTROL_RULES):
-            rule = next((r for r in flow_rules if r['id'] == i), None)
-            payload = bytearray(6)
-            payload[0] = i
-            if rule:
-                payload[1] = rule['sequence_id']
-                payload[2] = rule['origin_mov_id']
-                payload[3] = rule['rule_type']
-                payload[4] = rule['demand_mask']
-                payload[5] = rule['destination_mov_id']
-            else:
-                for j in range(1, 6):
-                    payload[j] = 0xFF
+    def _write_table_bulk(self, write_cmd, payloads):
+        """
+        Escribe varios registros de una tabla con la escritura en bloque: las tramas
+        0x0B viajan en lote sin tocar la EEPROM y la confirmación 0x0C graba todo de
+        una vez, así el tiempo lo domina la línea y no las esperas por escritura.
+        Si alguna trama no se confirma se reenvían sólo las que faltan.
+        Retorna True/False, o None si el firmware no soporta la escritura en bloque.
+        Sólo un NACK a la primera trama marca la escritura en bloque como no
+        soportada para toda la conexión; las tramas perdidas se reintentan.
+        """
+        supported = self._comm.capabilities.get('table_write')
+        if supported is False:
+            return None
+        per_frame = (255 - TABLE_WRITE_HEADER) // len(payloads[0])
+        chunks = [payloads[i:i + per_frame] for i in range(0, len(payloads), per_frame)]
+        frames = [(CMD_TABLE_WRITE, bytes([seq, len(chunks), write_cmd]) + b''.join(chunk))
+                  for seq, chunk in enumerate(chunks)]
+        commit = bytes([write_cmd, len(chunks)])
+        commit_timeout = DEFAULT_TIMEOUT + COMMIT_TIMEOUT_PER_RECORD * len(payloads)
+
+        missing = list(range(len(frames)))
+        for attempt in range(TABLE_WRITE_RETRIES + 1):
+            responses = self._comm.send_batch([frames[seq] for seq in missing], window=BATCH_WINDOW)
+            confirmed = {seq for seq, response in zip(missing, responses) if response.get('status') == 'success'}
+            if supported is None:
+                # Prueba de la primera escritura en bloque de la conexión
+                if confirmed:
+                    supported = True
+                    self._comm.capabilities['table_write'] = True
+                    log.info("Escritura en bloque soportada por el firmware.")
+                elif missing[0] == 0 and responses[0].get('nack'):
+                    self._comm.capabilities['table_write'] = False
+                    log.info("Escritura en bloque no soportada por el firmware.")
+                    return None
+            missing = [seq for seq in missing if seq not in confirmed]
+            if missing:
+                log.warning("Tramas %s de la escritura en bloque 0x%02X sin confirmar (intento %d).", missing, write_cmd, attempt + 1)
+                continue
+
+            response = self._comm.send_command(CMD_TABLE_COMMIT, data_payload=commit, timeout=commit_timeout)
+            if response.get('status') == 'success':
+                return True
+            # El firmware perdió lo recibido (o la confirmación): se reenvía la tabla completa
+            log.warning("Confirmación de la escritura en bloque 0x%02X fallida (intento %d): %s", write_cmd, attempt + 1, response.get('message'))
+            missing = list(range(len(frames)))
+        return False
 
-            if not self._send_write_command(0x70, payload):
-                return {'status': 'error', 'message': f'Falló al escribir la regla de flujo {i}'}
-        return {'status': 'success'}
+    def get_write_stats(self) -> dict:
+        """Estadísticas de latencia por comando de la última subida y pausas aprendidas."""
+        return self._pacer.get_stats()
 
-    def upload_full_configuration(self, hardware_config):
+    def factory_reset(self):
+        """Envía el comando de reseteo de fábrica (0xF0) al controlador."""
+        log.info("Enviando comando de Reseteo de Fábrica (0xF0)...")
+        response = self._comm.send_command(0xF0)
+
+        # El comunicador ya verificó que la respuesta fue un ACK.
+        # Solo necesitamos comprobar si el estado general fue exitoso.
+        if response.get('status') == 'success':
+            log.info("Reseteo de Fábrica confirmado por el controlador.")
+            self.invalidate_sync_snapshot()
+            return {'status': 'success', 'message': 'El controlador ha sido restablecido a los valores de fábrica.'}
+        log.error("Falló el comando de Reseteo de Fábrica.")
+        # Pasamos el mensaje de error que nos dio el comunicador (ej. Timeout)
+        return {'status': 'error', 'message': response.get('message', 'El controlador no confirmó el reseteo.')}
+
+    def _upload_tables(self):
         """
-        Orquesta el proceso completo de subida de la configuración.
-        El orden es importante para mantener la integridad referencial.
+        Tablas en el orden de subida. El orden es importante para mantener la
+        integridad referencial. (tabla, etiqueta, comando de escritura)
         """
-        print("CONTROLLER: Iniciando subida de configuración completa...")
-        
-        # --- INICIO DE LA CORRECCIÓN ---
-        # Añadimos el paso que faltaba para subir el ID del controlador.
-        upload_steps = [
-            (self._upload_controller_id, hardware_config.get('info', {})),
-            (self._upload_movements, hardware_config.get('movements', [])),
-            (self._upload_sequences, hardware_config.get('sequences', [])),
-            (self._upload_plans, hardware_config.get('plans', [])),
-            (self._upload_intermittences, hardware_config.get('intermittences', [])),
-            (self._upload_holidays, hardware_config.get('holidays', [])),
-            (self._upload_flow_rules, hardware_config.get('flow_rules', []))
+        return [('info', 'el ID del controlador', CMD_WRITE_CONTROLLER_ID)] + [
+            (spec.name, spec.label, spec.write_cmd) for spec in TABLES
         ]
-        # --- FIN DE LA CORRECCIÓN ---
 
-        for uploader, data in upload_steps:
-            result = uploader(data)
-            if result['status'] != 'success':
-                return result # Si un paso falla, detenemos todo y reportamos el error
+    def invalidate_sync_snapshot(self):
+        """
+        Olvida qué hay escrito en el controlador (al cambiar de conexión o tras un
+        reseteo de fábrica). La próxima subida será completa.
+        """
+        self._synced_payloads = None
 
-        print("CONTROLLER: Subida de configuración completada exitosamente.")
-        return {'status': 'success', 'message': 'Configuración subida al controlador exitosamente.'}
+    def _remember_synced_model(self, model):
+        """Guarda los payloads de una configuración que sabemos que está en el controlador."""
+        try:
+            self._synced_payloads = model.encode_all()
+        except ValueError:
+            self._synced_payloads = None
 
-    
-    def _upload_controller_id(self, info_config):
-        """Sube el ID del controlador."""
-        print("CONTROLLER: Escribiendo ID del controlador...")
-        controller_id_str = info_config.get('controller_id', '0')
+    def verify_configuration(self, hardware_config, repair=True) -> dict:
+        """
+        Comprueba que el controlador tenga la configuración del proyecto sin
+        capturarla completa (ver verify.py). Con `repair` se reescriben sólo los
+        registros que no coinciden.
+        """
+        log.info("Verificando la configuración del controlador...")
         try:
-            # El firmware espera un byte. Convertimos el ID a un entero.
-            controller_id_byte = int(controller_id_str)
-            payload = bytes([controller_id_byte])
-            
-            # El comando para guardar el ID es 0x10.
-            if not self._send_write_command(0x10, payload):
-                return {'status': 'error', 'message': 'Falló al escribir el ID del controlador'}
-            return {'status': 'success'}
-        except (ValueError, TypeError):
-            return {'status': 'error', 'message': f'El ID del controlador "{controller_id_str}" no es un número válido.'}
-
-    def _upload_controller_id(self, info_config):
-        """Sube el ID del controlador."""
-        print("CONTROLLER: Escribiendo ID del controlador...")
-        # Extraemos el ID del diccionario 'info', si no existe, usamos '0'.
-        controller_id_str = info_config.get('controller_id', '0')
+            encoded = ProjectModel.from_hardware_config(hardware_config).encode_all()
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return {'status': 'error', 'message': f'Configuración inválida: {e}'}
+
+        self._pacer.load_profile(hardware_config.get('info', {}).get('controller_id', '0'))
         try:
-            # El firmware espera un número. Convertimos el ID a entero.
-            # El archivo .lc4 lo guarda como string, ej: "2".
-            controller_id_byte = int(controller_id_str) 
-            payload = bytes([controller_id_byte])
-            
-            # El comando para guardar el ID es 0x10.
-            if not self._send_write_command(0x10, payload):
-                return {'status': 'error', 'message': 'Falló al escribir el ID del controlador'}
-            return {'status': 'success'}
-        except (ValueError, TypeError):
-            return {'status': 'error', 'message': f'El ID del controlador "{controller_id_str}" no es un número válido.'}
\ No newline at end of file
+            return verify.verify_configuration(self, encoded, repair=repair)
+        finally:
+            self._pacer.save_profile()
+
+    def upload_full_configuration(self, hardware_config, force_full=False):
+        """
+        Orquesta el proceso completo de subida de la configuración.
+        Si se conoce lo que ya está escrito en el controlador (última captura o
+        subida), sólo se envían los registros cuyos bytes cambiaron, salvo que
+        se pida `force_full`.
+        """
+        log.info("Iniciando subida de configuración completa...")
+        try:
+            encoded = ProjectModel.from_hardware_config(hardware_config).encode_all()
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}
+        except (TypeError, KeyError, AttributeError) as e:
+            return {'status': 'error', 'message': f'Configuración inválida: {e}'}
+
+        controller_id = hardware_config.get('info', {}).get('controller_id', '0')
+        self._pacer.load_profile(controller_id)
+        try:
+            return UploadJob.create(self, encoded, controller_id, force_full, hardware_config).run()
+        finally:
+            self._pacer.save_profile()
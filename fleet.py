@@ -0,0 +1,169 @@
+# fleet.py
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from communicator import Communicator
+from controller import Controller
+
+log = logging.getLogger(__name__)
+
+# Cantidad máxima de controladores atendidos a la vez
+DEFAULT_MAX_WORKERS = 4
+# Conexiones que se abren a la vez; van en su propio pool para no esperar a los trabajos en curso
+CONNECT_WORKERS = 4
+
+JOB_CAPTURE = 'capture'
+JOB_UPLOAD = 'upload'
+JOB_FACTORY_RESET = 'factory_reset'
+# Estados de un puerto ocupado: no se puede reconectar, desconectar ni encolarle otro trabajo
+BUSY_STATES = ('connecting', 'queued', 'running')
+BUSY_MESSAGE = 'El controlador ya tiene un trabajo en curso.'
+
+
+class FleetManager:
+    """
+    Administra varios controladores LC4, cada uno en su propio puerto serie.
+    Mantiene un par Communicator/Controller por puerto y ejecuta trabajos de
+    captura, subida y reseteo de fábrica en paralelo con un pool acotado de hilos.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._lock = threading.Lock()
+        self._devices = {}   # puerto -> (Communicator, Controller)
+        self._status = {}    # puerto -> estado del último trabajo
+        self._results = {}   # puerto -> resultado completo del último trabajo
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet')
+        self._connect_executor = ThreadPoolExecutor(max_workers=CONNECT_WORKERS, thread_name_prefix='fleet-connect')
+
+    def _is_busy(self, port):
+        # Llamar con self._lock tomado
+        return self._status.get(port, {}).get('state') in BUSY_STATES
+
+    def connect(self, ports, baudrate):
+        """
+        Abre (o reabre) la conexión con cada puerto. Retorna el resultado por
+        puerto; los puertos con un trabajo en cola o en curso no se tocan.
+        """
+        futures, results = {}, {}
+        for port in ports:
+            with self._lock:
+                if self._is_busy(port):
+                    results[port] = {'status': 'error', 'message': BUSY_MESSAGE}
+                    continue
+                if port not in self._devices:
+                    communicator = Communicator()
+                    self._devices[port] = (communicator, Controller(communicator))
+                communicator, _ = self._devices[port]
+                self._status.setdefault(port, {'port': port}).update(state='connecting', job=None,
+                                                                     message='Conectando...')
+            futures[port] = self._connect_executor.submit(communicator.connect, port, baudrate)
+
+        for port, future in futures.items():
+            results[port] = future.result()
+            self._set_status(port, state='idle' if results[port]['status'] == 'success' else 'error',
+                             job=None, message=results[port].get('message', 'Conectado.'))
+        return results
+
+    def disconnect(self, ports=None):
+        """
+        Cierra los puertos indicados (o todos) y los quita de la flota. Los
+        puertos con un trabajo en cola o en curso se rechazan.
+        """
+        with self._lock:
+            targets = list(self._devices) if ports is None else [p for p in ports if p in self._devices]
+            rejected = {port: BUSY_MESSAGE for port in targets if self._is_busy(port)}
+            targets = [port for port in targets if port not in rejected]
+            devices = [(port, self._devices.pop(port)) for port in targets]
+            for port in targets:
+                self._status.pop(port, None)
+                self._results.pop(port, None)
+        for _, (communicator, _) in devices:
+            communicator.disconnect()
+        return {'status': 'error' if rejected else 'success', 'disconnected': targets, 'rejected': rejected}
+
+    def start_job(self, job, targets):
+        """
+        Lanza un trabajo en paralelo sobre varios puertos.
+        `targets` es un diccionario {puerto: argumentos del trabajo}; para la
+        subida los argumentos son (hardware_config, force_full).
+        """
+        if job not in (JOB_CAPTURE, JOB_UPLOAD, JOB_FACTORY_RESET):
+            return {'status': 'error', 'message': f'Trabajo desconocido: {job}'}
+
+        accepted, rejected = [], {}
+        for port, args in targets.items():
+            with self._lock:
+                device = self._devices.get(port)
+                if device is None or not device[0].is_connected:
+                    rejected[port] = 'El puerto no está conectado.'
+                    continue
+                if self._is_busy(port):
+                    rejected[port] = BUSY_MESSAGE
+                    continue
+                status = self._status.setdefault(port, {'port': port})
+                # Se marca en cola dentro del mismo bloqueo: otra llamada no puede encolar en este puerto
+                status.update(state='queued', job=job, stage=None, done=0, total=0,
+                              message='En cola...', started=None, finished=None)
+            self._executor.submit(self._run_job, port, job, args)
+            accepted.append(port)
+
+        return {'status': 'pending' if accepted else 'error', 'accepted': accepted, 'rejected': rejected,
+                'message': f'{len(accepted)} trabajos iniciados.'}
+
+    def _run_job(self, port, job, args):
+        controller = None
+        try:
+            with self._lock:
+                device = self._devices.get(port)
+            if device is None:
+                raise ConnectionError('El puerto se desconectó antes de empezar el trabajo.')
+            _, controller = device
+            self._set_status(port, state='running', message='En curso...', started=time.time())
+            controller.progress_callback = lambda stage, done, total: self._set_status(
+                port, stage=stage, done=done, total=total)
+            if job == JOB_CAPTURE:
+                result = controller.capture_full_configuration()
+                if result.get('status') == 'success':
+                    result['message'] = 'Captura completada.'
+                result['hardware_config'] = controller.project_data['hardware_config']
+                self._set_status(port, controller_id=controller.get_dashboard_data()['controller_id'])
+            elif job == JOB_UPLOAD:
+                hardware_config, force_full = args
+                result = controller.upload_full_configuration(hardware_config, force_full=force_full)
+            else:
+                result = controller.factory_reset()
+        except ConnectionError as e:
+            result = {'status': 'error', 'message': str(e)}
+        except Exception as e:
+            log.exception("Error en el trabajo %s del puerto %s", job, port)
+            result = {'status': 'error', 'message': f'Error interno: {e}'}
+        finally:
+            if controller is not None:
+                controller.progress_callback = None
+
+        with self._lock:
+            self._results[port] = result
+        self._set_status(port, state='done' if result.get('status') == 'success' else 'error',
+                         message=result.get('message', ''), finished=time.time())
+
+    def _set_status(self, port, **fields):
+        with self._lock:
+            self._status.setdefault(port, {'port': port}).update(fields)
+
+    def get_status(self):
+        """Estado de cada controlador de la flota (trabajo, etapa, avance y mensaje)."""
+        with self._lock:
+            devices = []
+            for port, (communicator, _) in self._devices.items():
+                status = dict(self._status.get(port, {'port': port}))
+                status['is_connected'] = communicator.is_connected
+                devices.append(status)
+        return {'devices': devices,
+                'busy': any(d.get('state') in BUSY_STATES for d in devices)}
+
+    def get_result(self, port):
+        """Resultado completo del último trabajo de un puerto (ej. la configuración capturada)."""
+        with self._lock:
+            return self._results.get(port)
@@ -0,0 +1,452 @@
+# jobs.py
+#
+# Trabajos de captura y subida reanudables. Cada trabajo guarda un punto de
+# control (qué tablas e índices ya se completaron y los datos necesarios para
+# continuar) en el directorio de datos de la aplicación. Cada registro se
+# reintenta con espera exponencial; si aun así falla, el trabajo queda
+# interrumpido y al reanudarlo sólo se repiten los registros pendientes.
+
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+import config_cache
+from storage import app_data_path, load_json, save_json
+from project_model import ProjectModel, Holiday, TABLES, TABLES_BY_NAME
+
+log = logging.getLogger(__name__)
+
+JOBS_DIR = 'jobs'
+
+# Reintentos de un registro después de los del propio comando, con espera exponencial
+RECORD_RETRIES = 2
+BACKOFF_BASE = 0.2
+BACKOFF_MAX = 2.0
+# Como mucho un guardado del punto de control cada tanto (además de al cambiar de tabla)
+CHECKPOINT_INTERVAL = 0.5
+# Con menos registros pendientes en una tabla no vale la pena la escritura en bloque
+TABLE_WRITE_MIN_RECORDS = 2
+
+STATE_RUNNING = 'running'
+STATE_INTERRUPTED = 'interrupted'
+STATE_DONE = 'done'
+
+
+def retry_with_backoff(attempt, is_connected, retries=RECORD_RETRIES):
+    """
+    Llama a `attempt()` hasta que retorne True, esperando BACKOFF_BASE * 2^n entre
+    intentos. Deja de insistir si se perdió la conexión.
+    """
+    for n in range(retries + 1):
+        if attempt():
+            return True
+        if n == retries or not is_connected():
+            return False
+        delay = min(BACKOFF_BASE * 2 ** n, BACKOFF_MAX)
+        log.info("Reintento %d/%d en %.1f s", n + 1, retries, delay)
+        time.sleep(delay)
+    return False
+
+
+def _job_path(job_id):
+    return app_data_path(JOBS_DIR, f'{job_id}.json')
+
+
+def decode_records(spec, payloads):
+    """Registros de una tabla a partir de sus payloads crudos, sin los slots vacíos."""
+    if spec.record_cls is Holiday:
+        # Los feriados llegan todos en una trama
+        records = [h for p in payloads if p for h in Holiday.parse_table(p)]
+    else:
+        records = [spec.record_cls.from_payload(p) for p in payloads if p]
+    return [record for record in records if record]
+
+
+class Job(ABC):
+    """Base de los trabajos: identificador, estado y punto de control en disco."""
+    kind = None
+
+    def __init__(self, controller, job_id=None):
+        self.controller = controller
+        self.id = job_id or f"{self.kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.state = STATE_RUNNING
+        self.message = ''
+        self._last_save = 0.0
+
+    def _is_connected(self):
+        return self.controller._comm.is_connected
+
+    def to_checkpoint(self) -> dict:
+        return {'id': self.id, 'kind': self.kind, 'state': self.state, 'message': self.message,
+                'updated': time.time()}
+
+    def save(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_save < CHECKPOINT_INTERVAL:
+            return
+        self._last_save = now
+        try:
+            save_json(_job_path(self.id), self.to_checkpoint())
+        except OSError as e:
+            log.warning("No se pudo guardar el punto de control del trabajo %s: %s", self.id, e)
+
+    def discard(self):
+        """Borra el punto de control (el trabajo terminó y no hay nada que reanudar)."""
+        try:
+            os.remove(_job_path(self.id))
+        except OSError:
+            pass
+
+    def _interrupt(self, message):
+        self.state = STATE_INTERRUPTED
+        self.message = message
+        self.save(force=True)
+        log.warning("Trabajo %s interrumpido: %s", self.id, message)
+        return {'status': 'error', 'message': f'{message} Se puede reanudar el trabajo.', 'job_id': self.id,
+                'kind': self.kind}
+
+    @abstractmethod
+    def run(self) -> dict:
+        """Ejecuta (o continúa) el trabajo y retorna el resultado para la UI."""
+
+
+class UploadJob(Job):
+    """
+    Subida de una configuración codificada. El punto de control guarda los
+    payloads de todas las tablas y los índices que faltan escribir.
+    """
+    kind = 'upload'
+
+    def __init__(self, controller, encoded, controller_id, remaining, skipped=None, written=0, job_id=None,
+                 hardware_config=None):
+        super().__init__(controller, job_id)
+        self.encoded = encoded
+        # Configuración original, para la caché por controlador al terminar
+        self.hardware_config = hardware_config
+        self.controller_id = controller_id
+        self.remaining = remaining
+        self.skipped = skipped or {}
+        self.written = written
+
+    @classmethod
+    def create(cls, controller, encoded, controller_id, force_full=False, hardware_config=None):
+        """Calcula qué registros escribir, omitiendo los que ya están en el controlador."""
+        snapshot = None if force_full else controller._synced_payloads
+        if snapshot is None:
+            log.info("Sin configuración previa conocida, se escribirán todos los registros.")
+        remaining, skipped = {}, {}
+        for table, payloads in encoded.items():
+            previous = snapshot.get(table) if snapshot else None
+            for i, payload in enumerate(payloads):
+                if previous is not None and i < len(previous) and previous[i] == payload:
+                    skipped.setdefault(table, []).append(i)
+                else:
+                    remaining.setdefault(table, []).append(i)
+        return cls(controller, encoded, controller_id, remaining, skipped, hardware_config=hardware_config)
+
+    @classmethod
+    def from_checkpoint(cls, controller, data):
+        encoded = {table: [bytes.fromhex(p) for p in payloads] for table, payloads in data['encoded'].items()}
+        return cls(controller, encoded, data['controller_id'], data['remaining'], data['skipped'],
+                   data['written'], job_id=data['id'], hardware_config=data.get('hardware_config'))
+
+    def to_checkpoint(self):
+        return {**super().to_checkpoint(), 'controller_id': self.controller_id,
+                'encoded': {table: [p.hex() for p in payloads] for table, payloads in self.encoded.items()},
+                'remaining': self.remaining, 'skipped': self.skipped, 'written': self.written,
+                'hardware_config': self.hardware_config}
+
+    def _total(self):
+        return sum(len(payloads) for payloads in self.encoded.values())
+
+    def _pending(self):
+        return sum(len(indexes) for indexes in self.remaining.values())
+
+    def _completed(self, table, indexes):
+        """Registra índices escritos: en el punto de control y en lo que sabemos del controlador."""
+        previous = (self.controller._synced_payloads or {}).get(table)
+        for i in indexes:
+            if previous is not None and i < len(previous):
+                previous[i] = self.encoded[table][i]
+        done = set(indexes)
+        self.remaining[table] = [i for i in self.remaining[table] if i not in done]
+        self.written += len(indexes)
+        self.save()
+
+    def _check_controller(self):
+        """
+        Al reanudar, el ID ya escrito debe coincidir con el del equipo conectado;
+        si no, podríamos completar la subida en otro controlador.
+        """
+        if self.remaining.get('info') or not self.encoded.get('info'):
+            return None
+        response = self.controller._comm.send_command(0x11)
+        if response.get('status') != 'success':
+            return 'No se pudo leer el ID del controlador.'
+        if response['data'][:1] != self.encoded['info'][0][:1]:
+            return 'El controlador conectado no es el de este trabajo.'
+        return None
+
+    def run(self):
+        controller = self.controller
+        self.state = STATE_RUNNING
+        error = self._check_controller() if self.written else None
+        if error:
+            return {'status': 'error', 'message': error, 'job_id': self.id, 'kind': self.kind}
+        total = self._total()
+
+        for table, label, write_cmd in controller._upload_tables():
+            indexes = list(self.remaining.get(table, []))
+            if not indexes:
+                continue
+            log.info("Escribiendo %s...", table)
+            controller._report_progress('upload', total - self._pending(), total)
+            payloads = self.encoded[table]
+
+            if table != 'info' and len(indexes) >= TABLE_WRITE_MIN_RECORDS:
+                result = controller._write_table_bulk(write_cmd, [payloads[i] for i in indexes])
+                if result:
+                    self._completed(table, indexes)
+                    continue
+                if result is False:
+                    # Con una línea muy ruidosa las tramas largas casi no llegan; las cortas sí
+                    log.warning("Falló la escritura en bloque de %s, se escribirá registro por registro.", table)
+
+            for i in indexes:
+                controller._report_progress('upload', total - self._pending(), total)
+                if not retry_with_backoff(lambda: controller._send_write_command(write_cmd, payloads[i]),
+                                          self._is_connected):
+                    previous = (controller._synced_payloads or {}).get(table)
+                    if previous is not None and i < len(previous):
+                        # No sabemos si el registro quedó escrito
+                        previous[i] = None
+                    if table == 'info':
+                        return self._interrupt(f'Falló al escribir {label}.')
+                    return self._interrupt(f'Falló al escribir {label} {i}.')
+                self._completed(table, [i])
+
+        self.state = STATE_DONE
+        self.discard()
+        controller._synced_payloads = self.encoded
+        if self.hardware_config is not None:
+            config_cache.save(self.encoded['info'][0][0], self.hardware_config)
+        skipped_count = sum(len(indexes) for indexes in self.skipped.values())
+        controller._report_progress('upload', total, total)
+        log.info("Subida completada. %d registros escritos, %d sin cambios.", self.written, skipped_count)
+        return {
+            'status': 'success',
+            'message': f'Configuración subida al controlador exitosamente. {self.written} registros escritos, {skipped_count} sin cambios omitidos.',
+            'written': self.written,
+            'skipped': self.skipped,
+            'kind': self.kind,
+        }
+
+
+class CaptureJob(Job):
+    """
+    Captura de la configuración completa. El punto de control guarda los
+    payloads ya leídos de cada tabla y los índices que faltan.
+    """
+    kind = 'capture'
+
+    def __init__(self, controller, info=None, captured=None, remaining=None, job_id=None, controller_number=None):
+        super().__init__(controller, job_id)
+        self.info = info
+        # ID tal como lo reporta el equipo (clave de la caché por controlador)
+        self.controller_number = controller_number
+        # {tabla: {índice: payload}}; para los feriados, {0: trama completa de 0x61}
+        self.captured = captured or {}
+        # {tabla: [índices]}; una tabla ausente todavía no se empezó
+        self.remaining = remaining or {}
+
+    @classmethod
+    def from_checkpoint(cls, controller, data):
+        captured = {table: {int(i): bytes.fromhex(p) if p is not None else None for i, p in slots.items()}
+                    for table, slots in data['captured'].items()}
+        return cls(controller, data['info'], captured, data['remaining'], job_id=data['id'],
+                   controller_number=data.get('controller_number'))
+
+    def to_checkpoint(self):
+        captured = {table: {str(i): p.hex() if p is not None else None for i, p in slots.items()}
+                    for table, slots in self.captured.items()}
+        return {**super().to_checkpoint(), 'info': self.info, 'captured': captured, 'remaining': self.remaining,
+                'controller_number': self.controller_number}
+
+    def _read_info(self):
+        controller = self.controller
+        responses = {}
+
+        def read(cmd):
+            responses[cmd] = controller._comm.send_command(cmd)
+            return responses[cmd].get('status') == 'success'
+
+        if not (retry_with_backoff(lambda: read(0x11), self._is_connected)
+                and retry_with_backoff(lambda: read(0x21), self._is_connected)):
+            return False
+        date_str, time_str = controller._parse_time_response(responses[0x21].get('data'))
+        self.controller_number = responses[0x11]['data'][0]
+        self.info = {'controller_id': controller._parse_id_response(responses[0x11].get('data')),
+                     'date': date_str, 'time': time_str}
+        return True
+
+    def _emit_records(self, spec, payloads):
+        """Envía a quien escuche la captura los registros recién leídos, ya decodificados."""
+        if not self.controller.capture_callback:
+            return
+        records = [record.to_dict() for record in decode_records(spec, payloads)]
+        if records:
+            self.controller._emit_capture_event({'type': 'records', 'table': spec.name, 'records': records})
+
+    def _capture_table(self, spec):
+        """Lee los índices pendientes de una tabla; retorna los que no se pudieron leer."""
+        failed = self._read_table(spec)
+        slots = self.captured[spec.name]
+        # Se cuentan los registros decodificados: los slots vacíos (0xFF) también responden
+        captured = len(decode_records(spec, slots.values()))
+        log.info("Capturados %d %s (%d sin leer).", captured, spec.label_plural, len(failed))
+        self.controller._emit_capture_event({'type': 'table_done', 'table': spec.name, 'captured': captured,
+                                             'missing': len(failed)})
+        return failed
+
+    def _read_table(self, spec):
+        controller = self.controller
+        log.info("Capturando %s...", spec.label_plural)
+        slots = self.captured.setdefault(spec.name, {})
+        controller._emit_capture_event({'type': 'table', 'table': spec.name, 'label': spec.label_plural,
+                                        'total': spec.max_items})
+        # Al reanudar, lo ya capturado se envía de entrada
+        self._emit_records(spec, [slots[i] for i in sorted(slots)])
+        if spec.record_cls is Holiday:
+            # Todos los feriados llegan en una sola trama
+            if spec.name not in self.remaining:
+                self.remaining[spec.name] = [0]
+            if not self.remaining[spec.name]:
+                return []
+            raw = {}
+
+            def read_holidays():
+                raw['data'] = controller._fetch_all_holidays(spec)
+                return raw['data'] is not None
+
+            if not retry_with_backoff(read_holidays, self._is_connected):
+                return [0]
+            slots[0] = raw['data']
+            self.remaining[spec.name] = []
+            self._emit_records(spec, [raw['data']])
+            return []
+
+        if spec.name not in self.remaining:
+            dumped = controller._fetch_table_dump(spec) or {}
+            slots.update(dumped)
+            self._emit_records(spec, [dumped[i] for i in sorted(dumped)])
+            self.remaining[spec.name] = [i for i in range(spec.max_items) if i not in slots]
+            self.save()
+        answered = {}
+
+        def read_pending():
+            # Los índices que expiraron se vuelven a pedir juntos, en un solo lote
+            read, failed = controller._fetch_items(spec, self.remaining[spec.name],
+                                                   on_record=lambda index, payload: self._emit_records(spec, [payload]))
+            slots.update(read)
+            answered['any'] = bool(read)
+            self.remaining[spec.name] = failed
+            self.save()
+            return not failed
+
+        # Si un lote entero queda sin respuesta el enlace está caído: no tiene sentido insistir
+        retry_with_backoff(read_pending, lambda: self._is_connected() and answered['any'])
+        return self.remaining[spec.name]
+
+    def _build_model(self):
+        model = ProjectModel(dict(self.info))
+        for spec in TABLES:
+            slots = self.captured.get(spec.name, {})
+            for record in decode_records(spec, [slots[i] for i in sorted(slots)]):
+                model.add(spec.name, record)
+        return model
+
+    def _check_controller(self):
+        """Al reanudar, el controlador conectado debe ser el mismo que se empezó a capturar."""
+        response = self.controller._comm.send_command(0x11)
+        if response.get('status') != 'success':
+            return 'No se pudo leer el ID del controlador.'
+        if self.controller._parse_id_response(response['data']) != self.info.get('controller_id'):
+            return 'El controlador conectado no es el de este trabajo.'
+        return None
+
+    def run(self):
+        controller = self.controller
+        self.state = STATE_RUNNING
+        log.info("Iniciando captura de configuración completa...")
+        if self.info is None:
+            if not self._read_info():
+                return self._interrupt('No se pudo leer el ID y la hora del controlador.')
+        else:
+            error = self._check_controller()
+            if error:
+                return {'status': 'error', 'message': error, 'job_id': self.id, 'kind': self.kind}
+        self.save(force=True)
+        controller._emit_capture_event({'type': 'info', 'info': self.info, 'tables': [spec.name for spec in TABLES]})
+
+        failed = {}
+        for done, spec in enumerate(TABLES, start=1):
+            missing = self._capture_table(spec)
+            if missing:
+                failed[spec.name] = missing
+            self.save(force=True)
+            controller._report_progress('capture', done, len(TABLES))
+            if missing and len(self.captured[spec.name]) == 0:
+                # Ningún registro de la tabla respondió: se deja el resto para la reanudación
+                failed.update({s.name: [] for s in TABLES[done:] if s.name not in self.remaining})
+                break
+
+        # Lo capturado se muestra aunque falten registros, pero no se da por sincronizado
+        model = self._build_model()
+        controller.project_data['hardware_config'] = model.to_hardware_config()
+        if failed:
+            detail = ', '.join(f'{len(indexes)} de {TABLES_BY_NAME[table].label_plural}' if indexes
+                               else TABLES_BY_NAME[table].label_plural for table, indexes in failed.items())
+            return self._interrupt(f'Captura incompleta: faltan {detail}.')
+        controller._remember_synced_model(model)
+        if self.controller_number is not None:
+            config_cache.save(self.controller_number, controller.project_data['hardware_config'])
+        self.state = STATE_DONE
+        self.discard()
+        log.info("Captura completa finalizada.")
+        return {'status': 'success', 'message': 'Captura completa finalizada.', 'kind': self.kind}
+
+
+JOB_TYPES = {cls.kind: cls for cls in (UploadJob, CaptureJob)}
+
+
+def load_job(controller, job_id):
+    """Reconstruye un trabajo desde su punto de control (None si no existe)."""
+    data = load_json(_job_path(job_id))
+    if not data or data.get('state') == STATE_DONE:
+        return None
+    cls = JOB_TYPES.get(data.get('kind'))
+    if cls is None:
+        return None
+    try:
+        return cls.from_checkpoint(controller, data)
+    except (KeyError, ValueError, TypeError) as e:
+        log.warning("Punto de control del trabajo %s dañado: %s", job_id, e)
+        return None
+
+
+def list_jobs():
+    """Trabajos sin terminar, del más reciente al más antiguo."""
+    directory = os.path.dirname(_job_path('_'))
+    jobs = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        data = load_json(os.path.join(directory, name))
+        if not data or data.get('state') == STATE_DONE:
+            continue
+        remaining = sum(len(indexes) for indexes in data.get('remaining', {}).values())
+        jobs.append({'id': data.get('id'), 'kind': data.get('kind'), 'state': data.get('state'),
+                     'message': data.get('message'), 'updated': data.get('updated'), 'remaining': remaining})
+    return sorted(jobs, key=lambda job: job['updated'] or 0, reverse=True)
@@ -0,0 +1,304 @@
+# lc4tool.py
+#
+# Herramienta de línea de comandos para auditar archivos de proyecto .lc4 sin
+# abrir la interfaz. Recorre carpetas completas y procesa los archivos en un
+# pool de procesos, en lotes y sin cargar la lista entera en memoria:
+#
+#   python lc4tool.py validate ARCHIVO_O_CARPETA...   valida registros y conflictos
+#   python lc4tool.py digest ARCHIVO_O_CARPETA...     CRC de los payloads codificados por tabla
+#   python lc4tool.py normalize CARPETA --out DESTINO convierte al formato actual y ordena (--binary: binario)
+#   python lc4tool.py diff A B                        registros distintos entre dos proyectos o carpetas
+#
+# Los archivos se leen con Controller.load_project_from_file, así que el
+# formato antiguo se acepta igual que en la aplicación.
+
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+import conflicts
+import project_file
+from communicator import Communicator
+from controller import Controller
+from project_model import ProjectModel, TABLES
+from verify import table_digest
+
+log = logging.getLogger(__name__)
+
+PROJECT_EXTENSION = '.lc4'
+# Archivos por tarea: reparte el costo de enviar trabajo entre procesos
+BATCH_SIZE = 64
+# Lotes en vuelo por proceso: mantiene ocupado el pool sin leer todo el árbol de antemano
+BATCHES_IN_FLIGHT = 4
+
+STATUS_OK = 'ok'
+STATUS_CONFLICTS = 'conflicts'
+STATUS_INVALID = 'invalid'
+# Nombres de cada resultado en el resumen
+SUMMARY_LABELS = {STATUS_OK: 'válidos', STATUS_CONFLICTS: 'con conflictos', STATUS_INVALID: 'inválidos',
+                  'changed': 'cambiados', 'unchanged': 'iguales'}
+
+_controller = None
+
+
+def _get_controller():
+    # Un Controller por proceso: sólo se usa para leer y escribir archivos, nunca se conecta
+    global _controller
+    if _controller is None:
+        _controller = Controller(Communicator())
+    return _controller
+
+
+def iter_project_files(paths):
+    """Archivos .lc4 de las rutas dadas (archivos o carpetas, recorridas en orden)."""
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.lower().endswith(PROJECT_EXTENSION):
+                        yield os.path.join(dirpath, name)
+        else:
+            yield path
+
+
+def load_project(path, load_software=False):
+    """
+    (datos del proyecto, formato, ProjectModel) de un archivo; lanza ValueError si no es válido.
+    De los archivos binarios sólo se lee el mapa si se pide `load_software`.
+    """
+    controller = _get_controller()
+    controller.reset_project_data()
+    result = controller.load_project_from_file(path, load_software=load_software)
+    if result['status'] != 'success':
+        raise ValueError(result['message'])
+    project_data = controller.project_data
+    return project_data, result['format'], ProjectModel.from_hardware_config(project_data['hardware_config'])
+
+
+def digests(model):
+    """CRC-32 de los payloads de cada tabla (el mismo que calcula el firmware) y un resumen de todo."""
+    encoded = model.encode_all()
+    tables = {table: f'{table_digest(payloads):08x}' for table, payloads in encoded.items()}
+    overall = hashlib.sha1(b''.join(b''.join(encoded[table]) for table in sorted(encoded))).hexdigest()
+    return tables, overall
+
+
+# --- Tareas (se ejecutan en los procesos del pool) ---
+
+def _validate(path, options):
+    project_data, file_format, model = load_project(path)
+    intersection = (project_data.get('software_config') or {}).get('intersection') or {}
+    check = conflicts.check_model(model, intersection.get('conflict_matrix'))
+    result = {'status': STATUS_CONFLICTS if check else STATUS_OK, 'format': file_format,
+              'conflicts': len(check)}
+    if check and options.get('verbose'):
+        result['messages'] = [issue['message'] for issue in check]
+    return result
+
+
+def _digest(path, options):
+    _, file_format, model = load_project(path)
+    tables, overall = digests(model)
+    return {'status': STATUS_OK, 'format': file_format, 'controller_id': model.info.get('controller_id'),
+            'digest': overall, 'tables': tables}
+
+
+def _normalize(path, options):
+    project_data, file_format, model = load_project(path, load_software=True)
+    relative = os.path.relpath(path, options['root']) if options.get('root') else os.path.basename(path)
+    target = os.path.join(options['out'], relative) if options.get('out') else path
+    controller = _get_controller()
+    controller.project_data = {**project_data, 'hardware_config': model.to_hardware_config()}
+    controller.project_data.setdefault('software_config', {})
+    with open(path, 'rb') as f:
+        original = f.read()
+    if options.get('dry_run'):
+        if options.get('binary'):
+            normalized = project_file.encode_project(controller.project_data)
+        else:
+            normalized = json.dumps(controller.project_data, indent=2, ensure_ascii=False).encode('utf-8')
+        return {'status': STATUS_OK, 'format': file_format, 'changed': normalized != original}
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    result = controller.save_project_to_file(target, binary=options.get('binary', False))
+    if result['status'] != 'success':
+        raise ValueError(result['message'])
+    with open(target, 'rb') as f:
+        changed = f.read() != original
+    return {'status': STATUS_OK, 'format': file_format, 'changed': changed, 'output': target}
+
+
+def _diff(pair, options):
+    path_a, path_b = pair
+    _, _, model_a = load_project(path_a)
+    _, _, model_b = load_project(path_b)
+    encoded_a, encoded_b = model_a.encode_all(), model_b.encode_all()
+    changed = {}
+    for table in ['info'] + [spec.name for spec in TABLES]:
+        indexes = [i for i, (a, b) in enumerate(zip(encoded_a[table], encoded_b[table])) if a != b]
+        if indexes:
+            changed[table] = indexes
+    return {'status': STATUS_OK, 'other': path_b, 'changed': changed}
+
+
+TASKS = {'validate': _validate, 'digest': _digest, 'normalize': _normalize, 'diff': _diff}
+
+
+def _run_batch(command, items, options):
+    task = TASKS[command]
+    results = []
+    for item in items:
+        path = item[0] if isinstance(item, tuple) else item
+        try:
+            result = task(item, options)
+        except (ValueError, KeyError, TypeError, AttributeError, OSError) as e:
+            result = {'status': STATUS_INVALID, 'message': str(e)}
+        results.append({'path': path, **result})
+    return results
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process(command, items, options=None, workers=None, batch_size=BATCH_SIZE):
+    """
+    Ejecuta una tarea sobre todos los elementos y entrega los resultados en el
+    mismo orden a medida que terminan. Con workers=1 no se crean procesos.
+    """
+    options = options or {}
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for batch in _batches(items, batch_size):
+            yield from _run_batch(command, batch, options)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for batch in _batches(items, batch_size):
+            pending.append(executor.submit(_run_batch, command, batch, options))
+            if len(pending) >= workers * BATCHES_IN_FLIGHT:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# --- Salida ---
+
+def _describe(command, result):
+    if result['status'] == STATUS_INVALID:
+        return f"INVÁLIDO  {result['path']}: {result['message']}"
+    if command == 'validate':
+        text = f"{'VÁLIDO' if result['status'] == STATUS_OK else 'CONFLICTO':<9} {result['path']}"
+        if result['conflicts']:
+            text += f" ({result['conflicts']} conflictos)"
+        return '\n'.join([text] + [f"    {message}" for message in result.get('messages', [])])
+    if command == 'digest':
+        return f"{result['digest'][:16]}  {result['path']}"
+    if command == 'normalize':
+        return f"{'CAMBIADO' if result['changed'] else 'IGUAL':<9} {result['path']}"
+    if not result['changed']:
+        return f"IGUAL     {result['path']}"
+    detail = '; '.join(f"{table}: {', '.join(map(str, indexes))}" for table, indexes in result['changed'].items())
+    return f"DISTINTO  {result['path']} -> {result['other']}: {detail}"
+
+
+def _summary(command, counts, elapsed, duplicates):
+    total = sum(counts.values())
+    parts = [f"{count} {SUMMARY_LABELS[status]}" for status, count in sorted(counts.items())]
+    text = f"{total} archivos en {elapsed:.1f} s ({total / elapsed if elapsed else 0:.0f}/s): {', '.join(parts)}"
+    if command == 'digest':
+        text += f"; {duplicates} configuraciones repetidas"
+    return text
+
+
+def _diff_pairs(path_a, path_b):
+    """Pares de archivos a comparar: dos archivos, o los de igual ruta relativa en dos carpetas."""
+    if not os.path.isdir(path_a):
+        yield path_a, path_b
+        return
+    for path in iter_project_files([path_a]):
+        other = os.path.join(path_b, os.path.relpath(path, path_a))
+        if os.path.exists(other):
+            yield path, other
+        else:
+            log.warning("%s no existe en %s", os.path.relpath(path, path_a), path_b)
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--workers', type=int, default=None, help="Procesos a usar (por defecto, uno por CPU)")
+    common.add_argument('--json', action='store_true', help="Un resultado JSON por línea en lugar de texto")
+    common.add_argument('--quiet', action='store_true', help="Sólo muestra los problemas y el resumen")
+    parser = argparse.ArgumentParser(description="Auditoría de archivos de proyecto .lc4")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    validate = sub.add_parser('validate', parents=[common], help="Valida los registros y los conflictos")
+    validate.add_argument('paths', nargs='+')
+    validate.add_argument('--verbose', action='store_true', help="Lista cada conflicto")
+
+    digest = sub.add_parser('digest', parents=[common], help="CRC por tabla de los payloads codificados")
+    digest.add_argument('paths', nargs='+')
+
+    normalize = sub.add_parser('normalize', parents=[common], help="Reescribe los proyectos en el formato actual")
+    normalize.add_argument('path')
+    target = normalize.add_mutually_exclusive_group(required=True)
+    target.add_argument('--out', help="Carpeta de destino (se mantiene la estructura)")
+    target.add_argument('--in-place', action='store_true', help="Reemplaza los archivos originales")
+    target.add_argument('--dry-run', action='store_true', help="Sólo informa qué archivos cambiarían")
+    normalize.add_argument('--binary', action='store_true', help="Escribe el formato binario en lugar de JSON")
+
+    diff = sub.add_parser('diff', parents=[common], help="Registros distintos entre dos proyectos (o dos carpetas)")
+    diff.add_argument('a')
+    diff.add_argument('b')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+
+    options = {}
+    if args.command == 'validate':
+        items = iter_project_files(args.paths)
+        options['verbose'] = args.verbose
+    elif args.command == 'digest':
+        items = iter_project_files(args.paths)
+    elif args.command == 'normalize':
+        items = iter_project_files([args.path])
+        options.update(root=args.path if os.path.isdir(args.path) else None, out=args.out, dry_run=args.dry_run,
+                       binary=args.binary)
+    else:
+        items = _diff_pairs(args.a, args.b)
+
+    start = time.monotonic()
+    counts = collections.Counter()
+    seen_digests = set()
+    duplicates = 0
+    for result in process(args.command, items, options, args.workers):
+        status = result['status']
+        if args.command in ('normalize', 'diff') and status == STATUS_OK:
+            status = 'changed' if result['changed'] else 'unchanged'
+        counts[status] += 1
+        if args.command == 'digest' and status == STATUS_OK:
+            duplicates += result['digest'] in seen_digests
+            seen_digests.add(result['digest'])
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        elif not args.quiet or result['status'] in (STATUS_INVALID, STATUS_CONFLICTS):
+            print(_describe(args.command, result))
+    print(_summary(args.command, counts, time.monotonic() - start, duplicates), file=sys.stderr)
+    return 1 if counts[STATUS_INVALID] or counts[STATUS_CONFLICTS] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+# lights.py
+#
+# Mapeo de las luces de los 8 grupos semafóricos a los bits de los puertos
+# D/E/F del controlador. Es el mismo mapeo que LIGHT_MAP en web/js/constants.js.
+#
+# Para decodificar rápido hay una tabla de 256 entradas por puerto que lleva
+# cada valor del byte a su aporte al vector de estado de los grupos: 4 bits por
+# grupo (G1 en los bits 0-3, G2 en 4-7, ...) con LIT_RED | LIT_AMBER | LIT_GREEN.
+# Decodificar un reporte son tres lecturas de tabla y dos OR.
+
+LIGHT_MAP = {
+    # Puerto D
+    'R1': ('portD', 7), 'A1': ('portD', 6), 'V1': ('portD', 5),
+    'R2': ('portD', 4), 'A2': ('portD', 3), 'V2': ('portD', 2),
+    'R3': ('portD', 1), 'A3': ('portD', 0),
+    # Puerto E
+    'V3': ('portE', 7), 'R4': ('portE', 6), 'A4': ('portE', 5),
+    'V4': ('portE', 4), 'R5': ('portE', 3), 'A5': ('portE', 2),
+    'V5': ('portE', 1), 'R6': ('portE', 0),
+    # Puerto F
+    'A6': ('portF', 7), 'V6': ('portF', 6), 'R7': ('portF', 5),
+    'A7': ('portF', 4), 'V7': ('portF', 3), 'R8': ('portF', 2),
+    'A8': ('portF', 1), 'V8': ('portF', 0),
+}
+
+NUM_GROUPS = 8
+# Luces (rojo, ámbar, verde) de cada grupo, G1..G8
+GROUP_LIGHTS = {group: (f'R{group}', f'A{group}', f'V{group}') for group in range(1, NUM_GROUPS + 1)}
+
+# Desplazamiento de cada puerto dentro de la palabra de 24 bits (D << 16 | E << 8 | F)
+_PORT_SHIFT = {'portD': 16, 'portE': 8, 'portF': 0}
+
+
+def light_bit(light_name):
+    """Posición del bit de una luz dentro de la palabra de 24 bits D/E/F."""
+    port, bit = LIGHT_MAP[light_name]
+    return _PORT_SHIFT[port] + bit
+
+
+def ports_word(port_d, port_e, port_f):
+    """Combina los tres puertos en una palabra de 24 bits."""
+    return (port_d << 16) | (port_e << 8) | port_f
+
+
+# Luces encendidas de un grupo dentro de su nibble del vector de estado
+LIT_RED, LIT_AMBER, LIT_GREEN = 1, 2, 4
+GROUP_BITS = 4
+_LIT_BY_COLOR = {'R': LIT_RED, 'A': LIT_AMBER, 'V': LIT_GREEN}
+_GROUP_SHIFTS = tuple(GROUP_BITS * i for i in range(NUM_GROUPS))
+
+
+def _build_port_table(port):
+    lights = [(bit, _LIT_BY_COLOR[name[0]] << (GROUP_BITS * (int(name[1:]) - 1)))
+              for name, (light_port, bit) in LIGHT_MAP.items() if light_port == port]
+    table = []
+    for value in range(256):
+        packed = 0
+        for bit, contribution in lights:
+            if value & (1 << bit):
+                packed |= contribution
+        table.append(packed)
+    return tuple(table)
+
+
+# Tablas precalculadas, en el orden de los bytes del reporte (D, E, F)
+PORT_TABLES = tuple(_build_port_table(port) for port in ('portD', 'portE', 'portF'))
+_TABLE_D, _TABLE_E, _TABLE_F = PORT_TABLES
+
+
+def pack_groups(port_d, port_e, port_f):
+    """Vector de estado empaquetado de los 8 grupos (un entero de 32 bits)."""
+    return _TABLE_D[port_d] | _TABLE_E[port_e] | _TABLE_F[port_f]
+
+
+def group_states(port_d, port_e, port_f):
+    """Luces encendidas de cada grupo, G1..G8, como combinación de LIT_RED/LIT_AMBER/LIT_GREEN."""
+    packed = _TABLE_D[port_d] | _TABLE_E[port_e] | _TABLE_F[port_f]
+    return [(packed >> shift) & 0xF for shift in _GROUP_SHIFTS]
+
+
+def is_conflict(state):
+    """Un grupo está en conflicto si tiene más de una luz encendida."""
+    return (state & (state - 1)) != 0
@@ -0,0 +1,236 @@
+# link_stats.py
+#
+# Instrumentación del enlace serie: contadores por byte de comando,
+# histogramas de latencia (escritura -> primer byte -> trama completa),
+# errores de trama, timeouts, NACKs, bytes enviados/recibidos y ritmo de los
+# reportes de monitoreo. Registrar un evento es sumar a unos pocos contadores
+# bajo un lock, sin formatear nada; el formateo se hace sólo en snapshot().
+
+import json
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Límites superiores (ms) de las cubetas de los histogramas; la última es "más de 2000 ms"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+MONITORING_CMD = 0x82
+
+
+class Histogram:
+    """Histograma de latencias con cubetas fijas, mínimo, máximo y promedio."""
+    __slots__ = ('counts', 'total', 'sum_ms', 'min_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+
+    def record(self, ms):
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Límite superior de la cubeta que contiene el percentil pedido (aproximado)."""
+        if not self.total:
+            return None
+        target = fraction * self.total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.counts):
+            seen += count
+            if seen >= target:
+                return bound if bound is not None else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def to_dict(self):
+        labels = [f'<={b}' for b in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}']
+        return {
+            'count': self.total,
+            'avg_ms': round(self.sum_ms / self.total, 2) if self.total else 0,
+            'min_ms': round(self.min_ms, 2) if self.min_ms is not None else 0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class _CommandCounters:
+    __slots__ = ('requests', 'responses', 'timeouts', 'lost', 'nacks', 'bytes_out', 'bytes_in',
+                 'first_byte', 'full_frame')
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.timeouts = 0
+        self.lost = 0
+        self.nacks = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.first_byte = Histogram()
+        self.full_frame = Histogram()
+
+    def to_dict(self):
+        return {
+            'requests': self.requests, 'responses': self.responses, 'timeouts': self.timeouts,
+            'lost': self.lost, 'nacks': self.nacks, 'bytes_out': self.bytes_out, 'bytes_in': self.bytes_in,
+            'first_byte': self.first_byte.to_dict(), 'full_frame': self.full_frame.to_dict(),
+        }
+
+
+class LinkStats:
+    """
+    Estadísticas de un enlace (un Communicator). Sobrevive a las reconexiones;
+    los contadores de errores de trama se toman del decodificador activo.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decoder = None
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._started = time.time()
+            self._commands = {}
+            self._unsolicited = {}
+            self.bytes_out = 0
+            self.bytes_in = 0
+            self.frames_out = 0
+            self.frames_in = 0
+            # Errores de trama acumulados de decodificadores anteriores (reconexiones)
+            self._frame_errors_base = {'checksum_errors': 0, 'etx_errors': 0, 'discarded_bytes': 0}
+            self._monitoring_second = None
+            self._monitoring_in_second = 0
+            self._monitoring_rate = 0
+
+    def attach_decoder(self, decoder):
+        """Toma los contadores de checksum/ETX del decodificador del transporte actual."""
+        with self._lock:
+            previous = self._decoder_errors()
+            for key in self._frame_errors_base:
+                self._frame_errors_base[key] += previous[key]
+            self._decoder = decoder
+
+    def _decoder_errors(self):
+        decoder = self._decoder
+        if decoder is None:
+            return {'checksum_errors': 0, 'etx_errors': 0, 'discarded_bytes': 0}
+        return {'checksum_errors': decoder.checksum_errors, 'etx_errors': decoder.etx_errors,
+                'discarded_bytes': decoder.discarded_bytes}
+
+    def _command(self, cmd):
+        counters = self._commands.get(cmd)
+        if counters is None:
+            counters = self._commands[cmd] = _CommandCounters()
+        return counters
+
+    # --- Eventos ---
+
+    def record_request(self, cmd, nbytes):
+        with self._lock:
+            counters = self._command(cmd)
+            counters.requests += 1
+            counters.bytes_out += nbytes
+            self.bytes_out += nbytes
+            self.frames_out += 1
+
+    def record_bytes_in(self, nbytes):
+        with self._lock:
+            self.bytes_in += nbytes
+
+    def record_response(self, cmd, nack, nbytes, first_byte_s, full_frame_s):
+        with self._lock:
+            counters = self._command(cmd)
+            counters.responses += 1
+            counters.bytes_in += nbytes
+            if nack:
+                counters.nacks += 1
+            counters.first_byte.record(max(first_byte_s, 0.0) * 1000)
+            counters.full_frame.record(full_frame_s * 1000)
+            self.frames_in += 1
+
+    def record_timeout(self, cmd, lost=False):
+        with self._lock:
+            counters = self._command(cmd)
+            if lost:
+                counters.lost += 1
+            else:
+                counters.timeouts += 1
+
+    def record_unsolicited(self, cmd):
+        with self._lock:
+            self.frames_in += 1
+            self._unsolicited[cmd] = self._unsolicited.get(cmd, 0) + 1
+            if cmd == MONITORING_CMD:
+                second = int(time.monotonic())
+                if second != self._monitoring_second:
+                    # Reportes completos del último segundo; si pasó más de uno sin reportes, el ritmo es 0
+                    last = self._monitoring_second
+                    self._monitoring_rate = self._monitoring_in_second if last is not None and second - last == 1 else 0
+                    self._monitoring_second = second
+                    self._monitoring_in_second = 0
+                self._monitoring_in_second += 1
+
+    # --- Consulta ---
+
+    def snapshot(self):
+        """Todas las estadísticas como diccionario serializable a JSON."""
+        with self._lock:
+            errors = self._decoder_errors()
+            for key, base in self._frame_errors_base.items():
+                errors[key] += base
+            monitoring_rate = self._monitoring_rate
+            if self._monitoring_second is None or int(time.monotonic()) - self._monitoring_second > 1:
+                monitoring_rate = 0
+            commands = {f'0x{cmd:02X}': c.to_dict() for cmd, c in sorted(self._commands.items())}
+            return {
+                'since': self._started,
+                'uptime_s': round(time.time() - self._started, 1),
+                'bytes_out': self.bytes_out,
+                'bytes_in': self.bytes_in,
+                'frames_out': self.frames_out,
+                'frames_in': self.frames_in,
+                'timeouts': sum(c.timeouts for c in self._commands.values()),
+                'lost': sum(c.lost for c in self._commands.values()),
+                'nacks': sum(c.nacks for c in self._commands.values()),
+                **errors,
+                'unsolicited': {f'0x{cmd:02X}': n for cmd, n in sorted(self._unsolicited.items())},
+                'monitoring_reports': self._unsolicited.get(MONITORING_CMD, 0),
+                'monitoring_rate_hz': monitoring_rate,
+                'commands': commands,
+            }
+
+    # --- Volcado periódico ---
+
+    def start_dump(self, path, interval):
+        """Agrega un snapshot por línea (JSON Lines) a `path` cada `interval` segundos."""
+        self.stop_dump()
+        self._dump_stop.clear()
+        self._dump_thread = threading.Thread(target=self._dump_loop, args=(path, interval), daemon=True)
+        self._dump_thread.start()
+        log.info("Volcando estadísticas del enlace a %s cada %s s", path, interval)
+
+    def stop_dump(self):
+        self._dump_stop.set()
+        if self._dump_thread and self._dump_thread.is_alive():
+            self._dump_thread.join(timeout=1.0)
+        self._dump_thread = None
+
+    def _dump_loop(self, path, interval):
+        while not self._dump_stop.wait(interval):
+            try:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'time': time.time(), **self.snapshot()}) + '\n')
+            except OSError as e:
+                log.warning("No se pudieron volcar las estadísticas del enlace: %s", e)
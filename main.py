@@ -1,111 +1,217 @@
 # main.py
 
+import datetime
 import json
+import logging
+import os
 import webview
-import http.server
-import socketserver
 import threading
 import serial.tools.list_ports
 import queue 
-import time
 
 from communicator import Communicator
 from controller import Controller
+from fleet import FleetManager, JOB_CAPTURE, JOB_UPLOAD, JOB_FACTORY_RESET
+from monitoring import MonitoringHub
+from ui_stream import EventStream
+from recorder import MonitoringRecorder, ReplaySession, DEFAULT_CAPACITY, capacity_for_days
+from storage import app_data_path
+from asset_server import create_server, SERVER_HOST
+from project_model import ProjectModel
+from timeline import TimelineCache
+import conflicts
+
+log = logging.getLogger(__name__)
 
 PORT = 8000
+BASE_URL = f'http://{SERVER_HOST}:{PORT}'
+LINK_STATS_FILE = 'link_stats.jsonl'
 ui_queue = queue.Queue()
 window = None
 
-# Creamos una cola dedicada para los reportes de monitoreo
-monitoring_queue = queue.Queue()
-# Una bandera para controlar el hilo de lectura
+# Último estado de monitoreo por controlador, empujado a la UI sin polling
+monitoring_hub = MonitoringHub()
+# Indica si la vista de monitoreo está suscrita a los reportes 0x82
 monitoring_active = threading.Event()
-
-class Handler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/favicon.ico':
-            self.send_response(204)
-            self.end_headers()
-            return
-        return http.server.SimpleHTTPRequestHandler.do_GET(self)
+# Avance de la captura (tablas y registros a medida que llegan), empujado a la UI
+capture_stream = EventStream()
 
 class Api:
     def __init__(self):
         self._communicator = Communicator()
         self._controller = Controller(self._communicator)
-        self._monitoring_thread = None
+        # Flota de controladores en otros puertos (puesta en marcha de corredores)
+        self._fleet = FleetManager()
+        # Líneas de tiempo de los planes ya calculadas (visualizador de planes)
+        self._timelines = TimelineCache()
+        # Grabación continua de los reportes de monitoreo y su reproducción
+        self._recorder = None
+        self._recording_capacity = DEFAULT_CAPACITY
+        self._replay = None
+
+    def _get_recorder(self):
+        if self._recorder is None:
+            try:
+                self._recorder = MonitoringRecorder(capacity=self._recording_capacity)
+            except (OSError, ValueError) as e:
+                log.error("No se pudo abrir la grabación de monitoreo: %s", e)
+        return self._recorder
+
+    def set_recording_days(self, days):
+        """
+        Días de reportes que conserva la grabación (ej. 7 para el análisis
+        semanal). Se aplica al abrir la grabación; un archivo existente más
+        chico se agranda y nunca se achica.
+        """
+        self._recording_capacity = max(capacity_for_days(days), DEFAULT_CAPACITY)
+        return {'status': 'success', 'capacity': self._recording_capacity}
 
     def start_monitoring(self):
         """Activa el modo monitoreo en el controlador y en el backend."""
-        print("API: Iniciando modo monitoreo...")
+        log.info("Iniciando modo monitoreo...")
         if not self._communicator.is_connected:
             return {'status': 'error', 'message': 'Debe estar conectado para monitorear.'}
 
+        monitoring_hub.start(self._push_monitoring_updates)
+        # El lector del transporte nos entrega los reportes 0x82; los demás comandos
+        # pueden seguir usándose mientras el monitoreo está activo.
+        # (Re)suscribimos siempre: tras reconectar el transporte es nuevo y no tiene suscriptores
+        self._communicator.unsubscribe(0x82, self._on_monitoring_report)
+        self._communicator.subscribe(0x82, self._on_monitoring_report)
+        monitoring_active.set()
         # Enviamos el comando para habilitar el monitoreo en el firmware
         self._communicator.send_command(0x80)
-        
-        # Iniciamos el hilo lector si no está ya corriendo
-        if self._monitoring_thread is None or not self._monitoring_thread.is_alive():
-            monitoring_active.set() # Activamos la bandera
-            self._monitoring_thread = threading.Thread(
-                target=self._background_monitoring_reader,
-                args=(self._communicator.ser,) # Pasamos el objeto serial
-            )
-            self._monitoring_thread.start()
         return {'status': 'success'}
     
     def stop_monitoring(self):
         """Desactiva el modo monitoreo."""
-        print("API: Deteniendo modo monitoreo...")
-        monitoring_active.clear() # Desactivamos la bandera para detener el hilo
-        
-        # Esperamos un poco a que el hilo termine
-        if self._monitoring_thread and self._monitoring_thread.is_alive():
-            self._monitoring_thread.join(timeout=0.5)
+        log.info("Deteniendo modo monitoreo...")
+        monitoring_active.clear()
+        self._communicator.unsubscribe(0x82, self._on_monitoring_report)
+        monitoring_hub.stop()
 
         # Enviamos el comando para deshabilitar el monitoreo en el firmware
         if self._communicator.is_connected:
             self._communicator.send_command(0x81)
         return {'status': 'success'}
     
-    def _background_monitoring_reader(self, ser_instance):
+    def _on_monitoring_report(self, cmd, payload):
         """
-        Corre en un hilo, lee continuamente el puerto serial buscando
-        tramas de monitoreo (CMD 0x82) y las pone en la cola.
+        Recibe cada reporte de monitoreo (CMD 0x82) desde el hilo lector del
+        transporte: lo graba y reemplaza el último estado de ese controlador.
         """
-        while monitoring_active.is_set():
-            try:
-                # Buscamos el inicio de una trama
-                if ser_instance.read(1) == b'\x43':
-                    if ser_instance.read(2) == b'\x53\x4F': # STX encontrado
-                        cmd = ser_instance.read(1)
-                        if cmd == b'\x82': # Es un reporte de monitoreo
-                            length_byte = ser_instance.read(1)
-                            length = int.from_bytes(length_byte, 'big')
-                            payload = ser_instance.read(length)
-                            # Leemos checksum y ETX para limpiar el buffer
-                            ser_instance.read(3) 
-                            
-                            # Parseamos el payload y lo ponemos en la cola
-                            parsed_data = self._controller.parse_monitoring_report(payload)
-                            if parsed_data:
-                                monitoring_queue.put(json.dumps(parsed_data))
-            except (serial.SerialException, TypeError):
-                print("Error en el hilo de monitoreo, cerrando.")
-                monitoring_active.clear()
-            time.sleep(0.01) # Pequeña pausa para no saturar la CPU
+        recorder = self._get_recorder()
+        if recorder:
+            recorder.append(payload)
+        parsed_data = self._controller.parse_monitoring_report(payload)
+        if parsed_data:
+            monitoring_hub.publish(parsed_data['controller_id'], parsed_data)
 
-    def check_monitoring_update(self):
-        """Permite al frontend preguntar si hay un nuevo reporte en la cola."""
+    def _push_monitoring_updates(self, updates):
+        """
+        Entrega a la vista de monitoreo los últimos estados por controlador.
+        evaluate_js espera a que el JS termine, lo que limita el ritmo de envío:
+        mientras tanto los reportes nuevos se fusionan en el hub.
+        """
+        if window:
+            window.evaluate_js(f"window.onMonitoringUpdate && window.onMonitoringUpdate({json.dumps(updates)})")
+
+    def get_recording_info(self):
+        """Rango de tiempo y cantidad de reportes disponibles en la grabación."""
+        recorder = self._get_recorder()
+        if not recorder:
+            return {'status': 'error', 'message': 'La grabación de monitoreo no está disponible.'}
+        return {'status': 'success', **recorder.info()}
+
+    def start_replay(self, start=None, end=None, speed=1.0):
+        """
+        Reproduce en la vista de monitoreo los reportes grabados entre `start` y
+        `end` (segundos epoch) a `speed` veces la velocidad real.
+        """
+        recorder = self._get_recorder()
+        if not recorder:
+            return {'status': 'error', 'message': 'La grabación de monitoreo no está disponible.'}
+        self.stop_replay()
+
+        def publish(payload):
+            parsed_data = self._controller.parse_monitoring_report(payload)
+            if parsed_data:
+                monitoring_hub.publish(parsed_data['controller_id'], parsed_data)
+
+        self._replay = ReplaySession(recorder, publish, start, end, speed)
+        if not len(self._replay):
+            return {'status': 'error', 'message': 'No hay reportes grabados en ese rango.'}
+        monitoring_hub.start(self._push_monitoring_updates)
+        self._replay.start()
+        return {'status': 'success', 'count': len(self._replay)}
+
+    def stop_replay(self):
+        if self._replay:
+            self._replay.stop()
+            self._replay = None
+            if not monitoring_active.is_set():
+                monitoring_hub.stop()
+        return {'status': 'success'}
+
+    def get_replay_status(self):
+        running = bool(self._replay and self._replay.is_running)
+        return {'running': running, 'position': self._replay.position if self._replay else None}
+
+    def export_recording(self, start=None, end=None):
+        """Exporta a CSV un rango de la grabación de monitoreo."""
+        if not window: return
+        recorder = self._get_recorder()
+        if not recorder:
+            return {'status': 'error', 'message': 'La grabación de monitoreo no está disponible.'}
+        filepath = window.create_file_dialog(
+            webview.SAVE_DIALOG,
+            save_filename="monitoreo.csv",
+            file_types=("Archivos CSV (*.csv)", "Todos los archivos (*.*)")
+        )
+        if not filepath:
+            return {'status': 'info', 'message': 'Exportación cancelada por el usuario.'}
+        if isinstance(filepath, (list, tuple)):
+            filepath = filepath[0]
         try:
-            return monitoring_queue.get_nowait()
-        except queue.Empty:
+            count = recorder.export_csv(filepath, start, end)
+            return {'status': 'success', 'message': f'{count} reportes exportados a {filepath}'}
+        except OSError as e:
+            return {'status': 'error', 'message': str(e)}
+
+    def get_monitoring_analytics(self, start=None, end=None, controller_id=None):
+        """
+        Tiempos de fase medidos en la grabación (por grupo y por ciclo) y su
+        comparación con los planes del proyecto cargado. Sin `start` se analiza
+        desde el reporte más antiguo que se conserva; 'start' y 'end' del
+        resultado son el rango realmente cubierto.
+        """
+        recorder = self._get_recorder()
+        if not recorder:
+            return {'status': 'error', 'message': 'La grabación de monitoreo no está disponible.'}
+        try:
+            import analytics
+        except ImportError as e:
+            return {'status': 'error', 'message': f'El análisis requiere NumPy: {e}'}
+        hardware_config = self._controller.project_data.get('hardware_config', {})
+        result = analytics.analyze(recorder.read_raw(start, end), hardware_config, controller_id)
+        result['complete'] = recorder.is_complete(start)
+        if result['status'] == 'success' and not result['complete']:
+            since = datetime.datetime.fromtimestamp(result['start']).strftime('%d/%m/%Y %H:%M')
+            result['message'] = (f'La grabación sólo conserva reportes desde el {since}: '
+                                 'el comienzo del rango pedido ya se sobrescribió.')
+        return result
+
+    def check_monitoring_update(self):
+        """Último estado de monitoreo conocido (alternativa por consulta al envío automático)."""
+        latest = monitoring_hub.latest()
+        if not latest:
             return None
+        return json.dumps(latest)
 
     def new_project(self):
         if not window: return
         self._controller.reset_project_data()
-        app_url = f'http://localhost:{PORT}/web/html/app.html?action=new'
+        app_url = f'{BASE_URL}/web/html/app.html?action=new'
         window.load_url(app_url)
 
     def open_project_file(self):
@@ -117,7 +223,7 @@ class Api:
         if filepaths:
             result = self._controller.load_project_from_file(filepaths[0])
             if result['status'] == 'success':
-                app_url = f'http://localhost:{PORT}/web/html/app.html?action=load'
+                app_url = f'{BASE_URL}/web/html/app.html?action=load'
                 window.load_url(app_url)
             else:
                 window.create_alert('Error al Abrir Archivo', result['message'])
@@ -129,6 +235,19 @@ class Api:
     def update_project_data(self, project_json):
         """Reemplaza los datos del proyecto en memoria."""
         self._controller.project_data = json.loads(project_json)
+
+    def get_plan_timelines(self, hardware_config_json):
+        """
+        Línea de tiempo programada de cada plan (tramos por grupo, ciclo, verdes
+        efectivos, intermitencias y conflictos): {id_plan: línea de tiempo}.
+        Sólo se recalculan los planes cuyos registros cambiaron.
+        """
+        try:
+            model = ProjectModel.from_hardware_config(json.loads(hardware_config_json))
+        except (ValueError, TypeError, AttributeError) as e:
+            return {'status': 'error', 'message': f'Configuración inválida: {e}'}
+        return {'status': 'success', 'timelines': self._timelines.timelines(model)}
+
     def check_capture_result(self):
         """
         Permite al frontend preguntar si hay un resultado en la cola.
@@ -137,7 +256,7 @@ class Api:
         try:
             # Intenta obtener un item de la cola SIN esperar.
             result = ui_queue.get_nowait()
-            print("API: Resultado de captura entregado al frontend.")
+            log.info("Resultado de captura entregado al frontend.")
             return result
         except queue.Empty:
             # Si la cola está vacía, simplemente devuelve None.
@@ -156,27 +275,49 @@ class Api:
         Esta función ahora es más simple: hace el trabajo y deja el resultado en la cola.
         Ya no se comunica directamente con la GUI.
         """
-        print("API (Thread): Realizando captura de configuración completa...")
-        self._controller.capture_full_configuration()
+        log.info("Realizando captura de configuración completa...")
+        # Un controlador conocido se abre desde la caché si sigue igual
+        result = self._stream_capture(self._controller.load_configuration)
+        self._queue_capture_result(result)
 
+    def _stream_capture(self, capture):
+        """
+        Ejecuta una captura enviando a la UI cada tabla y registro apenas se leen,
+        para que las vistas se llenen progresivamente. El resultado final sigue
+        llegando completo por la cola.
+        """
+        capture_stream.start(self._push_capture_events)
+        self._controller.capture_callback = capture_stream.publish
+        try:
+            return capture()
+        finally:
+            self._controller.capture_callback = None
+            capture_stream.stop()
+
+    def _push_capture_events(self, events):
+        if window:
+            window.evaluate_js(f"window.onCaptureEvents && window.onCaptureEvents({json.dumps(events)})")
+
+    def _queue_capture_result(self, result):
         full_project_data = self._controller.project_data
         full_project_data['is_connected'] = self._communicator.is_connected
 
-        json_data = json.dumps(full_project_data)
+        # El resultado (con el 'job_id' si la captura quedó incompleta) viaja junto a los datos
+        json_data = json.dumps({**full_project_data, 'capture_result': result})
         
         # En lugar de llamar a evaluate_js, ponemos el resultado en nuestro "buzón"
         ui_queue.put(json_data)
-        print("API (Thread): Datos de captura puestos en la cola para la UI.")
+        log.info("Datos de captura puestos en la cola para la UI.")
 
     # --- El resto de las funciones de la clase Api no necesitan cambios ---
     def request_capture_and_navigate(self):
         if not window: return
-        print("API: Navegando a la aplicación para iniciar captura...")
-        app_url = f'http://localhost:{PORT}/web/html/app.html?action=capture'
+        log.info("Navegando a la aplicación para iniciar captura...")
+        app_url = f'{BASE_URL}/web/html/app.html?action=capture'
         window.load_url(app_url)
 
     def get_initial_ui_data(self):
-        print("API: La UI solicitó los datos existentes en memoria.")
+        log.info("La UI solicitó los datos existentes en memoria.")
         # Esta función sigue siendo útil si en el futuro se carga un archivo
         # sin estar conectado a un controlador.
         dashboard_data = self._controller.get_dashboard_data()
@@ -184,9 +325,13 @@ class Api:
         return dashboard_data
 
     def connect(self, port, baudrate):
+        # Un puerto nuevo puede ser otro controlador: la próxima subida será completa
+        self._controller.invalidate_sync_snapshot()
         return self._communicator.connect(port, baudrate)
 
     def disconnect(self):
+        self._controller.invalidate_sync_snapshot()
+        monitoring_active.clear()
         return self._communicator.disconnect()
 
     def get_connection_status(self):
@@ -197,14 +342,14 @@ class Api:
 
     def go_to_welcome(self):
         if window:
-            welcome_url = f'http://localhost:{PORT}/web/html/welcome.html'
+            welcome_url = f'{BASE_URL}/web/html/welcome.html'
             window.load_url(welcome_url)
 
     def confirm_and_disconnect(self):
         if not window: return
         should_disconnect = window.create_confirmation_dialog('Confirmar Desconexión', '¿Estás seguro de que quieres desconectar y volver al inicio?')
         if should_disconnect:
-            print("API: Usuario confirmó desconexión.")
+            log.info("Usuario confirmó desconexión.")
             self.disconnect()
             self.go_to_welcome()
 
@@ -229,35 +374,32 @@ class Api:
         if not self._communicator.is_connected:
             return {'status': 'error', 'message': 'No hay conexión con el controlador.'}
         
-        print("API: Enviando comando de Reseteo de Fábrica (0xF0)...")
-        response = self._communicator.send_command(0xF0)
-
-        # --- INICIO DE LA CORRECCIÓN ---
-        # El comunicador ya verificó que la respuesta fue un ACK.
-        # Solo necesitamos comprobar si el estado general fue exitoso.
-        if response.get('status') == 'success':
-        # --- FIN DE LA CORRECCIÓN ---
-            print("API: Reseteo de Fábrica confirmado por el controlador.")
-            return {'status': 'success', 'message': 'El controlador ha sido restablecido a los valores de fábrica.'}
-        else:
-            print("API: Falló el comando de Reseteo de Fábrica.")
-            # Pasamos el mensaje de error que nos dio el comunicador (ej. Timeout)
-            return {'status': 'error', 'message': response.get('message', 'El controlador no confirmó el reseteo.')}
+        return self._controller.factory_reset()
 
-    def upload_configuration(self, project_json):
-        """Recibe los datos del frontend y orquesta la subida al controlador."""
+    def upload_configuration(self, project_json, force_full=False, ignore_conflicts=False):
+        """
+        Recibe los datos del frontend y orquesta la subida al controlador.
+        Por defecto sólo se escriben los registros que cambiaron; `force_full`
+        fuerza la escritura de todos. Si la configuración tiene conflictos no se
+        sube (status 'conflicts') salvo que se indique `ignore_conflicts`.
+        """
         if not self._communicator.is_connected:
             return {'status': 'error', 'message': 'No hay conexión con el controlador.'}
         
         try:
             project_data = json.loads(project_json)
             hardware_config = project_data.get('hardware_config', {})
+
+            if not ignore_conflicts:
+                check = conflicts.check_project(project_data)
+                if check['conflicts']:
+                    return {**check, 'status': 'conflicts'}
             
             # Lanzamos la subida en un hilo para no bloquear la UI
             # y devolvemos el resultado a través de la cola.
             upload_thread = threading.Thread(
                 target=self._background_upload_task, 
-                args=(hardware_config,)
+                args=(hardware_config, bool(force_full))
             )
             upload_thread.start()
             
@@ -266,23 +408,153 @@ class Api:
         except Exception as e:
             return {'status': 'error', 'message': f'Error procesando los datos: {e}'}
 
-    def _background_upload_task(self, hardware_config):
+    def resume_job(self, job_id):
+        """
+        Reanuda una captura o subida interrumpida: sólo se repiten los registros
+        pendientes. El resultado llega por la misma cola que el trabajo original.
+        """
+        if not self._communicator.is_connected:
+            return {'status': 'error', 'message': 'No hay conexión con el controlador.'}
+        threading.Thread(target=self._background_resume_task, args=(job_id,)).start()
+        return {'status': 'pending', 'message': 'Reanudando trabajo...'}
+
+    def _background_resume_task(self, job_id):
+        result = self._stream_capture(lambda: self._controller.resume_job(job_id))
+        if result.get('kind') == 'capture':
+            self._queue_capture_result(result)
+        else:
+            ui_queue.put(json.dumps(result))
+
+    def get_pending_jobs(self):
+        """Capturas y subidas interrumpidas que se pueden reanudar."""
+        return {'status': 'success', 'jobs': self._controller.list_jobs()}
+
+    def get_upload_stats(self):
+        """Latencias por comando de escritura y pausas aprendidas en la última subida."""
+        return self._controller.get_write_stats()
+
+    def get_link_stats(self):
+        """
+        Estadísticas del enlace serie: contadores e histogramas de latencia por
+        comando, errores de trama, timeouts, NACKs, bytes y ritmo de monitoreo.
+        """
+        return {'status': 'success', **self._communicator.link_stats.snapshot()}
+
+    def reset_link_stats(self):
+        self._communicator.link_stats.reset()
+        return {'status': 'success'}
+
+    def set_link_stats_dump(self, interval=0):
+        """Vuelca las estadísticas del enlace a un archivo cada `interval` segundos (0 lo desactiva)."""
+        stats = self._communicator.link_stats
+        if not interval:
+            stats.stop_dump()
+            return {'status': 'success'}
+        path = app_data_path('logs', LINK_STATS_FILE)
+        stats.start_dump(path, float(interval))
+        return {'status': 'success', 'path': path}
+
+    def check_conflicts(self, project_json):
+        """
+        Conflictos de la configuración completa (verdes según la matriz, rojo y
+        verde a la vez, transiciones de las secuencias e intermitencias).
+        Es barato: se puede llamar en cada edición.
+        """
+        try:
+            project_data = json.loads(project_json)
+        except ValueError as e:
+            return {'status': 'error', 'message': f'Error procesando los datos: {e}', 'conflicts': []}
+        return conflicts.check_project(project_data)
+
+    def verify_configuration(self, project_json, repair=True):
+        """
+        Comprueba (CRC por tabla o lectura de una muestra) que el controlador tenga
+        la configuración del proyecto; con `repair` reescribe sólo lo que difiere.
+        """
+        if not self._communicator.is_connected:
+            return {'status': 'error', 'message': 'No hay conexión con el controlador.'}
+        try:
+            hardware_config = json.loads(project_json).get('hardware_config', {})
+        except (ValueError, AttributeError) as e:
+            return {'status': 'error', 'message': f'Error procesando los datos: {e}'}
+        return self._controller.verify_configuration(hardware_config, repair=bool(repair))
+
+    def _background_upload_task(self, hardware_config, force_full=False):
         """Tarea que se ejecuta en segundo plano para subir los datos."""
-        result = self._controller.upload_full_configuration(hardware_config)
+        result = self._controller.upload_full_configuration(hardware_config, force_full=force_full)
+        if result.get('status') == 'success':
+            # Cada puesta en marcha termina con la comprobación de lo escrito
+            verification = self._controller.verify_configuration(hardware_config)
+            result['verification'] = verification
+            result['message'] = f"{result['message']} {verification['message']}"
         # Usamos la misma cola que la captura para comunicar el resultado
         ui_queue.put(json.dumps(result))
 
+    # --- Flota: varios controladores en paralelo, uno por puerto ---
+    def fleet_connect(self, ports, baudrate):
+        """Conecta una lista de puertos a la flota. Retorna el resultado por puerto."""
+        return self._fleet.connect(ports, baudrate)
+
+    def fleet_disconnect(self, ports=None):
+        return self._fleet.disconnect(ports)
+
+    def fleet_capture(self, ports):
+        """Captura en paralelo la configuración de los controladores indicados."""
+        return self._fleet.start_job(JOB_CAPTURE, {port: None for port in ports})
+
+    def fleet_upload(self, projects_json, force_full=False, ignore_conflicts=False):
+        """
+        Sube en paralelo una configuración a cada controlador.
+        `projects_json` es un objeto {puerto: datos del proyecto}. Igual que en
+        upload_configuration, si algún proyecto tiene conflictos no se sube
+        ninguno (status 'conflicts', por puerto) salvo que se indique `ignore_conflicts`.
+        """
+        try:
+            projects = json.loads(projects_json)
+            targets = {port: (project.get('hardware_config', {}), bool(force_full))
+                       for port, project in projects.items()}
+        except (ValueError, AttributeError) as e:
+            return {'status': 'error', 'message': f'Error procesando los datos: {e}'}
+        if not ignore_conflicts:
+            checks = {port: conflicts.check_project(project) for port, project in projects.items()}
+            found = {port: check['conflicts'] for port, check in checks.items() if check['conflicts']}
+            if found:
+                return {'status': 'conflicts', 'conflicts': found,
+                        'message': f'Se encontraron conflictos en {len(found)} de {len(projects)} configuraciones: '
+                                   f'{", ".join(sorted(found))}.'}
+        return self._fleet.start_job(JOB_UPLOAD, targets)
+
+    def fleet_factory_reset(self, ports):
+        return self._fleet.start_job(JOB_FACTORY_RESET, {port: None for port in ports})
+
+    def fleet_get_status(self):
+        """Avance y estado del último trabajo de cada controlador de la flota."""
+        return self._fleet.get_status()
+
+    def fleet_get_result(self, port):
+        """Resultado completo del último trabajo de un puerto (ej. la configuración capturada)."""
+        return self._fleet.get_result(port)
+
 def start_server():
-    httpd = socketserver.TCPServer(("", PORT), Handler)
-    print(f"Iniciando servidor local en http://localhost:{PORT}")
+    httpd = create_server(PORT)
+    log.info("Iniciando servidor local en %s", BASE_URL)
     httpd.serve_forever()
 
 if __name__ == '__main__':
+    # LC4_LOG_LEVEL=DEBUG muestra cada trama enviada y recibida
+    logging.basicConfig(level=os.environ.get('LC4_LOG_LEVEL', 'INFO').upper(),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     server_thread = threading.Thread(target=start_server, daemon=True)
     server_thread.start()
     
     api = Api()
-    start_url = f'http://localhost:{PORT}/web/html/welcome.html'
+    # LC4_LINK_STATS_INTERVAL=<segundos> activa el volcado periódico de las estadísticas del enlace
+    if os.environ.get('LC4_LINK_STATS_INTERVAL'):
+        api.set_link_stats_dump(os.environ['LC4_LINK_STATS_INTERVAL'])
+    # LC4_RECORDING_DAYS=<días> agranda la grabación de monitoreo (7 para el análisis semanal, 96 MB)
+    if os.environ.get('LC4_RECORDING_DAYS'):
+        api.set_recording_days(os.environ['LC4_RECORDING_DAYS'])
+    start_url = f'{BASE_URL}/web/html/welcome.html'
     
     # El arranque se simplifica: ya no necesitamos el hilo listener.
     window = webview.create_window('Cormar - Controlador Semafórico', start_url, js_api=api, width=880, height=620, resizable=True)
@@ -0,0 +1,85 @@
+# monitoring.py
+
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Mínimo tiempo entre dos envíos a la UI (50 actualizaciones/s como máximo)
+DEFAULT_PUSH_INTERVAL = 0.02
+
+
+class MonitoringHub:
+    """
+    Punto de encuentro entre el lector serie y la interfaz para los reportes de
+    monitoreo. Guarda sólo el último estado de cada controlador: si llegan
+    varios reportes antes de que la UI consuma el anterior, los viejos se
+    descartan. Un hilo empuja los estados pendientes a la UI en cuanto llegan,
+    sin que el frontend tenga que preguntar.
+    """
+    def __init__(self, push_interval=DEFAULT_PUSH_INTERVAL):
+        self._lock = threading.Lock()
+        self._latest = {}      # controller_id -> último estado
+        self._pending = {}     # controller_id -> estado aún no enviado a la UI
+        self._wakeup = threading.Event()
+        self._running = threading.Event()
+        self._thread = None
+        self._push_interval = push_interval
+        self.received = 0
+        self.dropped = 0
+
+    def publish(self, controller_id, state):
+        """Registra el estado más reciente de un controlador (reemplaza al pendiente)."""
+        with self._lock:
+            self.received += 1
+            if controller_id in self._pending:
+                self.dropped += 1
+            self._latest[controller_id] = state
+            self._pending[controller_id] = state
+        self._wakeup.set()
+
+    def latest(self):
+        """Último estado conocido de cada controlador."""
+        with self._lock:
+            return dict(self._latest)
+
+    def _take_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def start(self, sink):
+        """
+        Inicia el hilo que entrega los estados a `sink(updates)`, donde
+        `updates` es {controller_id: estado}. `sink` puede bloquear (por ejemplo
+        mientras la UI evalúa el JS); mientras tanto los reportes se acumulan
+        en un único estado por controlador.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._push_loop, args=(sink,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=0.5)
+        with self._lock:
+            self._pending.clear()
+
+    def _push_loop(self, sink):
+        while self._running.is_set():
+            self._wakeup.wait(timeout=0.5)
+            self._wakeup.clear()
+            updates = self._take_pending()
+            if not updates or not self._running.is_set():
+                continue
+            try:
+                sink(updates)
+            except Exception as e:
+                log.error("Error al enviar el estado a la UI: %s", e)
+            # Dejamos que se acumulen reportes nuevos en lugar de saturar la UI
+            time.sleep(self._push_interval)
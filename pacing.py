@@ -0,0 +1,163 @@
+# pacing.py
+
+import logging
+import time
+import threading
+
+from storage import app_data_path, load_json, save_json
+
+log = logging.getLogger(__name__)
+
+# Comandos de escritura en EEPROM cuyo ritmo se aprende
+PACED_COMMANDS = (0x23, 0x30, 0x40, 0x50, 0x60, 0x70)
+
+INITIAL_GAP = 0.005         # Empezamos agresivos: 5 ms entre escrituras
+MAX_GAP = 0.25              # Nunca esperamos más de 250 ms
+MIN_BACKOFF_STEP = 0.01     # Ante un fallo subimos al menos 10 ms
+SUCCESS_STREAK = 8          # Escrituras correctas seguidas antes de intentar bajar la pausa
+DECREASE_FACTOR = 0.8
+SAFETY_MARGIN = 1.2         # No bajamos de la última pausa que falló multiplicada por este margen
+
+PROFILES_FILE = 'pacing_profiles.json'
+# Varios controladores (flota) pueden guardar su perfil a la vez en el mismo archivo
+_profiles_file_lock = threading.Lock()
+
+
+class CommandStats:
+    """Estadísticas de latencia de escritura para un byte de comando."""
+    __slots__ = ('writes', 'failures', 'total_latency', 'min_latency', 'max_latency', 'total_wait')
+
+    def __init__(self):
+        self.writes = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.min_latency = None
+        self.max_latency = 0.0
+        self.total_wait = 0.0
+
+    def add_latency(self, latency):
+        self.total_latency += latency
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+        self.max_latency = max(self.max_latency, latency)
+
+    def to_dict(self):
+        attempts = self.writes + self.failures
+        return {
+            'writes': self.writes,
+            'failures': self.failures,
+            'avg_latency_ms': round(self.total_latency / attempts * 1000, 2) if attempts else 0,
+            'min_latency_ms': round((self.min_latency or 0) * 1000, 2),
+            'max_latency_ms': round(self.max_latency * 1000, 2),
+            'total_wait_ms': round(self.total_wait * 1000, 2),
+            'total_time_ms': round((self.total_latency + self.total_wait) * 1000, 2),
+        }
+
+
+class WritePacer:
+    """
+    Aprende la pausa mínima segura entre escrituras en EEPROM para cada byte de
+    comando. Empieza con una pausa corta, la reduce poco a poco mientras el
+    controlador responde ACK y la aumenta al recibir NACK o timeout.
+    Los valores aprendidos se guardan por ID de controlador.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._controller_id = None
+        self._gaps = {}
+        self._floors = {}
+        self._streaks = {}
+        self._stats = {}
+        self._last_command = None
+        self._last_ack_time = 0.0
+
+    def _profiles_path(self):
+        return app_data_path(PROFILES_FILE)
+
+    def load_profile(self, controller_id):
+        """Carga las pausas aprendidas para un controlador (o los valores iniciales)."""
+        with self._lock:
+            self._controller_id = str(controller_id)
+            profile = load_json(self._profiles_path(), {}).get(self._controller_id, {})
+            self._gaps = {int(cmd, 16): gap for cmd, gap in profile.get('gaps', {}).items()}
+            self._floors = {int(cmd, 16): gap for cmd, gap in profile.get('floors', {}).items()}
+            self._streaks = {}
+            self._stats = {}
+            self._last_command = None
+
+    def save_profile(self):
+        """Persiste las pausas aprendidas del controlador actual."""
+        with self._lock:
+            if self._controller_id is None:
+                return
+            profile = {
+                'gaps': {f"{cmd:02X}": round(gap, 4) for cmd, gap in self._gaps.items()},
+                'floors': {f"{cmd:02X}": round(gap, 4) for cmd, gap in self._floors.items()},
+            }
+        with _profiles_file_lock:
+            path = self._profiles_path()
+            profiles = load_json(path, {})
+            profiles[self._controller_id] = profile
+            try:
+                save_json(path, profiles)
+            except OSError as e:
+                log.warning("No se pudo guardar el perfil de escritura: %s", e)
+
+    def gap_for(self, command):
+        return self._gaps.get(command, INITIAL_GAP)
+
+    def wait(self, command):
+        """
+        Espera lo necesario para que la EEPROM termine la escritura anterior
+        antes de enviar `command`. La pausa depende del comando anterior.
+        """
+        if self._last_command is None:
+            return
+        remaining = self._last_ack_time + self.gap_for(self._last_command) - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+            with self._lock:
+                self._stats.setdefault(command, CommandStats()).total_wait += remaining
+
+    def record_success(self, command, latency):
+        with self._lock:
+            stats = self._stats.setdefault(command, CommandStats())
+            stats.writes += 1
+            stats.add_latency(latency)
+            self._last_command = command
+            self._last_ack_time = time.monotonic()
+
+            streak = self._streaks.get(command, 0) + 1
+            if streak >= SUCCESS_STREAK:
+                floor = self._floors.get(command, 0.0) * SAFETY_MARGIN
+                self._gaps[command] = max(floor, self.gap_for(command) * DECREASE_FACTOR)
+                streak = 0
+            self._streaks[command] = streak
+
+    def record_failure(self, command, latency):
+        with self._lock:
+            stats = self._stats.setdefault(command, CommandStats())
+            stats.failures += 1
+            stats.add_latency(latency)
+            # La pausa anterior no fue suficiente para el comando previo
+            culprit = self._last_command if self._last_command is not None else command
+            failed_gap = self.gap_for(culprit)
+            self._floors[culprit] = max(self._floors.get(culprit, 0.0), failed_gap)
+            self._gaps[culprit] = min(MAX_GAP, max(failed_gap * 2, failed_gap + MIN_BACKOFF_STEP))
+            self._streaks[culprit] = 0
+            self._last_command = culprit
+            self._last_ack_time = time.monotonic()
+
+    def get_stats(self):
+        """Retorna las estadísticas por comando y las pausas actuales."""
+        with self._lock:
+            commands = sorted(set(PACED_COMMANDS) | set(self._stats) | set(self._gaps))
+            return {
+                'controller_id': self._controller_id,
+                'commands': {
+                    f"0x{cmd:02X}": {
+                        **(self._stats[cmd].to_dict() if cmd in self._stats else CommandStats().to_dict()),
+                        'gap_ms': round(self.gap_for(cmd) * 1000, 2),
+                    }
+                    for cmd in commands
+                }
+            }
@@ -0,0 +1,207 @@
+# project_file.py
+#
+# Formato binario opcional de los archivos de proyecto .lc4. Un encabezado con
+# un directorio de secciones (nombre, codificación, posición, largo, CRC-32)
+# permite leer sólo las secciones que se necesitan: las tablas de hardware se
+# guardan como los payloads exactos de la línea, uno detrás de otro, y la
+# configuración de software (mapa, elementos) va aparte en JSON comprimido.
+# La matriz de conflictos se repite en 8 bytes para validar sin abrir el mapa.
+#
+# Una tabla cuyos registros no vuelven idénticos desde su payload (por ejemplo
+# hex en minúsculas o campos extra) se guarda en JSON, así la conversión ida y
+# vuelta con el formato JSON no pierde nada.
+
+import json
+import struct
+import zlib
+
+from project_model import TABLES, TABLES_BY_NAME
+from storage import save_bytes
+
+MAGIC = b'LC4P'
+VERSION = 1
+# Encabezado: magic, versión, cantidad de secciones
+HEADER = struct.Struct('<4sHH')
+# Cada entrada del directorio: nombre, codificación, posición, largo, CRC-32 del contenido
+ENTRY = struct.Struct('<16sB3xIII')
+DIRECTORY_CRC = struct.Struct('<I')
+
+ENCODING_PAYLOADS = 0  # Payloads de la línea concatenados
+ENCODING_JSON = 1      # JSON UTF-8 comprimido con zlib
+ENCODING_BITS = 2      # Matriz 8x8 de booleanos, una fila por byte
+
+SECTION_INFO = 'info'
+SECTION_HARDWARE_EXTRA = 'hardware_extra'
+SECTION_SOFTWARE = 'software'
+SECTION_CONFLICT_MATRIX = 'conflict_matrix'
+SECTION_EXTRA = 'extra'
+HARDWARE_KEYS = (SECTION_INFO,) + tuple(spec.name for spec in TABLES)
+
+MATRIX_SIZE = 8
+
+
+def is_binary_project(head):
+    """True si los primeros bytes de un archivo son los del formato binario."""
+    return head[:len(MAGIC)] == MAGIC
+
+
+def _json(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _encode_table(spec, items):
+    """Payloads concatenados, o None si algún registro no se reconstruye idéntico desde su payload."""
+    payloads = []
+    last_id = -1
+    try:
+        for item in items:
+            record = spec.record_cls.from_dict(item)
+            payload = record.to_payload()
+            decoded = spec.record_cls.from_payload(payload)
+            if record.id <= last_id or decoded is None or decoded.to_dict() != item:
+                return None
+            last_id = record.id
+            payloads.append(payload)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    return b''.join(payloads)
+
+
+def _decode_table(spec, data):
+    size = spec.record_cls.SIZE
+    return [spec.record_cls.from_payload(data[i:i + size]).to_dict() for i in range(0, len(data), size)]
+
+
+def _encode_matrix(matrix):
+    if (not isinstance(matrix, list) or len(matrix) != MATRIX_SIZE
+            or any(not isinstance(row, list) or len(row) != MATRIX_SIZE for row in matrix)
+            or any(not isinstance(cell, bool) for row in matrix for cell in row)):
+        return None
+    return bytes(sum(1 << j for j, cell in enumerate(row) if cell) for row in matrix)
+
+
+def _decode_matrix(data):
+    return [[bool(row & (1 << j)) for j in range(MATRIX_SIZE)] for row in data]
+
+
+def encode_project(project_data) -> bytes:
+    """Archivo binario completo de los datos de un proyecto (formato actual)."""
+    hardware_config = project_data.get('hardware_config', {})
+    software_config = project_data.get('software_config', {})
+    sections = [(SECTION_INFO, ENCODING_JSON, _json(hardware_config.get('info', {})))]
+    for spec in TABLES:
+        if spec.name not in hardware_config:
+            continue
+        items = hardware_config[spec.name]
+        data = _encode_table(spec, items) if isinstance(items, list) else None
+        sections.append((spec.name, ENCODING_PAYLOADS, data) if data is not None
+                        else (spec.name, ENCODING_JSON, _json(items)))
+    hardware_extra = {k: v for k, v in hardware_config.items() if k not in HARDWARE_KEYS}
+    if hardware_extra:
+        sections.append((SECTION_HARDWARE_EXTRA, ENCODING_JSON, _json(hardware_extra)))
+    if 'software_config' in project_data:
+        matrix = _encode_matrix(((software_config or {}).get('intersection') or {}).get('conflict_matrix'))
+        if matrix is not None:
+            sections.append((SECTION_CONFLICT_MATRIX, ENCODING_BITS, matrix))
+        sections.append((SECTION_SOFTWARE, ENCODING_JSON, _json(software_config)))
+    extra = {k: v for k, v in project_data.items() if k not in ('hardware_config', 'software_config')}
+    if extra:
+        sections.append((SECTION_EXTRA, ENCODING_JSON, _json(extra)))
+
+    directory = []
+    offset = HEADER.size + ENTRY.size * len(sections) + DIRECTORY_CRC.size
+    for name, encoding, data in sections:
+        directory.append(ENTRY.pack(name.encode('ascii'), encoding, offset, len(data), zlib.crc32(data)))
+        offset += len(data)
+    head = HEADER.pack(MAGIC, VERSION, len(sections)) + b''.join(directory)
+    return head + DIRECTORY_CRC.pack(zlib.crc32(head)) + b''.join(data for _, _, data in sections)
+
+
+class BinaryProject:
+    """
+    Lector de un archivo binario: al abrirlo sólo se lee el directorio y cada
+    sección se lee (y se verifica su CRC) cuando se pide.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.sections = self._read_directory()
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _read_directory(self):
+        head = self._file.read(HEADER.size)
+        if len(head) < HEADER.size:
+            raise ValueError(f'{self.path} está incompleto.')
+        magic, version, count = HEADER.unpack(head)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} no es un proyecto binario.')
+        if version != VERSION:
+            raise ValueError(f'{self.path} usa la versión {version} del formato binario, que no se reconoce.')
+        entries = self._file.read(ENTRY.size * count)
+        (crc,) = DIRECTORY_CRC.unpack(self._file.read(DIRECTORY_CRC.size) or b'\0' * DIRECTORY_CRC.size)
+        if len(entries) != ENTRY.size * count or zlib.crc32(head + entries) != crc:
+            raise ValueError(f'El directorio de {self.path} está dañado.')
+        sections = {}
+        for i in range(count):
+            name, encoding, offset, length, section_crc = ENTRY.unpack_from(entries, i * ENTRY.size)
+            sections[name.rstrip(b'\0').decode('ascii')] = (encoding, offset, length, section_crc)
+        return sections
+
+    def read(self, name, default=None):
+        """Contenido decodificado de una sección, o `default` si el archivo no la tiene."""
+        if name not in self.sections:
+            return default
+        encoding, offset, length, crc = self.sections[name]
+        self._file.seek(offset)
+        data = self._file.read(length)
+        if len(data) != length or zlib.crc32(data) != crc:
+            raise ValueError(f'La sección {name} de {self.path} está dañada.')
+        if encoding == ENCODING_JSON:
+            return json.loads(zlib.decompress(data))
+        if encoding == ENCODING_BITS:
+            return _decode_matrix(data)
+        return _decode_table(TABLES_BY_NAME[name], data)
+
+    def hardware_config(self):
+        hardware_config = {}
+        for key in HARDWARE_KEYS:
+            if key in self.sections:
+                hardware_config[key] = self.read(key)
+        hardware_config.update(self.read(SECTION_HARDWARE_EXTRA, {}))
+        return hardware_config
+
+    def conflict_matrix(self):
+        """Matriz de conflictos sin leer la sección de software (None si no está)."""
+        return self.read(SECTION_CONFLICT_MATRIX)
+
+    def project_data(self, load_software=True):
+        """
+        Datos del proyecto con la misma estructura que el JSON. Sin `load_software`
+        no se lee el mapa: software_config sólo trae la matriz de conflictos.
+        """
+        project_data = {'hardware_config': self.hardware_config()}
+        if load_software:
+            if SECTION_SOFTWARE in self.sections:
+                project_data['software_config'] = self.read(SECTION_SOFTWARE)
+        else:
+            matrix = self.conflict_matrix()
+            project_data['software_config'] = {'intersection': {'conflict_matrix': matrix}} if matrix else {}
+        project_data.update(self.read(SECTION_EXTRA, {}))
+        return project_data
+
+
+def save_project(path, project_data):
+    # Se escribe aparte y se reemplaza: un corte a mitad de camino no pierde el proyecto anterior
+    save_bytes(path, encode_project(project_data))
@@ -0,0 +1,428 @@
+# project_model.py
+#
+# Modelo tipado e indexado por ID de la configuración de hardware del LC4.
+# Se construye una sola vez desde project_data['hardware_config'] y cada
+# registro sabe leerse desde / escribirse a su payload exacto de la línea.
+
+# --- Límites de las tablas en la EEPROM del controlador ---
+MAX_MOVEMENTS = 60
+MAX_SEQUENCES = 8
+MAX_PLANS = 20
+MAX_INTERMITENCES = 10
+MAX_HOLIDAYS = 20
+# Nueva constante extraída del firmware
+MAX_FLOW_CONTROL_RULES = 10
+
+MOVEMENT_TIMES = 5
+SEQUENCE_SLOTS = 12
+
+# Días de la semana (0 = domingo ... 6 = sábado, 7 = feriado) que cubre cada
+# tipo de día de un plan. Igual que DAY_TYPE_MAP en web/js/constants.js.
+DAY_TYPE_MAP = {
+    0: (0,), 1: (1,), 2: (2,), 3: (3,), 4: (4,), 5: (5,), 6: (6,),
+    7: (1, 2, 3, 4, 5, 6, 0), 8: (1, 2, 3, 4, 5, 6), 9: (6, 0),
+    10: (1, 2, 3, 4, 5), 11: (5, 6, 0), 12: (1, 2, 3, 4),
+    13: (5, 6), 14: (7,)
+}
+HOLIDAY_DAY = 7
+
+
+def _hex_byte(value, field):
+    """Convierte un valor hexadecimal del proyecto ('A5') a entero de un byte."""
+    try:
+        number = int(value, 16)
+    except (ValueError, TypeError):
+        raise ValueError(f'El campo {field} tiene un valor hexadecimal inválido: {value!r}')
+    if not 0 <= number <= 0xFF:
+        raise ValueError(f'El campo {field} está fuera de rango: {value!r}')
+    return number
+
+
+def _byte(value, field):
+    """Valida que un valor del proyecto quepa en un byte."""
+    if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= 0xFF:
+        raise ValueError(f'El campo {field} debe ser un entero entre 0 y 255: {value!r}')
+    return value
+
+
+class Movement:
+    """Movimiento: estado de los puertos D/E/F/H/J y 5 tiempos. Payload de 11 bytes."""
+    __slots__ = ('id', 'port_d', 'port_e', 'port_f', 'port_h', 'port_j', 'times')
+    SIZE = 11
+
+    def __init__(self, id, port_d, port_e, port_f, port_h, port_j, times):
+        self.id = id
+        self.port_d = port_d
+        self.port_e = port_e
+        self.port_f = port_f
+        self.port_h = port_h
+        self.port_j = port_j
+        self.times = times # bytes de longitud MOVEMENT_TIMES
+
+    @classmethod
+    def from_dict(cls, data):
+        times = data['times']
+        if len(times) < MOVEMENT_TIMES:
+            raise ValueError(f'El movimiento {data["id"]} debe tener {MOVEMENT_TIMES} tiempos.')
+        return cls(
+            data['id'],
+            _hex_byte(data['portD'], 'portD'), _hex_byte(data['portE'], 'portE'),
+            _hex_byte(data['portF'], 'portF'), _hex_byte(data['portH'], 'portH'),
+            _hex_byte(data['portJ'], 'portJ'),
+            bytes(_byte(t, 'times') for t in times[:MOVEMENT_TIMES])
+        )
+
+    @classmethod
+    def from_payload(cls, payload):
+        # Payload: [Index, D, E, F, H, J, T0, T1, T2, T3, T4] (11 bytes)
+        if len(payload) != cls.SIZE:
+            return None
+        # Un slot de movimiento vacío en la EEPROM usualmente se lee como 0xFF.
+        # Si el primer byte de los puertos es 0xFF, consideramos que es un
+        # movimiento inválido o "fantasma" y lo descartamos devolviendo None.
+        if payload[1] == 0xFF:
+            return None
+        return cls(payload[0], payload[1], payload[2], payload[3], payload[4], payload[5], bytes(payload[6:11]))
+
+    @staticmethod
+    def empty_payload(index):
+        # Si el movimiento no existe, lo llenamos con 0xFF (vacío)
+        return bytes([index]) + b'\xFF' * 10
+
+    def to_payload(self):
+        return bytes((self.id, self.port_d, self.port_e, self.port_f, self.port_h, self.port_j)) + self.times
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'portD': f"{self.port_d:02X}",
+            'portE': f"{self.port_e:02X}",
+            'portF': f"{self.port_f:02X}",
+            'portH': f"{self.port_h:02X}",
+            'portJ': f"{self.port_j:02X}",
+            'times': list(self.times)
+        }
+
+
+class Sequence:
+    """Secuencia: tipo, posición de ancla y hasta 12 movimientos. Payload de 16 bytes."""
+    __slots__ = ('id', 'type', 'anchor_pos', 'movements')
+    SIZE = 16
+
+    def __init__(self, id, type, anchor_pos, movements):
+        self.id = id
+        self.type = type
+        self.anchor_pos = anchor_pos
+        self.movements = movements # bytes con los IDs de movimiento
+
+    @classmethod
+    def from_dict(cls, data):
+        movements = data['movements']
+        if len(movements) > SEQUENCE_SLOTS:
+            raise ValueError(f'La secuencia {data["id"]} tiene más de {SEQUENCE_SLOTS} movimientos.')
+        return cls(data['id'], _byte(data['type'], 'type'), _byte(data['anchor_pos'], 'anchor_pos'),
+                   bytes(_byte(m, 'movements') for m in movements))
+
+    @classmethod
+    def from_payload(cls, payload):
+        # Payload: [Index, Tipo, Ancla_Pos, Num_Mov, Mov_0, ..., Mov_11] (16 bytes)
+        if len(payload) != cls.SIZE:
+            return None
+        num_movements = payload[3]
+        # Un slot de secuencia vacío se lee como 0xFF, igual que en los movimientos:
+        # no es una secuencia de 12 movimientos 0xFF sino un slot sin usar.
+        if num_movements == 0xFF:
+            return None
+        return cls(payload[0], payload[1], payload[2], bytes(payload[4:4 + num_movements]))
+
+    @staticmethod
+    def empty_payload(index):
+        return bytes([index]) + b'\xFF' * 15
+
+    def to_payload(self):
+        # Los slots de movimiento sin usar se rellenan con 0xFF
+        padding = b'\xFF' * (SEQUENCE_SLOTS - len(self.movements))
+        return bytes((self.id, self.type, self.anchor_pos, len(self.movements))) + self.movements + padding
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'anchor_pos': self.anchor_pos,
+            'movements': list(self.movements)
+        }
+
+
+class Plan:
+    """Plan horario: tipo de día, secuencia, índice de tiempo y hora de inicio. Payload de 6 bytes."""
+    __slots__ = ('id', 'day_type_id', 'sequence_id', 'time_sel', 'hour', 'minute')
+    SIZE = 6
+
+    def __init__(self, id, day_type_id, sequence_id, time_sel, hour, minute):
+        self.id = id
+        self.day_type_id = day_type_id
+        self.sequence_id = sequence_id
+        self.time_sel = time_sel
+        self.hour = hour
+        self.minute = minute
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], _byte(data['day_type_id'], 'day_type_id'), _byte(data['sequence_id'], 'sequence_id'),
+                   _byte(data['time_sel'], 'time_sel'), _byte(data['hour'], 'hour'), _byte(data['minute'], 'minute'))
+
+    @classmethod
+    def from_payload(cls, payload):
+        # Payload: [Index, TipoDia, Sec, Tsel, Hora, Min] (6 bytes)
+        if len(payload) != cls.SIZE:
+            return None
+        # Un plan vacío tiene un tipo de día inválido (255)
+        if payload[1] == 0xFF:
+            return None
+        return cls(payload[0], payload[1], payload[2], payload[3], payload[4], payload[5])
+
+    @staticmethod
+    def empty_payload(index):
+        # Un plan vacío tiene un tipo de día inválido (255)
+        return bytes([index]) + b'\xFF' * 5
+
+    def to_payload(self):
+        return bytes((self.id, self.day_type_id, self.sequence_id, self.time_sel, self.hour, self.minute))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'day_type_id': self.day_type_id,
+            'sequence_id': self.sequence_id,
+            'time_sel': self.time_sel,
+            'hour': self.hour,
+            'minute': self.minute
+        }
+
+
+class Intermittence:
+    """Regla de intermitencia: plan, movimiento y máscaras D/E/F. Payload de 6 bytes."""
+    __slots__ = ('id', 'plan_id', 'movement_id', 'mask_d', 'mask_e', 'mask_f')
+    SIZE = 6
+
+    def __init__(self, id, plan_id, movement_id, mask_d, mask_e, mask_f):
+        self.id = id
+        self.plan_id = plan_id
+        self.movement_id = movement_id
+        self.mask_d = mask_d
+        self.mask_e = mask_e
+        self.mask_f = mask_f
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], _byte(data['id_plan'], 'id_plan'), _byte(data['indice_mov'], 'indice_mov'),
+                   _hex_byte(data['maskD'], 'maskD'), _hex_byte(data['maskE'], 'maskE'), _hex_byte(data['maskF'], 'maskF'))
+
+    @classmethod
+    def from_payload(cls, payload):
+        # Payload: [Index, PlanID, MovID, MaskD, MaskE, MaskF] (6 bytes)
+        if len(payload) != cls.SIZE:
+            return None
+        # Slot vacío: no apunta a ningún plan
+        if payload[1] == 0xFF:
+            return None
+        return cls(payload[0], payload[1], payload[2], payload[3], payload[4], payload[5])
+
+    @staticmethod
+    def empty_payload(index):
+        return bytes([index]) + b'\xFF' * 5
+
+    def to_payload(self):
+        return bytes((self.id, self.plan_id, self.movement_id, self.mask_d, self.mask_e, self.mask_f))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'id_plan': self.plan_id, # Nombres que usa el frontend
+            'indice_mov': self.movement_id,
+            'maskD': f"{self.mask_d:02X}",
+            'maskE': f"{self.mask_e:02X}",
+            'maskF': f"{self.mask_f:02X}"
+        }
+
+
+class Holiday:
+    """Feriado: día y mes. Payload de 3 bytes."""
+    __slots__ = ('id', 'day', 'month')
+    SIZE = 3
+
+    def __init__(self, id, day, month):
+        self.id = id
+        self.day = day
+        self.month = month
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], _byte(data['day'], 'day'), _byte(data['month'], 'month'))
+
+    @classmethod
+    def from_payload(cls, payload):
+        if len(payload) != cls.SIZE:
+            return None
+        return cls(payload[0], payload[1], payload[2])
+
+    @classmethod
+    def parse_table(cls, payload):
+        """Los feriados llegan todos en una trama: [ID, Dia, Mes, ID, Dia, Mes, ...] (N * 3 bytes)."""
+        return [cls(payload[i], payload[i + 1], payload[i + 2])
+                for i in range(0, len(payload) - cls.SIZE + 1, cls.SIZE)]
+
+    @staticmethod
+    def empty_payload(index):
+        # Un feriado inválido puede tener día 0
+        return bytes([index, 0, 0])
+
+    def to_payload(self):
+        return bytes((self.id, self.day, self.month))
+
+    def to_dict(self):
+        return {'id': self.id, 'day': self.day, 'month': self.month}
+
+
+class FlowRule:
+    """Regla de control de flujo. Payload de 6 bytes."""
+    __slots__ = ('id', 'sequence_id', 'origin_mov_id', 'rule_type', 'demand_mask', 'destination_mov_id')
+    SIZE = 6
+
+    def __init__(self, id, sequence_id, origin_mov_id, rule_type, demand_mask, destination_mov_id):
+        self.id = id
+        self.sequence_id = sequence_id
+        self.origin_mov_id = origin_mov_id
+        self.rule_type = rule_type
+        self.demand_mask = demand_mask
+        self.destination_mov_id = destination_mov_id
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], _byte(data['sequence_id'], 'sequence_id'), _byte(data['origin_mov_id'], 'origin_mov_id'),
+                   _byte(data['rule_type'], 'rule_type'), _byte(data['demand_mask'], 'demand_mask'),
+                   _byte(data['destination_mov_id'], 'destination_mov_id'))
+
+    @classmethod
+    def from_payload(cls, payload):
+        # Payload: [Index, Sec, MovOrig, Tipo, Mascara, MovDest] (6 bytes)
+        if len(payload) != cls.SIZE:
+            return None
+        # Slot vacío: no apunta a ninguna secuencia
+        if payload[1] == 0xFF:
+            return None
+        return cls(payload[0], payload[1], payload[2], payload[3], payload[4], payload[5])
+
+    @staticmethod
+    def empty_payload(index):
+        return bytes([index]) + b'\xFF' * 5
+
+    def to_payload(self):
+        return bytes((self.id, self.sequence_id, self.origin_mov_id, self.rule_type, self.demand_mask, self.destination_mov_id))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sequence_id': self.sequence_id,
+            'origin_mov_id': self.origin_mov_id,
+            'rule_type': self.rule_type,
+            'demand_mask': self.demand_mask,
+            'destination_mov_id': self.destination_mov_id
+        }
+
+
+class TableSpec:
+    """Describe una tabla de la EEPROM: tipo de registro, tamaño y comandos de lectura/escritura."""
+    __slots__ = ('name', 'record_cls', 'max_items', 'read_cmd', 'write_cmd', 'label', 'label_plural')
+
+    def __init__(self, name, record_cls, max_items, read_cmd, write_cmd, label, label_plural):
+        self.name = name
+        self.record_cls = record_cls
+        self.max_items = max_items
+        self.read_cmd = read_cmd
+        self.write_cmd = write_cmd
+        self.label = label
+        self.label_plural = label_plural
+
+
+# Tablas en el orden de subida. El orden es importante para mantener la integridad referencial.
+TABLES = (
+    TableSpec('movements', Movement, MAX_MOVEMENTS, 0x24, 0x23, 'el movimiento', 'movimientos'),
+    TableSpec('sequences', Sequence, MAX_SEQUENCES, 0x31, 0x30, 'la secuencia', 'secuencias'),
+    TableSpec('plans', Plan, MAX_PLANS, 0x41, 0x40, 'el plan', 'planes'),
+    TableSpec('intermittences', Intermittence, MAX_INTERMITENCES, 0x51, 0x50, 'la intermitencia', 'intermitencias'),
+    TableSpec('holidays', Holiday, MAX_HOLIDAYS, 0x61, 0x60, 'el feriado', 'feriados'),
+    TableSpec('flow_rules', FlowRule, MAX_FLOW_CONTROL_RULES, 0x71, 0x70, 'la regla de flujo', 'reglas de flujo'),
+)
+TABLES_BY_NAME = {spec.name: spec for spec in TABLES}
+
+CMD_WRITE_CONTROLLER_ID = 0x10
+
+
+def format_controller_id(number):
+    """ID del controlador como lo guarda el proyecto: hexadecimal de dos caracteres (10 -> '0A')."""
+    return f"{number:02X}"
+
+
+class ProjectModel:
+    """
+    Configuración de hardware indexada por ID. Cada tabla es un diccionario
+    {id: registro}, de modo que buscar un registro no recorre la lista.
+    """
+    __slots__ = ('info', 'tables')
+
+    def __init__(self, info=None, tables=None):
+        self.info = dict(info or {})
+        self.tables = tables if tables is not None else {spec.name: {} for spec in TABLES}
+
+    @classmethod
+    def from_hardware_config(cls, hardware_config):
+        """Construye el modelo validando cada registro. Lanza ValueError si algo es inválido."""
+        model = cls(hardware_config.get('info', {}))
+        for spec in TABLES:
+            index = model.tables[spec.name]
+            for item in hardware_config.get(spec.name, []):
+                try:
+                    record = spec.record_cls.from_dict(item)
+                except KeyError as e:
+                    raise ValueError(f'Falta el campo {e} en {spec.label} {item.get("id", "?")}.')
+                # Si hay IDs repetidos manda el primero, como hacía la búsqueda lineal
+                index.setdefault(record.id, record)
+        return model
+
+    def to_hardware_config(self):
+        """Convierte el modelo al formato de diccionarios que usa el frontend y los archivos .lc4."""
+        hardware_config = {'info': dict(self.info)}
+        for spec in TABLES:
+            records = self.tables[spec.name]
+            hardware_config[spec.name] = [records[key].to_dict() for key in sorted(records)]
+        return hardware_config
+
+    def get(self, table, record_id):
+        return self.tables[table].get(record_id)
+
+    def add(self, table, record):
+        self.tables[table].setdefault(record.id, record)
+
+    def controller_id_payload(self):
+        """Payload del ID del controlador (comando 0x10)."""
+        # Extraemos el ID del diccionario 'info', si no existe, usamos '0'.
+        controller_id = self.info.get('controller_id', '0')
+        if isinstance(controller_id, int):
+            return bytes([_byte(controller_id, 'ID del controlador')])
+        # El archivo .lc4 lo guarda en hexadecimal, como lo formatea la captura (format_controller_id)
+        return bytes([_hex_byte(controller_id, 'ID del controlador')])
+
+    def encode_table(self, table):
+        """Payloads de todos los slots de una tabla, incluidos los vacíos."""
+        spec = TABLES_BY_NAME[table]
+        records = self.tables[table]
+        return [records[i].to_payload() if i in records else spec.record_cls.empty_payload(i)
+                for i in range(spec.max_items)]
+
+    def encode_all(self):
+        """Todos los payloads de escritura: {tabla: [payload de cada slot]}, incluido 'info'."""
+        encoded = {'info': [self.controller_id_payload()]}
+        for spec in TABLES:
+            encoded[spec.name] = self.encode_table(spec.name)
+        return encoded
@@ -0,0 +1,323 @@
+# recorder.py
+#
+# Grabador continuo de reportes de monitoreo (CMD 0x82) en un archivo circular
+# de registros fijos, mapeado en memoria. Cada registro ocupa 16 bytes:
+# [timestamp float64][payload de 5 bytes][3 bytes de relleno].
+#
+# Los timestamps de la grabación nunca retroceden (la búsqueda por rango es
+# binaria): si el reloj del sistema se atrasa, se sigue contando desde el
+# último registro con el reloj monotónico.
+
+import argparse
+import bisect
+import csv
+import datetime
+import mmap
+import os
+import struct
+import threading
+import time
+
+from storage import app_data_path
+
+MAGIC = b'LC4R'
+VERSION = 1
+# Encabezado: magic, versión, tamaño de registro, capacidad, cabeza (total escrito) y
+# timestamp del registro más nuevo que se sobrescribió (0 si todavía no se perdió ninguno)
+HEADER = struct.Struct('<4sHHIQd')
+HEADER_SIZE = 32
+RECORD = struct.Struct('<d5s3x')
+REPORT_PAYLOAD_SIZE = 5
+
+# 262144 registros * 16 bytes = 4 MB: unas 7 horas a 10 Hz o 3 días a 1 Hz
+DEFAULT_CAPACITY = 262144
+DEFAULT_FILE = 'monitoring.ring'
+# Reportes por segundo que envía el controlador en modo monitoreo
+REPORT_RATE = 10
+
+
+def capacity_for_days(days, rate=REPORT_RATE):
+    """Registros necesarios para conservar `days` días de reportes (una semana a 10 Hz son 96 MB)."""
+    return int(float(days) * 86400 * rate)
+
+
+class _TimestampView:
+    """Vista de sólo lectura de los timestamps en orden cronológico, para usar con bisect."""
+    def __init__(self, recorder, count):
+        self._recorder = recorder
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._recorder._record_at(index)[0]
+
+
+class MonitoringRecorder:
+    """
+    Archivo circular de reportes de monitoreo. Al llenarse se sobrescriben los
+    más antiguos, así que el tamaño en disco es fijo. Un archivo existente más
+    chico que `capacity` se agranda conservando lo grabado.
+    """
+    def __init__(self, path=None, capacity=DEFAULT_CAPACITY):
+        self.path = path or app_data_path('recordings', DEFAULT_FILE)
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._open(capacity)
+
+    def _open(self, capacity):
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER_SIZE
+        self._file = open(self.path, 'r+b' if exists else 'w+b')
+        requested = capacity
+        if exists:
+            magic, version, record_size, stored_capacity, head, overwritten = HEADER.unpack_from(
+                self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                raise ValueError(f'{self.path} no es un archivo de grabación de monitoreo válido.')
+            capacity = stored_capacity
+        else:
+            head, overwritten = 0, 0.0
+        self.capacity = capacity
+        self._map_file()
+        self._head = head
+        self._overwritten = overwritten
+        self._last = self._record_at(len(self) - 1)[0] if len(self) else 0.0
+        self._last_clock = time.monotonic()
+        if requested > capacity:
+            self._grow(requested)
+        self._write_header()
+
+    def _map_file(self):
+        size = HEADER_SIZE + self.capacity * RECORD.size
+        if os.path.getsize(self.path) < size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _grow(self, capacity):
+        """Agranda el archivo dejando lo grabado en orden cronológico desde el primer slot."""
+        count = len(self)
+        data = self.read_raw()
+        self._map.close()
+        self.capacity = capacity
+        self._map_file()
+        self._map[HEADER_SIZE:HEADER_SIZE + len(data)] = data
+        self._head = count
+
+    def _write_header(self):
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self.capacity, self._head, self._overwritten)
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._file.close()
+                self._map = None
+
+    def __len__(self):
+        return min(self._head, self.capacity)
+
+    def append(self, payload, timestamp=None):
+        """Agrega un reporte de monitoreo (payload de 5 bytes de la trama 0x82)."""
+        if len(payload) != REPORT_PAYLOAD_SIZE:
+            return
+        with self._lock:
+            clock = time.monotonic()
+            if timestamp is None:
+                timestamp = time.time()
+                if timestamp < self._last:
+                    # El reloj de pared retrocedió: se avanza desde el último registro lo que pasó realmente
+                    timestamp = self._last + max(clock - self._last_clock, 0.0)
+            # Un timestamp anterior al último se ajusta a éste: la grabación queda siempre ordenada
+            timestamp = max(timestamp, self._last)
+            offset = HEADER_SIZE + (self._head % self.capacity) * RECORD.size
+            if self._head >= self.capacity:
+                self._overwritten = RECORD.unpack_from(self._map, offset)[0]
+            RECORD.pack_into(self._map, offset, timestamp, bytes(payload))
+            self._last, self._last_clock = timestamp, clock
+            self._head += 1
+            self._write_header()
+
+    def _record_at(self, index):
+        """Registro `index` en orden cronológico (0 = el más antiguo que se conserva)."""
+        start = self._head - len(self)
+        offset = HEADER_SIZE + ((start + index) % self.capacity) * RECORD.size
+        return RECORD.unpack_from(self._map, offset)
+
+    def info(self):
+        """Cantidad de registros y rango de tiempo disponible."""
+        with self._lock:
+            count = len(self)
+            if not count:
+                return {'count': 0, 'capacity': self.capacity, 'start': None, 'end': None, 'overwritten': None}
+            return {'count': count, 'capacity': self.capacity,
+                    'start': self._record_at(0)[0], 'end': self._record_at(count - 1)[0],
+                    'overwritten': self._overwritten or None}
+
+    def is_complete(self, start):
+        """
+        False si la grabación ya sobrescribió reportes posteriores a `start`, es
+        decir, si un rango que empieza en `start` llega incompleto. Sin `start`
+        el rango empieza en el reporte más antiguo que se conserva: siempre completo.
+        """
+        with self._lock:
+            return start is None or not self._overwritten or start > self._overwritten
+
+    def _bounds(self, start, end):
+        """Índices cronológicos [first, last) del rango. La búsqueda es binaria."""
+        count = len(self)
+        timestamps = _TimestampView(self, count)
+        first = 0 if start is None else bisect.bisect_left(timestamps, start)
+        last = count if end is None else bisect.bisect_right(timestamps, end)
+        return first, last
+
+    def read_range(self, start=None, end=None):
+        """Retorna [(timestamp, payload)] con start <= timestamp <= end."""
+        with self._lock:
+            first, last = self._bounds(start, end)
+            return [self._record_at(i) for i in range(first, last)]
+
+    def read_raw(self, start=None, end=None):
+        """
+        Bytes de los registros del rango en orden cronológico, sin decodificar,
+        para procesarlos en bloque (ej. con NumPy).
+        """
+        with self._lock:
+            first, last = self._bounds(start, end)
+            oldest = self._head - len(self)
+            chunks = []
+            index = first
+            while index < last:
+                slot = (oldest + index) % self.capacity
+                n = min(last - index, self.capacity - slot)
+                offset = HEADER_SIZE + slot * RECORD.size
+                chunks.append(self._map[offset:offset + n * RECORD.size])
+                index += n
+            return b''.join(chunks)
+
+    def export_csv(self, filepath, start=None, end=None):
+        """Exporta un rango de la grabación a CSV. Retorna la cantidad de registros escritos."""
+        records = self.read_range(start, end)
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'fecha_hora', 'controller_id', 'portD', 'portE', 'portF', 'peatonal'])
+            for timestamp, payload in records:
+                writer.writerow([f"{timestamp:.3f}", datetime.datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='milliseconds'),
+                                 payload[0], f"{payload[1]:02X}", f"{payload[2]:02X}", f"{payload[3]:02X}", payload[4]])
+        return len(records)
+
+
+class ReplaySession:
+    """
+    Reproduce un rango de la grabación entregando cada reporte a `sink(payload)`
+    respetando los intervalos originales, multiplicados por `speed`.
+    """
+    def __init__(self, recorder, sink, start=None, end=None, speed=1.0):
+        self._records = recorder.read_range(start, end)
+        self._sink = sink
+        self._speed = max(float(speed), 0.01)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.position = None
+
+    def __len__(self):
+        return len(self._records)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=0.5)
+
+    @property
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        if not self._records:
+            return
+        base_record = self._records[0][0]
+        base_clock = time.monotonic()
+        for timestamp, payload in self._records:
+            delay = base_clock + (timestamp - base_record) / self._speed - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                return
+            if self._stop.is_set():
+                return
+            self.position = timestamp
+            self._sink(payload)
+
+
+def _record_headless(args):
+    """Graba reportes de monitoreo sin interfaz gráfica hasta que se presione Ctrl+C."""
+    from communicator import Communicator
+
+    communicator = Communicator()
+    result = communicator.connect(args.port, args.baudrate)
+    if result['status'] != 'success':
+        print(f"No se pudo abrir {args.port}: {result['message']}")
+        return 1
+    recorder = MonitoringRecorder(args.file, capacity_for_days(args.days) if args.days else DEFAULT_CAPACITY)
+    communicator.subscribe(0x82, lambda cmd, payload: recorder.append(payload))
+    communicator.send_command(0x80)
+    print(f"Grabando reportes de {args.port} en {recorder.path} (Ctrl+C para terminar)...")
+    try:
+        while communicator.is_connected:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        communicator.send_command(0x81)
+        communicator.disconnect()
+        count = len(recorder)
+        recorder.close()
+    print(f"Grabación detenida. {count} registros en el archivo.")
+    return 0
+
+
+def _parse_time(value):
+    return datetime.datetime.fromisoformat(value).timestamp() if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grabación de reportes de monitoreo del LC4")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record = sub.add_parser('record', help="Graba reportes desde un puerto serie")
+    record.add_argument('port')
+    record.add_argument('--baudrate', default=9600)
+    record.add_argument('--file', default=None)
+    record.add_argument('--days', type=float, default=None,
+                        help="Días de reportes a conservar (agranda el archivo, ej. 7 para el análisis semanal)")
+
+    export = sub.add_parser('export', help="Exporta un rango a CSV")
+    export.add_argument('output')
+    export.add_argument('--file', default=None)
+    export.add_argument('--start', help="Fecha/hora ISO, ej. 2025-08-18T14:00")
+    export.add_argument('--end')
+
+    info = sub.add_parser('info', help="Muestra el rango disponible")
+    info.add_argument('--file', default=None)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        return _record_headless(args)
+
+    recorder = MonitoringRecorder(args.file)
+    try:
+        if args.command == 'export':
+            count = recorder.export_csv(args.output, _parse_time(args.start), _parse_time(args.end))
+            print(f"{count} registros exportados a {args.output}")
+        else:
+            print(recorder.info())
+    finally:
+        recorder.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
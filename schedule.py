@@ -0,0 +1,133 @@
+# schedule.py
+#
+# Plan vigente en cada instante. Los planes son filas (tipo de día, hora,
+# minuto) que se expanden con DAY_TYPE_MAP a los días de la semana; en las
+# fechas de la tabla de feriados rige el programa de feriados (tipo 14) en
+# lugar del de ese día de la semana. Para un rango de fechas se compila la
+# lista ordenada de cambios de plan y las consultas (qué plan rige en T, qué
+# cambios hay entre T1 y T2) se resuelven con búsqueda binaria.
+
+import bisect
+import datetime
+
+from project_model import DAY_TYPE_MAP, HOLIDAY_DAY
+
+# Días que se compilan antes del rango pedido para saber qué plan venía en curso
+LOOKBACK_DAYS = 8
+_ONE_DAY = datetime.timedelta(days=1)
+
+
+def _timestamp(when):
+    return when.timestamp() if isinstance(when, datetime.datetime) else float(when)
+
+
+class ScheduleIndex:
+    """
+    Cambios de plan de un rango de fechas: `starts` (timestamps ordenados) y el
+    plan que empieza en cada uno. Dos entradas seguidas nunca tienen el mismo plan.
+    """
+    __slots__ = ('starts', 'plan_ids')
+
+    def __init__(self, starts, plan_ids):
+        self.starts = starts
+        self.plan_ids = plan_ids
+
+    def __len__(self):
+        return len(self.starts)
+
+    def plan_at(self, when):
+        """ID del plan vigente en un instante (datetime local o timestamp), o None."""
+        i = bisect.bisect_right(self.starts, _timestamp(when)) - 1
+        return self.plan_ids[i] if i >= 0 else None
+
+    def transitions(self, start, end):
+        """Plan vigente en `start` y cada cambio hasta `end` (exclusivo): [(timestamp, id_plan), ...]."""
+        start, end = _timestamp(start), _timestamp(end)
+        first = bisect.bisect_right(self.starts, start) - 1
+        last = bisect.bisect_left(self.starts, end)
+        result = [(start, self.plan_ids[first])] if first >= 0 else []
+        result.extend(zip(self.starts[first + 1:last], self.plan_ids[first + 1:last]))
+        return result
+
+
+class PlanSchedule:
+    """
+    Programa diario de planes para cada día de la semana (0 = domingo) y para
+    los feriados (7). Si dos planes empiezan a la misma hora rige el de ID mayor.
+    """
+    def __init__(self, day_programs, holidays):
+        # {minuto: plan} con las entradas ordenadas: a igual minuto queda el de ID mayor
+        self._programs = {day: sorted(dict(sorted(day_programs.get(day, ()))).items())
+                          for day in range(HOLIDAY_DAY + 1)}
+        self._holidays = frozenset(holidays)
+        self._years = {}
+
+    @classmethod
+    def from_model(cls, model, plan_ids=None):
+        """Programa de un `ProjectModel`; `plan_ids` limita los planes considerados."""
+        programs = {}
+        for plan in model.tables['plans'].values():
+            if plan_ids is not None and plan.id not in plan_ids:
+                continue
+            if plan.hour > 23 or plan.minute > 59:
+                continue # Un slot vacío o corrupto no tiene hora válida
+            for day in DAY_TYPE_MAP.get(plan.day_type_id, ()):
+                programs.setdefault(day, []).append((plan.hour * 60 + plan.minute, plan.id))
+        holidays = {(h.month, h.day) for h in model.tables['holidays'].values() if h.day}
+        return cls(programs, holidays)
+
+    def day_key(self, day):
+        """Programa que rige en una fecha: 7 si es feriado (y hay planes de feriado) o su día de la semana."""
+        if (day.month, day.day) in self._holidays and self._programs[HOLIDAY_DAY]:
+            return HOLIDAY_DAY
+        return day.isoweekday() % 7
+
+    def compile(self, start_date, end_date):
+        """
+        Índice de los cambios de plan entre dos fechas (fin exclusivo), con el
+        plan que venía en curso. Recorre día por día: para consultas repetidas
+        usar year_index, que se compila una sola vez.
+        """
+        starts, plan_ids = [], []
+        day = start_date - LOOKBACK_DAYS * _ONE_DAY
+        while day < end_date:
+            midnight = datetime.datetime.combine(day, datetime.time())
+            for minute, plan_id in self._programs[self.day_key(day)]:
+                if plan_ids and plan_ids[-1] == plan_id:
+                    continue
+                starts.append((midnight + datetime.timedelta(minutes=minute)).timestamp())
+                plan_ids.append(plan_id)
+            day += _ONE_DAY
+        return ScheduleIndex(starts, plan_ids)
+
+    def year_index(self, year):
+        """Índice de un año completo; se compila una vez por año consultado."""
+        index = self._years.get(year)
+        if index is None:
+            index = self._years[year] = self.compile(datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1))
+        return index
+
+    def plan_at(self, when):
+        """ID del plan vigente en un instante (datetime local o timestamp), o None."""
+        timestamp = _timestamp(when)
+        return self.year_index(datetime.datetime.fromtimestamp(timestamp).year).plan_at(timestamp)
+
+    def transitions(self, start, end):
+        """
+        Plan vigente en `start` y cada cambio de plan hasta `end`: [(timestamp, id_plan), ...].
+        Se resuelve con búsqueda binaria sobre los índices anuales ya compilados,
+        uniendo los años que abarca el rango.
+        """
+        start, end = _timestamp(start), _timestamp(end)
+        result = []
+        year = datetime.datetime.fromtimestamp(start).year
+        segment_start = start
+        while True:
+            next_year = datetime.datetime(year + 1, 1, 1).timestamp()
+            for timestamp, plan_id in self.year_index(year).transitions(segment_start, min(end, next_year)):
+                # En el cambio de año el plan en curso continúa: no es un cambio
+                if not result or result[-1][1] != plan_id:
+                    result.append((timestamp, plan_id))
+            if next_year >= end:
+                return result
+            year, segment_start = year + 1, next_year
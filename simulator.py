@@ -0,0 +1,465 @@
+# simulator.py
+#
+# Emulador del firmware del LC4 para probar Communicator / Controller sin un
+# controlador físico. Habla el mismo protocolo (STX 'CSO', CMD, LEN, payload,
+# checksum, ETX) sobre un par pty o un socket TCP (socket://host:puerto), con
+# latencia, demora de escritura en EEPROM y errores de bit configurables.
+#
+# Uso: python simulator.py [--socket 7000] [--latency-ms 5] [--eeprom-ms 10] [--ber 1e-5]
+
+import argparse
+import json
+import os
+import random
+import select
+import socket
+import threading
+import time
+import tty
+import zlib
+
+from communicator import (FrameDecoder, build_frame, CMD_ACK, CMD_NACK, CMD_TABLE_DUMP, TABLE_DUMP_HEADER,
+                          CMD_TABLE_WRITE, CMD_TABLE_COMMIT, TABLE_WRITE_HEADER, CMD_TABLE_CRC)
+from project_model import ProjectModel, TABLES, Holiday, Plan
+from schedule import PlanSchedule
+
+CMD_READ_ID = 0x11
+CMD_WRITE_ID = 0x10
+CMD_READ_TIME = 0x21
+CMD_WRITE_TIME = 0x22
+CMD_FACTORY_RESET = 0xF0
+CMD_MONITOR_ON = 0x80
+CMD_MONITOR_OFF = 0x81
+CMD_MONITOR_REPORT = 0x82
+
+DEFAULT_REPORT_INTERVAL = 0.1 # El firmware reporta el estado 10 veces por segundo
+EEPROM_PAGE_SIZE = 64 # Bytes que la EEPROM graba en una sola escritura de página
+
+
+class _PtyLink:
+    """Extremo maestro de un pty: el Communicator abre el esclavo como si fuera un COM."""
+    def __init__(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+    def fileno(self):
+        return self._master
+
+    def read(self):
+        try:
+            return os.read(self._master, 4096)
+        except OSError:
+            return b''
+
+    def write(self, data):
+        os.write(self._master, data)
+
+    def close(self):
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class _SocketLink:
+    """Servidor TCP de una conexión a la vez, para conectarse con socket://host:puerto."""
+    def __init__(self, host='127.0.0.1', port=0):
+        self._server = socket.create_server((host, port))
+        self._conn = None
+        host, port = self._server.getsockname()[:2]
+        self.port = f'socket://{host}:{port}'
+
+    def fileno(self):
+        return (self._conn or self._server).fileno()
+
+    def read(self):
+        if self._conn is None:
+            self._conn, _ = self._server.accept()
+            self._conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return b''
+        data = self._conn.recv(4096)
+        if not data:
+            # El cliente se desconectó: volvemos a esperar una conexión
+            self._conn.close()
+            self._conn = None
+        return data
+
+    def write(self, data):
+        if self._conn is not None:
+            try:
+                self._conn.sendall(data)
+            except OSError:
+                pass
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._server.close()
+
+
+class LC4Simulator:
+    """
+    Controlador LC4 simulado. Guarda las tablas como los payloads crudos de cada
+    slot de la EEPROM y responde lecturas, escrituras (ACK/NACK), el borrado de
+    fábrica y el modo monitoreo con reportes 0x82 periódicos.
+
+    - latency: demora antes de cada respuesta (procesamiento del firmware).
+    - eeprom_write_delay: tiempo que la EEPROM queda ocupada tras una escritura.
+    - rx_buffer: bytes que el UART acepta mientras la EEPROM está ocupada; el
+      resto se pierde, como en el equipo real cuando se escribe demasiado rápido.
+    - baudrate: si se indica, cada trama tarda lo que tardaría en la línea.
+    - bit_error_rate: probabilidad de invertir cada bit, en ambos sentidos.
+    - table_dump: si es False, el firmware no conoce el volcado de tablas (0x0A) y responde NACK.
+    - table_write: si es False, tampoco conoce la escritura en bloque (0x0B/0x0C).
+    - table_crc: si es False, tampoco calcula el CRC de las tablas (0x0D).
+    """
+    def __init__(self, controller_id=1, latency=0.002, eeprom_write_delay=0.005, rx_buffer=64,
+                 baudrate=None, bit_error_rate=0.0, report_interval=DEFAULT_REPORT_INTERVAL, seed=None,
+                 table_dump=True, table_write=True, table_crc=True):
+        self.controller_id = controller_id
+        self.latency = latency
+        self.eeprom_write_delay = eeprom_write_delay
+        self.rx_buffer = rx_buffer
+        self.baudrate = baudrate
+        self.bit_error_rate = bit_error_rate
+        self.report_interval = report_interval
+        self.table_dump = table_dump
+        self.table_write = table_write
+        self.table_crc = table_crc
+        self._rng = random.Random(seed)
+        self._specs_by_read = {spec.read_cmd: spec for spec in TABLES}
+        self._specs_by_write = {spec.write_cmd: spec for spec in TABLES}
+        self._link = None
+        self._thread = None
+        self._running = threading.Event()
+        self._decoder = FrameDecoder()
+        self._clock_offset = 0.0
+        self._monitoring_since = None
+        self._next_report = None
+        self.stats = {'frames_in': 0, 'frames_out': 0, 'writes': 0, 'nacks': 0, 'reports': 0,
+                      'bytes_dropped': 0, 'bits_flipped': 0}
+        self.factory_reset()
+
+    # --- Memoria del controlador ---
+
+    def factory_reset(self):
+        """Deja todas las tablas con los slots vacíos, como un equipo recién borrado."""
+        self.eeprom = {spec.name: [spec.record_cls.empty_payload(i) for i in range(spec.max_items)]
+                       for spec in TABLES}
+        # Tramas de escritura en bloque recibidas y aún no confirmadas: {cmd de escritura: (total, {nº: registros})}
+        self._staged = {}
+        self._schedule = None
+
+    def load_hardware_config(self, hardware_config):
+        """Precarga la EEPROM con una configuración de proyecto (hardware_config de un .lc4)."""
+        model = ProjectModel.from_hardware_config(hardware_config)
+        encoded = model.encode_all()
+        for spec in TABLES:
+            self.eeprom[spec.name] = list(encoded[spec.name])
+        self._schedule = None
+        self.controller_id = encoded['info'][0][0]
+
+    # --- Transporte ---
+
+    def start_pty(self):
+        """Arranca sobre un par pty. Retorna la ruta del puerto para Communicator.connect."""
+        return self._start(_PtyLink())
+
+    def start_socket(self, host='127.0.0.1', port=0):
+        """Arranca como servidor TCP. Retorna la URL socket://host:puerto."""
+        return self._start(_SocketLink(host, port))
+
+    def _start(self, link):
+        self._link = link
+        self._running.set()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return link.port
+
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if self._link:
+            self._link.close()
+            self._link = None
+
+    def _serve(self):
+        while self._running.is_set():
+            timeout = 0.1
+            if self._next_report is not None:
+                timeout = max(0.0, min(timeout, self._next_report - time.monotonic()))
+            try:
+                readable, _, _ = select.select([self._link], [], [], timeout)
+            except (OSError, ValueError):
+                return
+            if readable:
+                data = self._link.read()
+                if data:
+                    self._receive(data)
+            if self._next_report is not None and time.monotonic() >= self._next_report:
+                self._send_report()
+
+    def _receive(self, data):
+        self._line_delay(len(data))
+        self._decoder.feed(self._corrupt(data))
+        for cmd, payload in self._decoder:
+            self.stats['frames_in'] += 1
+            self._handle(cmd, payload)
+
+    def _line_delay(self, nbytes):
+        # 10 bits por byte en la línea (start + 8 datos + stop)
+        if self.baudrate:
+            time.sleep(nbytes * 10 / self.baudrate)
+
+    def _corrupt(self, data):
+        if not self.bit_error_rate:
+            return data
+        byte_error = 1 - (1 - self.bit_error_rate) ** 8
+        out = bytearray(data)
+        for i in range(len(out)):
+            if self._rng.random() < byte_error:
+                out[i] ^= 1 << self._rng.randrange(8)
+                self.stats['bits_flipped'] += 1
+        return bytes(out)
+
+    def _send(self, cmd, payload=b''):
+        frame = build_frame(cmd, payload)
+        self._line_delay(len(frame))
+        self._link.write(self._corrupt(frame))
+        self.stats['frames_out'] += 1
+
+    def _eeprom_busy(self, pages=1):
+        """Simula la escritura en EEPROM: mientras tanto sólo caben rx_buffer bytes en el UART."""
+        if not self.eeprom_write_delay:
+            return
+        time.sleep(self.eeprom_write_delay * pages)
+        readable, _, _ = select.select([self._link], [], [], 0)
+        if not readable:
+            return
+        pending = self._link.read()
+        if len(pending) > self.rx_buffer:
+            self.stats['bytes_dropped'] += len(pending) - self.rx_buffer
+            pending = pending[:self.rx_buffer]
+        if pending:
+            self._decoder.feed(self._corrupt(pending))
+
+    # --- Firmware ---
+
+    def _handle(self, cmd, payload):
+        if self.latency:
+            time.sleep(self.latency)
+
+        spec = self._specs_by_read.get(cmd)
+        if spec is not None:
+            self._handle_read(spec, cmd, payload)
+            return
+        spec = self._specs_by_write.get(cmd)
+        if spec is not None:
+            self._handle_write(spec, payload)
+            return
+
+        if cmd == CMD_READ_ID:
+            self._send(cmd | 0x80, bytes([self.controller_id]))
+        elif cmd == CMD_READ_TIME:
+            t = time.localtime(time.time() + self._clock_offset)
+            self._send(cmd | 0x80, bytes([t.tm_hour, t.tm_min, t.tm_sec, t.tm_mday, t.tm_mon,
+                                          t.tm_year % 100, (t.tm_wday + 1) % 7]))
+        elif cmd == CMD_WRITE_ID and len(payload) == 1:
+            self.controller_id = payload[0]
+            self._ack_write()
+        elif cmd == CMD_WRITE_TIME and len(payload) == 7:
+            h, m, s, day, mon, year = payload[:6]
+            try:
+                target = time.mktime((2000 + year, mon, day, h, m, s, 0, 0, -1))
+                self._clock_offset = target - time.time()
+            except (OverflowError, ValueError):
+                self._nack()
+                return
+            self._ack_write()
+        elif cmd == CMD_FACTORY_RESET:
+            self.factory_reset()
+            self._ack_write()
+        elif cmd == CMD_TABLE_DUMP and self.table_dump and len(payload) == 1 \
+                and payload[0] in self._specs_by_read:
+            self._handle_table_dump(self._specs_by_read[payload[0]])
+        elif cmd == CMD_TABLE_WRITE and self.table_write and len(payload) > TABLE_WRITE_HEADER \
+                and payload[2] in self._specs_by_write:
+            self._handle_table_write(payload)
+        elif cmd == CMD_TABLE_COMMIT and self.table_write and len(payload) == 2 \
+                and payload[0] in self._specs_by_write:
+            self._handle_table_commit(payload[0], payload[1])
+        elif cmd == CMD_TABLE_CRC and self.table_crc and len(payload) == 1 \
+                and payload[0] in self._specs_by_read:
+            crc = 0
+            for slot in self.eeprom[self._specs_by_read[payload[0]].name]:
+                crc = zlib.crc32(slot, crc)
+            self._send(CMD_TABLE_CRC | 0x80, bytes([payload[0]]) + crc.to_bytes(4, 'big'))
+        elif cmd == CMD_MONITOR_ON:
+            self._monitoring_since = time.monotonic()
+            self._next_report = self._monitoring_since
+            self._send(CMD_ACK)
+        elif cmd == CMD_MONITOR_OFF:
+            self._monitoring_since = None
+            self._next_report = None
+            self._send(CMD_ACK)
+        else:
+            self._nack()
+
+    def _handle_read(self, spec, cmd, payload):
+        table = self.eeprom[spec.name]
+        if spec.record_cls is Holiday:
+            # Todos los feriados válidos en una sola trama
+            self._send(cmd | 0x80, b''.join(p for p in table if p[1]))
+            return
+        if len(payload) != 1 or payload[0] >= spec.max_items:
+            self._nack()
+            return
+        self._send(cmd | 0x80, table[payload[0]])
+
+    def _handle_table_dump(self, spec):
+        """Todos los slots de la tabla, en tramas 0x8A [cmd, nº, total, registros...]."""
+        table = self.eeprom[spec.name]
+        per_frame = (255 - TABLE_DUMP_HEADER) // spec.record_cls.SIZE
+        chunks = [table[i:i + per_frame] for i in range(0, len(table), per_frame)]
+        for seq, chunk in enumerate(chunks):
+            header = bytes([spec.read_cmd, seq, len(chunks)])
+            self._send(CMD_TABLE_DUMP | 0x80, header + b''.join(chunk))
+
+    def _handle_table_write(self, payload):
+        """Guarda en RAM una trama de escritura en bloque y la confirma con 0x8B [nº]."""
+        seq, total, write_cmd = payload[:TABLE_WRITE_HEADER]
+        spec = self._specs_by_write[write_cmd]
+        records = payload[TABLE_WRITE_HEADER:]
+        size = spec.record_cls.SIZE
+        if seq >= total or len(records) % size or any(records[i] >= spec.max_items for i in range(0, len(records), size)):
+            self._nack()
+            return
+        staged_total, chunks = self._staged.get(write_cmd, (total, {}))
+        if staged_total != total:
+            chunks = {}
+        chunks[seq] = bytes(records)
+        self._staged[write_cmd] = (total, chunks)
+        self._send(CMD_TABLE_WRITE | 0x80, bytes([seq]))
+
+    def _handle_table_commit(self, write_cmd, total):
+        """Graba las tramas recibidas si están todas; la EEPROM se escribe por páginas."""
+        staged_total, chunks = self._staged.get(write_cmd, (None, {}))
+        if staged_total != total or len(chunks) != total:
+            self._nack()
+            return
+        spec = self._specs_by_write[write_cmd]
+        size = spec.record_cls.SIZE
+        data = b''.join(chunks[seq] for seq in range(total))
+        for offset in range(0, len(data), size):
+            record = data[offset:offset + size]
+            self.eeprom[spec.name][record[0]] = record
+        del self._staged[write_cmd]
+        self._schedule = None
+        self.stats['writes'] += 1
+        self._eeprom_busy(pages=-(-len(data) // EEPROM_PAGE_SIZE))
+        self._send(CMD_ACK)
+
+    def _handle_write(self, spec, payload):
+        if len(payload) != spec.record_cls.SIZE or payload[0] >= spec.max_items:
+            self._nack()
+            return
+        self.eeprom[spec.name][payload[0]] = bytes(payload)
+        self._schedule = None
+        self._ack_write()
+
+    def _ack_write(self):
+        self.stats['writes'] += 1
+        self._eeprom_busy()
+        self._send(CMD_ACK)
+
+    def _nack(self):
+        self.stats['nacks'] += 1
+        self._send(CMD_NACK)
+
+    def _active_plan(self):
+        """Plan vigente según el reloj del equipo, con sus feriados; None si no hay planes."""
+        if self._schedule is None:
+            model = ProjectModel()
+            for payload in self.eeprom['plans']:
+                if payload[1] != 0xFF:
+                    model.add('plans', Plan.from_payload(payload))
+            for payload in self.eeprom['holidays']:
+                model.add('holidays', Holiday.from_payload(payload))
+            self._schedule = PlanSchedule.from_model(model)
+        plan_id = self._schedule.plan_at(time.time() + self._clock_offset)
+        return Plan.from_payload(self.eeprom['plans'][plan_id]) if plan_id is not None else None
+
+    def _current_ports(self):
+        """
+        Puertos D/E/F del movimiento en curso: recorre la secuencia del plan
+        vigente con su índice de tiempo o, si no hay, la primera secuencia con tiempos.
+        """
+        movements = {p[0]: p for p in self.eeprom['movements'] if p[1] != 0xFF}
+        sequences = self.eeprom['sequences']
+        candidates = [(seq, 0) for seq in sequences]
+        plan = self._active_plan()
+        if plan and plan.sequence_id < len(sequences):
+            candidates.insert(0, (sequences[plan.sequence_id], plan.time_sel))
+        for seq, time_sel in candidates:
+            if seq[3] == 0xFF or time_sel >= 5:
+                continue
+            column = 6 + time_sel
+            steps = [movements[m] for m in seq[4:4 + seq[3]] if m in movements and movements[m][column]]
+            if not steps:
+                continue
+            cycle = sum(step[column] for step in steps)
+            elapsed = (time.monotonic() - self._monitoring_since) % cycle
+            for step in steps:
+                if elapsed < step[column]:
+                    return step[1:4]
+                elapsed -= step[column]
+        return b'\x00\x00\x00'
+
+    def _send_report(self):
+        self._send(CMD_MONITOR_REPORT, bytes([self.controller_id]) + bytes(self._current_ports()) + b'\x00')
+        self.stats['reports'] += 1
+        self._next_report += self.report_interval
+        # Si nos atrasamos (por ejemplo durante una escritura) no acumulamos reportes
+        self._next_report = max(self._next_report, time.monotonic())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulador del controlador LC4")
+    parser.add_argument('--socket', type=int, default=None, help="Escucha en TCP en lugar de crear un pty")
+    parser.add_argument('--project', help="Archivo .lc4 con la configuración inicial")
+    parser.add_argument('--controller-id', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--eeprom-ms', type=float, default=5.0)
+    parser.add_argument('--baudrate', type=int, default=None, help="Simula la velocidad de la línea")
+    parser.add_argument('--ber', type=float, default=0.0, help="Tasa de error de bit")
+    parser.add_argument('--no-table-dump', action='store_true', help="Simula un firmware sin volcado de tablas")
+    parser.add_argument('--no-table-write', action='store_true', help="Simula un firmware sin escritura en bloque")
+    parser.add_argument('--no-table-crc', action='store_true', help="Simula un firmware sin CRC de tablas")
+    args = parser.parse_args()
+
+    simulator = LC4Simulator(args.controller_id, args.latency_ms / 1000, args.eeprom_ms / 1000,
+                             baudrate=args.baudrate, bit_error_rate=args.ber,
+                             table_dump=not args.no_table_dump, table_write=not args.no_table_write,
+                             table_crc=not args.no_table_crc)
+    if args.project:
+        with open(args.project, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        simulator.load_hardware_config(data.get('hardware_config', data))
+    port = simulator.start_socket(port=args.socket) if args.socket is not None else simulator.start_pty()
+    print(f"LC4 simulado escuchando en {port} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+    print(f"Estadísticas: {simulator.stats}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
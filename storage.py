@@ -0,0 +1,43 @@
+# storage.py
+
+import os
+import json
+
+# Directorio donde la aplicación guarda sus datos persistentes (perfiles, cachés, etc.)
+APP_DIR_NAME = '.lc4programmer'
+
+
+def app_data_path(*parts):
+    """
+    Retorna una ruta dentro del directorio de datos de la aplicación y se
+    asegura de que su carpeta exista. Se puede redirigir con LC4_DATA_DIR.
+    """
+    base = os.environ.get('LC4_DATA_DIR') or os.path.join(os.path.expanduser('~'), APP_DIR_NAME)
+    path = os.path.join(base, *parts)
+    os.makedirs(os.path.dirname(path) if parts else path, exist_ok=True)
+    return path
+
+
+def load_json(path, default=None):
+    """Lee un archivo JSON; si no existe o está dañado retorna `default`."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Escribe un archivo JSON de forma atómica (archivo temporal + reemplazo)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def save_bytes(path, data):
+    """Escribe un archivo binario de forma atómica (archivo temporal + reemplazo)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
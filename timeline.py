@@ -0,0 +1,155 @@
+# timeline.py
+#
+# Línea de tiempo programada de cada plan, calculada en el backend para el
+# visualizador de planes: tramos por grupo, duración del ciclo, verdes
+# efectivos, intermitencias y conflictos. El resultado de cada plan se guarda
+# con una clave hecha de los payloads que usa (el plan, su secuencia, los
+# movimientos de la secuencia y su regla de intermitencia), así sólo se
+# recalcula cuando cambia alguno de esos registros.
+
+import threading
+from collections import OrderedDict
+
+from lights import LIT_AMBER, LIT_GREEN, LIT_RED, NUM_GROUPS, group_states, is_conflict, light_bit, ports_word
+from project_model import MOVEMENT_TIMES
+
+# Planes recordados (de cualquier proyecto); los usados hace más tiempo se descartan primero
+MAX_CACHED_PLANS = 256
+# Ciclos más largos que esto llevan la regla marcada cada 10 s en lugar de cada 5 s
+LONG_CYCLE = 100
+
+COLOR_NAMES = ((LIT_RED, 'red'), (LIT_AMBER, 'amber'), (LIT_GREEN, 'green'))
+_LETTERS = ((LIT_RED, 'R'), (LIT_AMBER, 'A'), (LIT_GREEN, 'V'))
+_LETTER_BY_LIT = dict(_LETTERS)
+
+
+def _lit_colors(state):
+    return [name for lit, name in COLOR_NAMES if state & lit]
+
+
+def _active_lights(states):
+    """Luces encendidas de un movimiento, en el orden R1, A1, V1, R2, ..."""
+    return ' '.join(f'{letter}{group}' for group, state in enumerate(states, start=1)
+                    for lit, letter in _LETTERS if state & lit)
+
+
+def _duration(movement, time_sel):
+    return movement.times[time_sel] if time_sel < MOVEMENT_TIMES else 0
+
+
+def intermittences_by_plan(model):
+    """Primera regla de intermitencia de cada plan (mismo criterio que usaba el visualizador)."""
+    rules = {}
+    for key in sorted(model.tables['intermittences']):
+        rule = model.tables['intermittences'][key]
+        rules.setdefault(rule.plan_id, rule)
+    return rules
+
+
+def build_plan_timeline(model, plan, intermittence=None):
+    """Calcula la línea de tiempo de un plan del `ProjectModel`."""
+    timeline = {'plan_id': plan.id, 'sequence_id': plan.sequence_id, 'time_sel': plan.time_sel,
+                'day_type_id': plan.day_type_id, 'hour': plan.hour, 'minute': plan.minute,
+                'status': 'success', 'message': '', 'cycle': 0, 'major_tick': 5, 'movements': [],
+                'missing_movements': [], 'groups': [[] for _ in range(NUM_GROUPS)], 'effective_greens': [],
+                'conflicts': []}
+
+    sequence = model.get('sequences', plan.sequence_id)
+    if sequence is None:
+        return dict(timeline, status='error', message=f'El Plan #{plan.id} apunta a la Secuencia '
+                    f'#{plan.sequence_id}, pero no se encontró. Verifique la configuración.')
+    if not sequence.movements:
+        return dict(timeline, status='empty', message='La secuencia asociada a este plan no tiene movimientos definidos.')
+
+    movements = []
+    for movement_id in sequence.movements:
+        movement = model.get('movements', movement_id)
+        if movement is None:
+            timeline['missing_movements'].append(movement_id)
+        else:
+            movements.append(movement)
+    if not movements:
+        return dict(timeline, status='error', message=f'Ninguno de los movimientos de la Secuencia '
+                    f'#{sequence.id} fue encontrado. Verifique la configuración.')
+
+    cycle = sum(_duration(movement, plan.time_sel) for movement in movements)
+    if not cycle:
+        return dict(timeline, status='empty', message='La duración total del ciclo para este plan es 0. '
+                    'No se puede generar la línea de tiempo.')
+    timeline['cycle'] = cycle
+    timeline['major_tick'] = 10 if cycle > LONG_CYCLE else 5
+
+    mask = ports_word(intermittence.mask_d, intermittence.mask_e, intermittence.mask_f) if intermittence else 0
+    start = 0
+    for movement in movements:
+        duration = _duration(movement, plan.time_sel)
+        states = group_states(movement.port_d, movement.port_e, movement.port_f)
+        timeline['movements'].append({'id': movement.id, 'start': start, 'duration': duration,
+                                      'lights': _active_lights(states)})
+        green_groups = [group for group, state in enumerate(states, start=1) if state == LIT_GREEN]
+        if green_groups:
+            timeline['effective_greens'].append({'movement_id': movement.id, 'groups': green_groups,
+                                                 'duration': duration})
+        for group, state in enumerate(states, start=1):
+            conflict = is_conflict(state)
+            if conflict:
+                timeline['conflicts'].append({'movement_id': movement.id, 'group': group,
+                                              'lights': _lit_colors(state)})
+            if not duration:
+                continue
+            segment = {'movement_id': movement.id, 'start': start, 'duration': duration,
+                       'color': 'violet' if conflict else (_lit_colors(state) or ['gray'])[0], 'intermittent': False}
+            if conflict:
+                segment['lights'] = _lit_colors(state)
+            elif state and mask:
+                # La luz encendida del grupo parpadea si su bit está en la máscara de la regla
+                segment['intermittent'] = bool(mask & (1 << light_bit(f'{_LETTER_BY_LIT[state]}{group}')))
+            timeline['groups'][group - 1].append(segment)
+        start += duration
+    return timeline
+
+
+class TimelineCache:
+    """
+    Líneas de tiempo ya calculadas, indexadas por los payloads de los que
+    depende cada plan. Editar un movimiento sólo invalida los planes cuya
+    secuencia lo usa.
+    """
+    def __init__(self, max_plans=MAX_CACHED_PLANS):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_plans = max_plans
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model, plan, intermittence):
+        sequence = model.get('sequences', plan.sequence_id)
+        movements = []
+        for movement_id in (sequence.movements if sequence else b''):
+            movement = model.get('movements', movement_id)
+            movements.append(movement.to_payload() if movement else None)
+        return (plan.to_payload(), sequence.to_payload() if sequence else None, tuple(movements),
+                intermittence.to_payload() if intermittence else None)
+
+    def plan_timeline(self, model, plan, intermittence=None):
+        key = self._key(model, plan, intermittence)
+        with self._lock:
+            timeline = self._entries.get(key)
+            if timeline is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return timeline
+        timeline = build_plan_timeline(model, plan, intermittence)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = timeline
+            while len(self._entries) > self._max_plans:
+                self._entries.popitem(last=False)
+        return timeline
+
+    def timelines(self, model):
+        """Líneas de tiempo de todos los planes del modelo: {id_plan: línea de tiempo}."""
+        rules = intermittences_by_plan(model)
+        plans = model.tables['plans']
+        return {plan_id: self.plan_timeline(model, plans[plan_id], rules.get(plan_id)) for plan_id in sorted(plans)}
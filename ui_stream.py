@@ -0,0 +1,72 @@
+# ui_stream.py
+
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Mínimo tiempo entre dos envíos a la UI: los eventos de ese intervalo viajan juntos
+DEFAULT_PUSH_INTERVAL = 0.05
+
+
+class EventStream:
+    """
+    Cola de eventos para la interfaz (ej. el avance de una captura). A
+    diferencia de MonitoringHub no se descarta nada: los eventos que llegan
+    mientras la UI procesa el lote anterior se acumulan y se envían juntos en
+    el siguiente, así un enlace rápido no satura evaluate_js y uno lento igual
+    muestra cada registro apenas llega.
+    """
+    def __init__(self, push_interval=DEFAULT_PUSH_INTERVAL):
+        self._lock = threading.Lock()
+        self._events = []
+        self._wakeup = threading.Event()
+        self._running = threading.Event()
+        self._thread = None
+        self._push_interval = push_interval
+
+    def publish(self, event):
+        """Encola un evento (se puede llamar desde cualquier hilo, incluido el del transporte)."""
+        with self._lock:
+            self._events.append(event)
+        self._wakeup.set()
+
+    def _take(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def start(self, sink):
+        """Inicia el hilo que entrega los eventos pendientes a `sink(eventos)`."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._take()
+        self._running.set()
+        self._thread = threading.Thread(target=self._push_loop, args=(sink,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo después de entregar lo que quedaba pendiente."""
+        self._running.clear()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _deliver(self, sink):
+        events = self._take()
+        if not events:
+            return
+        try:
+            sink(events)
+        except Exception as e:
+            log.error("Error al enviar eventos a la UI: %s", e)
+
+    def _push_loop(self, sink):
+        while self._running.is_set():
+            self._wakeup.wait(timeout=0.5)
+            self._wakeup.clear()
+            self._deliver(sink)
+            time.sleep(self._push_interval)
+        self._deliver(sink)
@@ -0,0 +1,159 @@
+# verify.py
+#
+# Verificación de la configuración escrita en el controlador sin volver a
+# capturarla completa. Para cada tabla se calcula en el host el CRC-32 de sus
+# payloads codificados y se compara con el que calcula el firmware (CMD 0x0D):
+# una petición por tabla. Si el firmware no lo soporta se leen unos pocos
+# registros al azar. Sólo cuando algo no coincide se lee la tabla completa, y
+# sólo los registros distintos se vuelven a escribir y a leer.
+
+import logging
+import random
+import zlib
+
+from project_model import Holiday, TABLES, CMD_WRITE_CONTROLLER_ID
+
+log = logging.getLogger(__name__)
+
+# Registros leídos por tabla cuando el firmware no calcula el CRC
+VERIFY_SAMPLE = 6
+
+METHOD_DIGEST = 'digest'
+METHOD_SAMPLE = 'sample'
+METHOD_FULL = 'full'
+
+
+def table_digest(payloads) -> int:
+    """CRC-32 de los payloads de una tabla en orden de índice (el mismo que calcula el firmware)."""
+    crc = 0
+    for payload in payloads:
+        crc = zlib.crc32(payload, crc)
+    return crc
+
+
+def _read_holidays(controller, spec, expected):
+    """Los feriados se leen todos en una trama: se arma la tabla completa con slots vacíos."""
+    data = controller._fetch_all_holidays(spec)
+    if data is None:
+        return {}, list(range(len(expected)))
+    by_id = {h.id: h.to_payload() for h in Holiday.parse_table(data) if h.day}
+    return {i: by_id.get(i, Holiday.empty_payload(i)) for i in range(len(expected))}, []
+
+
+def _read_slots(controller, spec, indexes, expected):
+    """Lee los slots pedidos; para la tabla completa se intenta primero el volcado en bloque."""
+    if spec.record_cls is Holiday:
+        return _read_holidays(controller, spec, expected)
+    slots = {}
+    if len(indexes) == len(expected):
+        slots.update(controller._fetch_table_dump(spec) or {})
+    read, failed = controller._fetch_items(spec, [i for i in indexes if i not in slots])
+    slots.update(read)
+    return slots, failed
+
+
+def _expected_payload(spec, payload):
+    # Un feriado con día 0 no es válido: el firmware no lo reporta y se compara como slot vacío
+    if spec.record_cls is Holiday and not payload[1]:
+        return Holiday.empty_payload(payload[0])
+    return payload
+
+
+def _mismatches(spec, slots, expected):
+    return [i for i, payload in sorted(slots.items()) if payload != _expected_payload(spec, expected[i])]
+
+
+def _verify_table(controller, spec, expected, sample_size, repair):
+    result = {'method': METHOD_FULL, 'checked': 0, 'mismatched': [], 'repaired': [], 'unverified': []}
+    if spec.record_cls is Holiday:
+        indexes = list(range(len(expected)))
+    else:
+        crc = controller._fetch_table_crc(spec)
+        if crc is not None:
+            result['method'] = METHOD_DIGEST
+            result['checked'] = len(expected)
+            if crc == table_digest(expected):
+                return result
+            log.warning("El CRC de %s no coincide, se lee la tabla para ubicar las diferencias.", spec.label_plural)
+            indexes = list(range(len(expected)))
+        else:
+            result['method'] = METHOD_SAMPLE
+            indexes = sorted(random.sample(range(len(expected)), min(sample_size, len(expected))))
+
+    slots, failed = _read_slots(controller, spec, indexes, expected)
+    mismatched = _mismatches(spec, slots, expected)
+    if result['method'] == METHOD_SAMPLE and mismatched:
+        # Una muestra con diferencias no dice cuántas hay: se revisa la tabla completa
+        log.warning("La muestra de %s tiene diferencias, se lee la tabla completa.", spec.label_plural)
+        result['method'] = METHOD_FULL
+        indexes = list(range(len(expected)))
+        slots, failed = _read_slots(controller, spec, indexes, expected)
+        mismatched = _mismatches(spec, slots, expected)
+    if result['method'] != METHOD_DIGEST:
+        result['checked'] = len(slots)
+    result['mismatched'] = mismatched
+    result['unverified'] = failed
+    if not (repair and mismatched):
+        return result
+
+    for i in mismatched:
+        if controller._send_write_command(spec.write_cmd, expected[i]):
+            result['repaired'].append(i)
+    # Se confirma leyendo de nuevo sólo lo que se reescribió
+    if result['repaired']:
+        slots, failed = _read_slots(controller, spec, result['repaired'], expected)
+        still_wrong = set(_mismatches(spec, slots, expected)) | set(failed)
+        result['repaired'] = [i for i in result['repaired'] if i not in still_wrong]
+    return result
+
+
+def _verify_controller_id(controller, encoded, repair):
+    expected = encoded['info'][0]
+    result = {'method': METHOD_FULL, 'checked': 1, 'mismatched': [], 'repaired': [], 'unverified': []}
+    response = controller._comm.send_command(0x11)
+    if response.get('status') != 'success':
+        result['unverified'] = [0]
+    elif response['data'][:1] != expected[:1]:
+        result['mismatched'] = [0]
+        if repair and controller._send_write_command(CMD_WRITE_CONTROLLER_ID, expected):
+            result['repaired'] = [0]
+    return result
+
+
+def verify_configuration(controller, encoded, sample_size=VERIFY_SAMPLE, repair=True) -> dict:
+    """
+    Compara la configuración codificada (`ProjectModel.encode_all()`) con la del
+    controlador y, con `repair`, reescribe los registros distintos (sin 'info'
+    no se comprueba el ID del controlador). Retorna el detalle por tabla: método
+    usado, registros revisados, distintos, reparados y los que no se pudieron leer.
+    """
+    tables = {'info': _verify_controller_id(controller, encoded, repair)} if 'info' in encoded else {}
+    for spec in TABLES:
+        tables[spec.name] = _verify_table(controller, spec, encoded[spec.name], sample_size, repair)
+
+    # Lo que se comprobó (o reparó) es lo que sabemos que está en el controlador
+    synced = controller._synced_payloads
+    for table, result in tables.items():
+        if synced is not None and table in synced:
+            for i in result['repaired']:
+                synced[table][i] = encoded[table][i]
+
+    pending = {t: sorted(set(r['mismatched']) - set(r['repaired'])) for t, r in tables.items()}
+    pending = {t: indexes for t, indexes in pending.items() if indexes}
+    unverified = {t: r['unverified'] for t, r in tables.items() if r['unverified']}
+    repaired = sum(len(r['repaired']) for r in tables.values())
+    if pending or unverified:
+        parts = []
+        if pending:
+            parts.append(f"{sum(map(len, pending.values()))} registros distintos sin reparar")
+        if unverified:
+            parts.append(f"{sum(map(len, unverified.values()))} registros sin poder leer")
+        message = f"La verificación encontró {' y '.join(parts)}."
+        status = 'error'
+    else:
+        message = 'La configuración del controlador coincide con el proyecto.'
+        if repaired:
+            message += f' Se repararon {repaired} registros.'
+        status = 'success'
+    log.info(message)
+    return {'status': status, 'message': message, 'tables': tables, 'mismatched': pending}
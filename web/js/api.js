@@ -6,6 +6,7 @@ export const api = {
     openProjectFile: () => window.pywebview.api.open_project_file(),
     saveProjectFile: () => window.pywebview.api.save_project_file(),
     updateProjectData: (data) => window.pywebview.api.update_project_data(JSON.stringify(data)),
+    getPlanTimelines: (hardwareConfig) => window.pywebview.api.get_plan_timelines(JSON.stringify(hardwareConfig)),
     goToWelcome: () => window.pywebview.api.go_to_welcome(),
     
     // Conexión
@@ -24,7 +25,30 @@ export const api = {
     startMonitoring: () => window.pywebview.api.start_monitoring(),
     stopMonitoring: () => window.pywebview.api.stop_monitoring(),
     checkMonitoringUpdate: () => window.pywebview.api.check_monitoring_update(),
+    getRecordingInfo: () => window.pywebview.api.get_recording_info(),
+    startReplay: (start, end, speed = 1) => window.pywebview.api.start_replay(start, end, speed),
+    stopReplay: () => window.pywebview.api.stop_replay(),
+    getReplayStatus: () => window.pywebview.api.get_replay_status(),
+    exportRecording: (start = null, end = null) => window.pywebview.api.export_recording(start, end),
+    getMonitoringAnalytics: (start = null, end = null, controllerId = null) => window.pywebview.api.get_monitoring_analytics(start, end, controllerId),
 
     factoryReset: () => window.pywebview.api.factory_reset(),
-    uploadConfiguration: (data) => window.pywebview.api.upload_configuration(JSON.stringify(data)),
+    uploadConfiguration: (data, forceFull = false, ignoreConflicts = false) => window.pywebview.api.upload_configuration(JSON.stringify(data), forceFull, ignoreConflicts),
+    checkConflicts: (data) => window.pywebview.api.check_conflicts(JSON.stringify(data)),
+    getUploadStats: () => window.pywebview.api.get_upload_stats(),
+    verifyConfiguration: (data, repair = true) => window.pywebview.api.verify_configuration(JSON.stringify(data), repair),
+    resumeJob: (jobId) => window.pywebview.api.resume_job(jobId),
+    getPendingJobs: () => window.pywebview.api.get_pending_jobs(),
+    getLinkStats: () => window.pywebview.api.get_link_stats(),
+    resetLinkStats: () => window.pywebview.api.reset_link_stats(),
+    setLinkStatsDump: (interval) => window.pywebview.api.set_link_stats_dump(interval),
+
+    // Flota (varios controladores en paralelo)
+    fleetConnect: (ports, baudrate) => window.pywebview.api.fleet_connect(ports, baudrate),
+    fleetDisconnect: (ports = null) => window.pywebview.api.fleet_disconnect(ports),
+    fleetCapture: (ports) => window.pywebview.api.fleet_capture(ports),
+    fleetUpload: (projectsByPort, forceFull = false, ignoreConflicts = false) => window.pywebview.api.fleet_upload(JSON.stringify(projectsByPort), forceFull, ignoreConflicts),
+    fleetFactoryReset: (ports) => window.pywebview.api.fleet_factory_reset(ports),
+    fleetGetStatus: () => window.pywebview.api.fleet_get_status(),
+    fleetGetResult: (port) => window.pywebview.api.fleet_get_result(port),
 };
\ No newline at end of file
@@ -1,8 +1,8 @@
 // web/js/app.js
 
 import { api } from './api.js';
-import { setProjectData, getProjectData } from './store.js';
-import { showLoadingModal } from './ui.js';
+import { setProjectData, getProjectData, mergeCapturedRecords } from './store.js';
+import { showLoadingModal, renderCaptureProgress } from './ui.js';
 import { initializeDashboardView } from './views/dashboard.js';
 import { initializeSequencesView } from './views/sequences.js';
 import { initializePlansView } from './views/plans.js';
@@ -71,20 +71,62 @@ async function loadView(viewName, forceReload = false) {
 }
 /**
  * Flujo de trabajo para capturar datos del controlador.
+ * Con `resumeJobId` reanuda una captura interrumpida en lugar de empezar de cero.
  */
-function runCaptureFlow() {
+function runCaptureFlow(resumeJobId = null) {
     showLoadingModal(true);
-    api.performFullCapture();
+    // El backend envía cada tabla y registro apenas los lee: las vistas se llenan progresivamente
+    const progress = {};
+    let started = false;
+    window.onCaptureEvents = async (events) => {
+        const changedTables = new Set();
+        for (const event of events) {
+            if (event.type === 'info') {
+                setProjectData({ hardware_config: { info: event.info }, is_connected: true });
+                event.tables.forEach(table => { progress[table] = { label: table, captured: 0, done: false }; });
+            } else if (event.type === 'table') {
+                Object.assign(progress[event.table], { label: event.label, total: event.total });
+            } else if (event.type === 'records') {
+                mergeCapturedRecords(event.table, event.records);
+                changedTables.add(event.table);
+                progress[event.table].captured = getProjectData().hardware_config[event.table].length;
+            } else if (event.type === 'table_done') {
+                Object.assign(progress[event.table], { done: true, captured: event.captured, missing: event.missing });
+            }
+        }
+        if (!started && getProjectData().hardware_config) {
+            started = true;
+            await loadView('dashboard', true);
+            showLoadingModal(false);
+        }
+        renderCaptureProgress(progress);
+        // La vista abierta se vuelve a dibujar si usa alguna de las tablas que recibieron registros
+        window.dispatchEvent(new CustomEvent('capture-progress', { detail: { progress, tables: [...changedTables] } }));
+    };
+
+    if (resumeJobId) {
+        api.resumeJob(resumeJobId);
+    } else {
+        api.performFullCapture();
+    }
 
     const poller = setInterval(async () => {
         try {
             const resultJson = await api.checkCaptureResult();
             if (resultJson) {
                 clearInterval(poller);
-                const resultData = JSON.parse(resultJson);
+                window.onCaptureEvents = null;
+                renderCaptureProgress(null);
+                const { capture_result: captureResult, ...resultData } = JSON.parse(resultJson);
                 setProjectData(resultData);
-                await loadView('dashboard', true);
+                // Si el usuario ya navegó durante la captura, se queda en su vista
+                const currentView = document.getElementById('main-content-area').dataset.currentView;
+                await loadView(started && currentView ? currentView : 'dashboard', true);
                 showLoadingModal(false);
+                // Captura incompleta: sólo se repiten los registros que faltan
+                if (captureResult && captureResult.job_id && confirm(`${captureResult.message}\n¿Reanudar ahora?`)) {
+                    runCaptureFlow(captureResult.job_id);
+                }
             }
         } catch (e) {
             console.error("Error en el poller de captura:", e);
@@ -124,6 +166,7 @@ async function runNewProjectFlow() {
 function updateSidebarButtons(isConnected) {
     const factoryResetBtn = document.getElementById('btn-factory-reset');
     const uploadBtn = document.getElementById('btn-upload'); // ID que le daremos al botón
+    const uploadFullBtn = document.getElementById('btn-upload-full');
 
     if (factoryResetBtn) {
         factoryResetBtn.classList.toggle('sidebar-link-disabled', !isConnected);
@@ -131,6 +174,9 @@ function updateSidebarButtons(isConnected) {
     if (uploadBtn) {
         uploadBtn.classList.toggle('sidebar-link-disabled', !isConnected);
     }
+    if (uploadFullBtn) {
+        uploadFullBtn.classList.toggle('sidebar-link-disabled', !isConnected);
+    }
 }
 
 /**
@@ -191,14 +237,38 @@ async function handleFactoryReset() {
 /**
  * Orquesta el flujo para subir la configuración al controlador.
  */
-async function handleUpload() {
+async function handleUpload(forceFull = false) {
+    // Por defecto sólo se envían los registros que cambiaron desde la última captura/subida;
+    // el botón "Subir Todo" fuerza la escritura completa de todos los registros
     if (!confirm("¿Estás seguro de que quieres subir la configuración actual al controlador? Esto sobrescribirá todos los datos existentes en el dispositivo.")) {
         return;
     }
 
     showLoadingModal(true, "Subiendo configuración, por favor espere...");
-    await api.uploadConfiguration(getProjectData());
+    let result = await api.uploadConfiguration(getProjectData(), forceFull);
+    if (result.status === 'conflicts') {
+        // La configuración tiene conflictos: se muestran y el usuario decide si igual la sube
+        showLoadingModal(false);
+        const details = result.conflicts.slice(0, 10).map(c => `- ${c.message}`).join('\n');
+        const more = result.conflicts.length > 10 ? `\n... y ${result.conflicts.length - 10} más.` : '';
+        if (!confirm(`${result.message}\n${details}${more}\n\n¿Subir de todos modos?`)) {
+            return;
+        }
+        showLoadingModal(true, "Subiendo configuración, por favor espere...");
+        result = await api.uploadConfiguration(getProjectData(), forceFull, true);
+    }
+    if (result.status === 'error') {
+        showLoadingModal(false);
+        alert(result.message);
+        return;
+    }
+    waitForUploadResult();
+}
 
+/**
+ * Espera el resultado de una subida (o de su reanudación) en la cola de la UI.
+ */
+function waitForUploadResult() {
     // Usamos el mismo sistema de "poller" que la captura para esperar el resultado
     const poller = setInterval(async () => {
         try {
@@ -208,6 +278,15 @@ async function handleUpload() {
                 clearInterval(poller);
                 const result = JSON.parse(resultJson);
                 showLoadingModal(false);
+                if (result.job_id) {
+                    // Subida interrumpida: al reanudar sólo se envían los registros pendientes
+                    if (confirm(`${result.message}\n¿Reanudar ahora?`)) {
+                        showLoadingModal(true, "Reanudando la subida, por favor espere...");
+                        await api.resumeJob(result.job_id);
+                        waitForUploadResult();
+                    }
+                    return;
+                }
                 alert(result.message);
             }
         } catch (e) {
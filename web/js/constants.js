@@ -20,6 +20,12 @@ export const LIGHT_ORDER = [
     'R5','A5','V5','R6','A6','V6','R7','A7','V7','R8','A8','V8'
 ];
 
+// Luces encendidas de un grupo en el vector de estado que decodifica el backend
+// (lights.py): un entero por grupo, G1..G8, combinando estos bits.
+export const LIT_RED = 1;
+export const LIT_AMBER = 2;
+export const LIT_GREEN = 4;
+
 export const DAY_TYPE_MAP = {
     0: [0], 1: [1], 2: [2], 3: [3], 4: [4], 5: [5], 6: [6],
     7: [1, 2, 3, 4, 5, 6, 0], 8: [1, 2, 3, 4, 5, 6], 9: [6, 0],
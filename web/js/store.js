@@ -55,6 +55,19 @@ export function setProjectData(newData) {
 }
 
 
+/**
+ * Agrega (o reemplaza por id) registros recibidos durante una captura en curso,
+ * manteniendo la tabla ordenada por id.
+ * @param {string} table - Nombre de la tabla en hardware_config (ej: 'movements').
+ * @param {Array<object>} records - Registros ya decodificados por el backend.
+ */
+export function mergeCapturedRecords(table, records) {
+    const hardwareConfig = projectData.hardware_config;
+    const byId = new Map(hardwareConfig[table].map(record => [record.id, record]));
+    records.forEach(record => byId.set(record.id, record));
+    hardwareConfig[table] = [...byId.values()].sort((a, b) => a.id - b.id);
+}
+
 export function isConnected() {
     return projectData.is_connected || false;
 }
@@ -21,4 +21,19 @@ export function showLoadingModal(show) {
     if (modal) {
         modal.classList.toggle('visible', show);
     }
+}
+
+/**
+ * Muestra el avance de una captura sin bloquear la interfaz.
+ * @param {object|null} progress - {tabla: {label, captured, total, done, missing}}; null lo oculta.
+ */
+export function renderCaptureProgress(progress) {
+    const panel = document.getElementById('capture-progress');
+    if (!panel) return;
+    panel.classList.toggle('visible', Boolean(progress));
+    if (!progress) return;
+    panel.innerHTML = '<h4>Capturando configuración...</h4>' + Object.values(progress).map(table => {
+        const state = table.done ? (table.missing ? `faltan ${table.missing}` : 'listo') : 'leyendo';
+        return `<p><strong>${table.label || ''}</strong> ${table.captured} (${state})</p>`;
+    }).join('');
 }
\ No newline at end of file
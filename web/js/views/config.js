@@ -26,7 +26,27 @@ const ICON_SVG_STRINGS = {
 // --- INICIALIZACIÓN PRINCIPAL Y MANEJO DE PESTAÑAS ---
 // =================================================================================
 
+// Tablas que se ven en la pestaña de secuencias
+const SEQUENCE_TABLES = ['movements', 'sequences', 'flow_rules'];
+
+/**
+ * Durante una captura, vuelve a dibujar las listas de la vista a medida que
+ * llegan los registros (sólo las partes que ya se mostraron).
+ */
+function onCaptureProgress(event) {
+    const { tables } = event.detail;
+    if (tables.some(table => SEQUENCE_TABLES.includes(table)) && document.getElementById('sequence-list-container')) {
+        renderSequenceList();
+        refreshProjectConflicts();
+    }
+    if (tables.includes('holidays') && document.getElementById('holidays-list')) {
+        renderHolidays();
+    }
+}
+
 export function initializeConfigView() {
+    // Registrar la misma función otra vez no agrega un segundo listener
+    window.addEventListener('capture-progress', onCaptureProgress);
     setupTabSwitching();
     // Forzamos la carga inicial de la primera pestaña
     document.querySelector('.config-tab[data-tab="tab-intersection"]').click();
@@ -628,6 +648,7 @@ function renderMovementEditor(movId) {
             <div class="lights-editor">${lightsHTML}</div>
         </div>
         <div id="conflict-warning-container"></div>
+        <div id="project-conflicts-container"></div>
     `;
 
     const updateVisualizer = () => {
@@ -668,6 +689,7 @@ function renderMovementEditor(movId) {
             if (checkbox.dataset.lightId.startsWith('V') || checkbox.dataset.lightId.startsWith('R')) {
                 updateConflictRestraints(editorPanel);
             }
+            refreshProjectConflicts();
 
             
         });
@@ -682,6 +704,29 @@ function renderMovementEditor(movId) {
     } else {
         warningContainer.innerHTML = '';
     }
+    refreshProjectConflicts();
+}
+
+// Evita que una respuesta vieja pise a la de la última edición
+let conflictCheckToken = 0;
+
+/**
+ * Revisa en el backend los conflictos de toda la configuración (todos los
+ * movimientos, las transiciones de las secuencias y las intermitencias) y
+ * muestra un resumen debajo del editor.
+ */
+async function refreshProjectConflicts() {
+    const token = ++conflictCheckToken;
+    const result = await api.checkConflicts(getProjectData());
+    const container = document.getElementById('project-conflicts-container');
+    if (token !== conflictCheckToken || !container) return;
+    if (!result.conflicts || result.conflicts.length === 0) {
+        container.innerHTML = '';
+        return;
+    }
+    const items = result.conflicts.slice(0, 8).map(c => `<li>${c.message}</li>`).join('');
+    const more = result.conflicts.length > 8 ? `<li>... y ${result.conflicts.length - 8} más.</li>` : '';
+    container.innerHTML = `<div class="conflict-warning"><strong>${result.message}</strong><ul>${items}${more}</ul></div>`;
 }
 
 // --- Lógica de Manejo de Datos (Añadir, Eliminar) ---
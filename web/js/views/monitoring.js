@@ -1,20 +1,20 @@
 // web/js/views/monitoring.js
 
 import { api } from '../api.js';
-import { LIGHT_MAP, LIGHT_ORDER } from '../constants.js';
+import { LIGHT_ORDER, LIT_RED, LIT_AMBER, LIT_GREEN } from '../constants.js';
 
-let monitoringPoller = null;
+let monitoringActive = false;
 
-function updateMonitoringLights(portData) {
+const LIT_BY_COLOR = { R: LIT_RED, A: LIT_AMBER, V: LIT_GREEN };
+
+function updateMonitoringLights(report) {
+    // report.groups ya viene decodificado por el backend: luces encendidas de G1..G8
     LIGHT_ORDER.forEach(lightName => {
         const lightElement = document.getElementById(`monitor-light-${lightName}`);
         if (!lightElement) return;
 
-        const lightInfo = LIGHT_MAP[lightName];
-        const portValue = parseInt(portData[lightInfo.port], 16);
-        const isLightOn = (portValue & (1 << lightInfo.bit)) !== 0;
-
-        lightElement.classList.toggle('on', isLightOn);
+        const groupState = report.groups[parseInt(lightName.slice(1), 10) - 1];
+        lightElement.classList.toggle('on', (groupState & LIT_BY_COLOR[lightName[0]]) !== 0);
     });
 }
 
@@ -39,23 +39,20 @@ export async function initializeMonitoringView() {
         `);
     });
 
+    // El backend empuja el último estado de cada controlador apenas llega un reporte
+    // ({controller_id: report}); los reportes intermedios ya vienen descartados.
+    window.onMonitoringUpdate = (updates) => {
+        Object.values(updates).forEach(report => updateMonitoringLights(report));
+    };
+    monitoringActive = true;
     await api.startMonitoring();
-
-    if (monitoringPoller) clearInterval(monitoringPoller);
-    monitoringPoller = setInterval(async () => {
-        const updateJson = await api.checkMonitoringUpdate();
-        if (updateJson) {
-            const portData = JSON.parse(updateJson);
-            updateMonitoringLights(portData);
-        }
-    }, 200);
 }
 
 export async function cleanupMonitoringView() {
-    if (monitoringPoller) {
-        console.log("Saliendo de la vista de monitoreo. Deteniendo poller y comando.");
-        clearInterval(monitoringPoller);
-        monitoringPoller = null;
+    if (monitoringActive) {
+        console.log("Saliendo de la vista de monitoreo. Deteniendo el envío de reportes y el comando.");
+        window.onMonitoringUpdate = null;
+        monitoringActive = false;
         await api.stopMonitoring();
     }
 }
\ No newline at end of file
@@ -45,7 +45,16 @@ function drawPlanCard(plan, dayIndex, startTimeInMinutes, endTimeInMinutes) {
     container.appendChild(card);
 }
 
+// Durante una captura el horario se vuelve a dibujar a medida que llegan los planes
+function onCaptureProgress(event) {
+    if (event.detail.tables.includes('plans') && document.getElementById('plan-schedule-container')) {
+        initializePlansView();
+    }
+}
+
 export function initializePlansView() {
+    // Registrar la misma función otra vez no agrega un segundo listener
+    window.addEventListener('capture-progress', onCaptureProgress);
     const container = document.getElementById('plan-schedule-container');
     const projectData = getProjectData();
     const hardwareData = projectData.hardware_config;